@@ -0,0 +1,140 @@
+"""Resource estimates and limits used to admit workflow runs onto the workers.
+
+A run's memory estimate is the largest sum of per-step peaks over the steps that
+can run side by side; its CPU estimate is the sum of each step's historical
+seconds-per-byte scaled to the run's input size. Steps with no history fall back
+to ADMISSION_DEFAULT_STEP_MEMORY_MB and contribute no CPU estimate.
+"""
+import os
+import statistics
+import psutil
+from django.conf import settings
+from django.db import connection
+from app.cache import directory_size
+from app.dag import step_dependencies, topological_levels
+from app.models import WorkflowRun, WorkflowStepRun
+
+# Arbitrary key for the Postgres advisory lock that serializes admission decisions
+ADMISSION_LOCK_ID = 7305
+
+
+def path_bytes(path):
+    if not path or not os.path.exists(path):
+        return None
+    return directory_size(path) if os.path.isdir(path) else os.path.getsize(path)
+
+
+def step_history(step):
+    """Recent finished runs of the same wheel and model, in any workflow."""
+    return list(
+        WorkflowStepRun.objects
+        .filter(
+            workflow_step__wheel_file_id=step.wheel_file_id,
+            workflow_step__model_file_id=step.model_file_id,
+            end_time__isnull=False
+        )
+        .order_by('-end_time')
+        .values('start_time', 'end_time', 'input_bytes', 'peak_rss_mb')[:settings.ADMISSION_HISTORY_SIZE]
+    )
+
+
+def step_estimator(step):
+    """Function mapping an input size in bytes to (memory MB, CPU seconds or None) for one step."""
+    history = step_history(step)
+
+    peaks = [h['peak_rss_mb'] for h in history if h['peak_rss_mb']]
+    memory_mb = max(peaks) if peaks else settings.ADMISSION_DEFAULT_STEP_MEMORY_MB
+
+    rates = [
+        (h['end_time'] - h['start_time']).total_seconds() / h['input_bytes']
+        for h in history if h['input_bytes'] and h['start_time']
+    ]
+    seconds_per_byte = statistics.median(rates) if rates else None
+
+    def estimate(input_size=None):
+        cpu_seconds = seconds_per_byte * input_size if seconds_per_byte is not None and input_size else None
+        return memory_mb, cpu_seconds
+
+    return estimate
+
+
+def estimate_step(step, input_size=None):
+    return step_estimator(step)(input_size)
+
+
+def run_estimator(steps):
+    """Function mapping an input size to a run's (memory MB, CPU seconds or None).
+
+    History is read once, so a batch of runs over the same workflow costs a
+    handful of queries rather than a handful per run.
+    """
+    estimators = {step.step_number: step_estimator(step) for step in steps}
+    levels = topological_levels(step_dependencies(steps))
+
+    def estimate(input_size=None):
+        estimates = {number: estimator(input_size) for number, estimator in estimators.items()}
+        memory_mb = max((sum(estimates[n][0] for n in level) for level in levels), default=0)
+        cpu = [seconds for _, seconds in estimates.values() if seconds is not None]
+        return memory_mb, sum(cpu) if cpu else None
+
+    return estimate
+
+
+def estimate_run(steps, input_size=None):
+    return run_estimator(steps)(input_size)
+
+
+def lock_admission():
+    """Serialize admission for the current transaction; a no-op off Postgres."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [ADMISSION_LOCK_ID])
+
+
+def select_admissible(queued, running):
+    """Pick the queued runs (oldest first) that fit next to `running` within the caps."""
+    per_user, per_batch = {}, {}
+    for run in running:
+        per_user[run.run_by] = per_user.get(run.run_by, 0) + 1
+        if run.batch_id:
+            per_batch[run.batch_id] = per_batch.get(run.batch_id, 0) + 1
+    running_count = len(running)
+    memory_used = sum(run.estimated_memory_mb or 0 for run in running)
+
+    admitted = []
+    for run in queued:
+        if running_count >= settings.ADMISSION_MAX_RUNNING:
+            break
+        if per_user.get(run.run_by, 0) >= settings.ADMISSION_MAX_RUNNING_PER_USER:
+            continue
+        if run.batch_id and run.batch.max_concurrency and per_batch.get(run.batch_id, 0) >= run.batch.max_concurrency:
+            continue
+        memory = run.estimated_memory_mb or 0
+        # A run bigger than the whole budget still gets to go once nothing else is running
+        if running_count and memory_used + memory > settings.ADMISSION_MEMORY_BUDGET_MB:
+            # Stop rather than skip, so large runs aren't starved by smaller ones behind them
+            break
+
+        admitted.append(run)
+        running_count += 1
+        memory_used += memory
+        per_user[run.run_by] = per_user.get(run.run_by, 0) + 1
+        if run.batch_id:
+            per_batch[run.batch_id] = per_batch.get(run.batch_id, 0) + 1
+
+    return admitted
+
+
+def queue_position(workflow_run):
+    if workflow_run.status != WorkflowRun.QUEUED:
+        return None
+    return WorkflowRun.objects.filter(status=WorkflowRun.QUEUED, id__lt=workflow_run.id).count() + 1
+
+
+def free_memory_mb():
+    return psutil.virtual_memory().available // (1024 * 1024)
+
+
+def has_free_memory(required_mb):
+    """Whether this node can take a step needing `required_mb` and still keep its reserve."""
+    return free_memory_mb() >= (required_mb or 0) + settings.WORKER_MIN_FREE_MEMORY_MB
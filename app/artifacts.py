@@ -0,0 +1,164 @@
+"""Manifest of the files each step writes into its run's output folder.
+
+Steps record their artifacts when they finish, so the run views read an indexed
+table instead of walking the output folder on every request. Checksums are left
+blank at that point and filled in later by fill_checksums, on the evaluation
+queue, so hashing large outputs never holds up an inference worker. Folders
+changed by hand are brought back in line with reconcile_run (the
+reconcile_artifacts command).
+"""
+import os
+import re
+from datetime import datetime, timezone
+from django.conf import settings
+from app.cache import file_sha256, step_artifacts
+from app.evaluation import count_csv_rows
+from app.models import WorkflowArtifact
+from app.sharding import video_frame_info
+
+KINDS_BY_EXTENSION = {'.csv': 'csv', '.json': 'json', '.log': 'log'}
+
+UPDATE_FIELDS = ['workflow_step_run', 'step_number', 'kind', 'size', 'modified_at', 'duration_seconds', 'frames', 'checksum']
+
+STEP_PREFIX = re.compile(r'^(\d+)_')
+
+
+def artifact_kind(path):
+    name = path.lower()
+    if name.endswith(settings.VIDEO_EXTENSIONS):
+        return 'video'
+    if name.endswith(settings.IMAGE_EXTENSIONS):
+        return 'image'
+    return KINDS_BY_EXTENSION.get(os.path.splitext(name)[1], 'other')
+
+
+def modified_at(stat):
+    return datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+
+
+def describe(path):
+    """Kind, size, mtime and, where it applies, frame count and duration of one file.
+
+    The checksum is blank until fill_checksums hashes the file.
+    """
+    stat = os.stat(path)
+    info = {
+        'kind': artifact_kind(path),
+        'size': stat.st_size,
+        'modified_at': modified_at(stat),
+        'checksum': '',
+        'frames': None,
+        'duration_seconds': None,
+    }
+    if info['kind'] == 'video':
+        frames, fps = video_frame_info(path)
+        info['frames'] = frames or None
+        info['duration_seconds'] = round(frames / fps, 3) if frames and fps else None
+    elif info['kind'] == 'csv':
+        # One row per processed frame or image
+        info['frames'] = count_csv_rows(path)
+    return info
+
+
+def list_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        elif os.path.isfile(path):
+            yield path
+
+
+def save_artifacts(artifacts):
+    return WorkflowArtifact.objects.bulk_create(
+        artifacts,
+        update_conflicts=True,
+        unique_fields=['workflow_run', 'path'],
+        update_fields=UPDATE_FIELDS
+    )
+
+
+def record_step_artifacts(workflow_step_run, step_number, output_path, result):
+    """Record the outputs, result file and log of a finished step; re-runs overwrite their rows."""
+    paths = list(step_artifacts(result, step_number, output_path).values())
+    paths.append(os.path.join(output_path, f"{step_number}_result.json"))
+    if workflow_step_run.task_id:
+        paths.append(os.path.join(output_path, f"{workflow_step_run.task_id}.log"))
+
+    return save_artifacts([
+        WorkflowArtifact(
+            workflow_run_id=workflow_step_run.workflow_run_id,
+            workflow_step_run=workflow_step_run,
+            step_number=step_number,
+            path=os.path.relpath(path, settings.MEDIA_ROOT),
+            **describe(path)
+        )
+        for path in list_files(paths)
+    ])
+
+
+def fill_checksums(artifacts):
+    """Hash artifacts that have no checksum yet; returns how many were filled in.
+
+    Files that are gone or changed since they were recorded are skipped, and a
+    row re-recorded while its file was being hashed keeps its blank checksum.
+    """
+    filled = 0
+    for artifact in artifacts:
+        path = os.path.join(settings.MEDIA_ROOT, artifact.path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if stat.st_size != artifact.size or modified_at(stat) != artifact.modified_at:
+            continue
+        filled += WorkflowArtifact.objects.filter(
+            id=artifact.id, size=artifact.size, modified_at=artifact.modified_at, checksum=''
+        ).update(checksum=file_sha256(path))
+    return filled
+
+
+def reconcile_run(workflow_run):
+    """Sync a run's manifest with what is actually in its output folder.
+
+    Returns (added, updated, removed) counts. Files are re-described only when
+    they are new or their size or mtime changed.
+    """
+    folder = os.path.join(settings.MEDIA_ROOT, workflow_run.output or '')
+    on_disk = {
+        os.path.relpath(path, settings.MEDIA_ROOT): path
+        for path in (list_files([folder]) if workflow_run.output else [])
+    }
+    recorded = {artifact.path: artifact for artifact in workflow_run.artifacts.all()}
+
+    stale = [artifact.id for path, artifact in recorded.items() if path not in on_disk]
+    WorkflowArtifact.objects.filter(id__in=stale).delete()
+
+    step_runs = list(workflow_run.step_runs.select_related('workflow_step').order_by('id'))
+    by_number = {step_run.workflow_step.step_number: step_run for step_run in step_runs}
+    by_task = {step_run.task_id: step_run for step_run in step_runs if step_run.task_id}
+
+    changed = []
+    for relative_path, path in on_disk.items():
+        artifact = recorded.get(relative_path)
+        if artifact:
+            stat = os.stat(path)
+            if artifact.size == stat.st_size and artifact.modified_at == modified_at(stat):
+                continue
+
+        name = os.path.basename(path)
+        match = STEP_PREFIX.match(os.path.relpath(path, folder))
+        step_run = by_task.get(os.path.splitext(name)[0]) or (by_number.get(int(match.group(1))) if match else None)
+        changed.append(WorkflowArtifact(
+            workflow_run=workflow_run,
+            workflow_step_run=step_run,
+            step_number=step_run.workflow_step.step_number if step_run else None,
+            path=relative_path,
+            **describe(path)
+        ))
+    save_artifacts(changed)
+    fill_checksums(workflow_run.artifacts.filter(checksum=''))
+
+    added = sum(1 for artifact in changed if artifact.path not in recorded)
+    return added, len(changed) - added, len(stale)
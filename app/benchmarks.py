@@ -0,0 +1,121 @@
+"""Benchmark reports built from the step runs of a benchmark's measured runs.
+
+Each step gets p50/p95/p99 (plus mean, min and max) of its wall time, queue
+wait, frames per second, CPU seconds and peak RSS. Warmup runs are the first `warmup` runs
+of the benchmark and are left out.
+"""
+import numpy as np
+from django.db.models import Avg
+from app.models import ModelPerformance, WorkflowRun, WorkflowStepRun
+
+# Metric -> whether a higher value is better
+METRICS = {
+    'wall_seconds': False,
+    'queue_wait_seconds': False,
+    'fps': True,
+    'cpu_seconds': False,
+    'peak_rss_mb': False,
+}
+
+
+def summarize(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'p50': round(float(p50), 4),
+        'p95': round(float(p95), 4),
+        'p99': round(float(p99), 4),
+        'mean': round(float(np.mean(values)), 4),
+        'min': round(float(min(values)), 4),
+        'max': round(float(max(values)), 4),
+        'samples': len(values),
+    }
+
+
+def measured_runs(benchmark):
+    runs = list(WorkflowRun.objects.filter(batch_id=benchmark.batch_id).order_by('id'))
+    return runs[benchmark.warmup:]
+
+
+def build_report(benchmark):
+    runs = [run for run in measured_runs(benchmark) if run.status == WorkflowRun.FINISHED]
+
+    samples = {}
+    run_walls = {}
+    step_runs = (
+        WorkflowStepRun.objects
+        .filter(workflow_run__in=runs, end_time__isnull=False)
+        .select_related('workflow_step')
+    )
+    for step_run in step_runs:
+        wall = (step_run.end_time - step_run.start_time).total_seconds() if step_run.start_time else None
+        step = samples.setdefault(step_run.workflow_step.step_number, {metric: [] for metric in METRICS})
+        step['wall_seconds'].append(wall)
+        step['queue_wait_seconds'].append(step_run.queue_wait_seconds)
+        step['fps'].append(step_run.fps or (step_run.frames / wall if step_run.frames and wall else None))
+        step['cpu_seconds'].append(step_run.cpu_seconds)
+        step['peak_rss_mb'].append(step_run.peak_rss_mb)
+
+        first, last = run_walls.get(step_run.workflow_run_id, (None, None))
+        run_walls[step_run.workflow_run_id] = (
+            min(filter(None, [first, step_run.start_time])),
+            max(filter(None, [last, step_run.end_time]))
+        )
+
+    accuracy = dict(
+        ModelPerformance.objects
+        .filter(workflow_run__in=runs)
+        .values_list('workflow_step_run__workflow_step__step_number')
+        .annotate(Avg('accuracy'))
+    )
+
+    return {
+        'iterations': benchmark.iterations,
+        'warmup': benchmark.warmup,
+        'runs': [run.id for run in runs],
+        'total_wall_seconds': summarize([(end - start).total_seconds() for start, end in run_walls.values()]),
+        'steps': {
+            str(number): dict(
+                {metric: summarize(values) for metric, values in metrics.items()},
+                accuracy=accuracy.get(number)
+            )
+            for number, metrics in sorted(samples.items())
+        },
+    }
+
+
+def compare_reports(report, baseline_report, threshold):
+    """Steps and metrics whose p50 or p95 got worse than the baseline by more than `threshold` (a fraction)."""
+    regressions = []
+    for number, step in report.get('steps', {}).items():
+        baseline_step = baseline_report.get('steps', {}).get(number)
+        if not baseline_step:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            current, baseline = step.get(metric), baseline_step.get(metric)
+            if not current or not baseline:
+                continue
+            for stat in ('p50', 'p95'):
+                if not baseline[stat]:
+                    continue
+                change = (current[stat] - baseline[stat]) / baseline[stat]
+                if (-change if higher_is_better else change) > threshold:
+                    regressions.append({
+                        'step_number': int(number),
+                        'metric': metric,
+                        'stat': stat,
+                        'baseline': baseline[stat],
+                        'current': current[stat],
+                        'change': round(change, 4),
+                    })
+    return regressions
+
+
+def finalize_benchmark(benchmark, threshold):
+    benchmark.report = build_report(benchmark)
+    if benchmark.baseline and benchmark.baseline.report:
+        benchmark.regressions = compare_reports(benchmark.report, benchmark.baseline.report, threshold)
+    benchmark.save(update_fields=['report', 'regressions'])
+    return benchmark
@@ -0,0 +1,282 @@
+import fcntl
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from django.conf import settings
+
+LAST_USED_MARKER = '.last_used'
+
+
+# Keyed on (path, size, mtime_ns), so repeated steps don't rehash unchanged files;
+# bounded because workers live for days and hash every file they are given
+@functools.lru_cache(maxsize=4096)
+def _sha256(real_path, size, mtime_ns, chunk_size):
+    digest = hashlib.sha256()
+    with open(real_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    stat = os.stat(path)
+    return _sha256(os.path.realpath(path), stat.st_size, stat.st_mtime_ns, chunk_size)
+
+
+def directory_size(path):
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.lstat(os.path.join(root, file)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def touch_entry(entry_path):
+    marker = os.path.join(entry_path, LAST_USED_MARKER)
+    with open(marker, 'a'):
+        pass
+    os.utime(marker, None)
+
+
+def last_used(entry_path):
+    try:
+        return os.stat(os.path.join(entry_path, LAST_USED_MARKER)).st_mtime
+    except OSError:
+        return os.stat(entry_path).st_mtime
+
+
+@contextmanager
+def cache_lock(root):
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, '.lock'), 'w') as lock_fh:
+        fcntl.flock(lock_fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_fh, fcntl.LOCK_UN)
+
+
+def evict_lru(root, max_bytes, keep=(), min_age=0):
+    """Remove least recently used entries of a cache root until it fits in max_bytes.
+
+    Must be called with the root's cache_lock held. Entries used in the last
+    `min_age` seconds are never evicted, since a running step may still be reading them.
+    """
+    entries = []
+    for name in os.listdir(root):
+        entry_path = os.path.join(root, name)
+        if name.startswith('.') or not os.path.isdir(entry_path):
+            continue
+        entries.append((last_used(entry_path), entry_path, directory_size(entry_path)))
+
+    total = sum(size for _, _, size in entries)
+    now = time.time()
+    for used_at, entry_path, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if entry_path in keep or now - used_at < min_age:
+            continue
+        shutil.rmtree(entry_path, ignore_errors=True)
+        total -= size
+
+    return total
+
+
+def _flatten_wheel_data(env_dir):
+    # Wheels may ship modules under <name>.data/purelib or platlib; pip installs
+    # those into site-packages, so lift them to the environment root as well.
+    for name in os.listdir(env_dir):
+        if not name.endswith('.data'):
+            continue
+        for scheme in ('purelib', 'platlib'):
+            scheme_dir = os.path.join(env_dir, name, scheme)
+            if not os.path.isdir(scheme_dir):
+                continue
+            for item in os.listdir(scheme_dir):
+                target = os.path.join(env_dir, item)
+                if not os.path.exists(target):
+                    shutil.move(os.path.join(scheme_dir, item), target)
+
+
+def get_wheel_env(whl_path):
+    """Return (sha256, directory) of the unpacked wheel, unpacking it on first use.
+
+    Each distinct wheel is extracted once into WHEEL_CACHE_ROOT/<sha256>/ and can be
+    put on sys.path directly, so steps no longer pip install into the shared site-packages.
+    """
+    root = settings.WHEEL_CACHE_ROOT
+    digest = file_sha256(whl_path)
+    env_dir = os.path.join(root, digest)
+
+    with cache_lock(root):
+        # Touched under the lock, so eviction can't remove the env between this lookup and its use
+        if os.path.isdir(env_dir):
+            touch_entry(env_dir)
+            return digest, env_dir
+
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=root)
+        try:
+            with zipfile.ZipFile(whl_path, 'r') as z:
+                z.extractall(tmp_dir)
+            _flatten_wheel_data(tmp_dir)
+            os.rename(tmp_dir, env_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        touch_entry(env_dir)
+        evict_lru(root, settings.WHEEL_CACHE_MAX_BYTES, keep={env_dir}, min_age=settings.WHEEL_CACHE_MIN_AGE)
+
+    return digest, env_dir
+
+
+# Folder digests by real path, with the (name, size, mtime) listing they were computed from.
+# Image folders hold tens of thousands of files, far more than the file memo above keeps.
+FOLDER_MEMO_SIZE = 256
+_folder_digests = {}
+_folder_lock = threading.Lock()
+
+
+def path_sha256(path, chunk_size=1024 * 1024):
+    """sha256 of a file, or of every file (with its relative path) under a folder.
+
+    A folder whose listing hasn't changed since it was last hashed is only stat'ed.
+    """
+    if not os.path.isdir(path):
+        return file_sha256(path, chunk_size)
+
+    entries = []
+    listing = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for file in sorted(files):
+            file_path = os.path.join(root, file)
+            stat = os.stat(file_path)
+            relative = os.path.relpath(file_path, path)
+            entries.append((relative, file_path, stat.st_size, stat.st_mtime_ns))
+            listing.update(f'{relative}\0{stat.st_size}\0{stat.st_mtime_ns}\n'.encode())
+
+    real_path = os.path.realpath(path)
+    listing = listing.hexdigest()
+    with _folder_lock:
+        memo = _folder_digests.get(real_path)
+    if memo and memo[0] == listing:
+        return memo[1]
+
+    digest = hashlib.sha256()
+    for relative, file_path, size, mtime_ns in entries:
+        digest.update(relative.encode())
+        # Unmemoized, so one folder doesn't push every wheel and model out of the file memo
+        digest.update(_sha256.__wrapped__(file_path, size, mtime_ns, chunk_size).encode())
+    digest = digest.hexdigest()
+
+    with _folder_lock:
+        _folder_digests.pop(real_path, None)
+        _folder_digests[real_path] = (listing, digest)
+        while len(_folder_digests) > FOLDER_MEMO_SIZE:
+            del _folder_digests[next(iter(_folder_digests))]
+    return digest
+
+
+def step_cache_key(input_path, whl_path, model_path, classes_path, input_type):
+    parts = [path_sha256(p) if p and os.path.exists(p) else '' for p in (input_path, whl_path, model_path, classes_path)]
+    parts.append(input_type or '')
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+
+def _link_or_copy(source, target):
+    # Hard links make restoring large videos free when cache and media share a filesystem
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+    return target
+
+
+def _copy_artifact(source, target):
+    if os.path.isdir(source):
+        shutil.copytree(source, target, copy_function=_link_or_copy, dirs_exist_ok=True)
+    else:
+        _link_or_copy(source, target)
+
+
+def step_artifacts(result, step_number, output_path):
+    """Map result fields to the files a step produced, falling back to the default file names."""
+    artifacts = {
+        'csv_file': result.get('csv_file') or os.path.join(output_path, f"{step_number}_results.csv"),
+        'video_file': result.get('video_file') or os.path.join(output_path, f"{step_number}_output.mp4"),
+        'image_folder': result.get('image_folder'),
+    }
+    return {field: path for field, path in artifacts.items() if path and os.path.exists(path)}
+
+
+def _restore_name(field, stored_name, step_number):
+    if field == 'csv_file':
+        return f"{step_number}_results.csv"
+    if field == 'video_file':
+        return f"{step_number}_output.mp4"
+    return stored_name
+
+
+def store_step_result(key, step_number, output_path, result):
+    root = settings.STEP_CACHE_ROOT
+    entry_path = os.path.join(root, key)
+    if os.path.isdir(entry_path):
+        return entry_path
+
+    os.makedirs(root, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=root)
+    try:
+        stored = {}
+        for field, path in step_artifacts(result, step_number, output_path).items():
+            name = os.path.relpath(path, output_path) if field == 'image_folder' else os.path.basename(path)
+            if name.startswith('..'):
+                name = os.path.basename(path)
+            stored[field] = name
+            _copy_artifact(path, os.path.join(tmp_dir, field))
+
+        with open(os.path.join(tmp_dir, 'result.json'), 'w') as f:
+            json.dump({'result': result, 'artifacts': stored}, f)
+
+        with cache_lock(root):
+            if os.path.isdir(entry_path):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            else:
+                os.rename(tmp_dir, entry_path)
+            touch_entry(entry_path)
+            evict_lru(root, settings.STEP_CACHE_MAX_BYTES, keep={entry_path})
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return entry_path
+
+
+def load_step_result(key, step_number, output_path):
+    """Copy a cached step's artifacts into output_path and return its result dict, or None on a miss."""
+    entry_path = os.path.join(settings.STEP_CACHE_ROOT, key)
+    try:
+        with open(os.path.join(entry_path, 'result.json')) as f:
+            cached = json.load(f)
+        touch_entry(entry_path)
+    except (OSError, ValueError):
+        return None
+
+    result = dict(cached['result'], output_path=output_path)
+    os.makedirs(output_path, exist_ok=True)
+    for field, stored_name in cached['artifacts'].items():
+        target = os.path.join(output_path, _restore_name(field, stored_name, step_number))
+        _copy_artifact(os.path.join(entry_path, field), target)
+        result[field] = target
+
+    return result
@@ -0,0 +1,137 @@
+def step_dependencies(steps):
+    """Map each step_number to the sorted step_numbers it waits on.
+
+    Workflows whose steps declare no dependencies keep the original behaviour of
+    a linear chain ordered by step_number.
+    """
+    declared = {
+        step.step_number: sorted(upstream.step_number for upstream in step.depends_on.all())
+        for step in steps
+    }
+    if any(declared.values()):
+        return declared
+
+    numbers = sorted(declared)
+    return {number: numbers[index - 1:index] if index else [] for index, number in enumerate(numbers)}
+
+
+def topological_levels(dependencies, completed=()):
+    """Group step_numbers into levels whose steps only depend on earlier levels.
+
+    Steps in `completed` are treated as already satisfied and left out.
+    Raises ValueError for unknown dependencies or cycles.
+    """
+    completed = set(completed)
+    remaining = {number: set(upstream) - completed for number, upstream in dependencies.items() if number not in completed}
+
+    for number, upstream in remaining.items():
+        unknown = upstream - set(remaining)
+        if unknown:
+            raise ValueError(f"Step {number} depends on unknown step(s) {sorted(unknown)}.")
+
+    levels = []
+    while remaining:
+        ready = sorted(number for number, upstream in remaining.items() if not upstream)
+        if not ready:
+            raise ValueError(f"Steps {sorted(remaining)} have circular dependencies.")
+        levels.append(ready)
+        for number in ready:
+            del remaining[number]
+        for upstream in remaining.values():
+            upstream.difference_update(ready)
+
+    return levels
+
+
+def execution_plan(dependencies, completed=()):
+    """Nest a step DAG into chains, groups and chords so each step waits only on its inputs.
+
+    Returns a step_number, ("chain", [plans]), ("group", [plans]) or
+    ("chord", [header plans], body plan); None when every step is completed.
+    Independent branches become a group, a step with one input follows it in a
+    chain, and a step with several inputs is the body of a chord over them.
+    Graphs that aren't series-parallel (1->3, 2->3, 2->4) can't be nested
+    exactly without running a step twice; there a join also waits for the
+    private descendants of its inputs (3 waits for 4 too).
+    Raises ValueError for unknown dependencies or cycles.
+    """
+    remaining = {number for level in topological_levels(dependencies, completed) for number in level}
+    if not remaining:
+        return None
+    return _plan(remaining, {number: set(dependencies[number]) & remaining for number in remaining})
+
+
+def _components(numbers, upstream):
+    """Split step_numbers into groups not connected by any dependency."""
+    neighbours = {number: set() for number in numbers}
+    for number in numbers:
+        for other in upstream[number] & numbers:
+            neighbours[number].add(other)
+            neighbours[other].add(number)
+
+    components, seen = [], set()
+    for number in sorted(numbers):
+        if number in seen:
+            continue
+        component, pending = set(), [number]
+        while pending:
+            current = pending.pop()
+            if current not in component:
+                component.add(current)
+                pending.extend(neighbours[current] - component)
+        seen |= component
+        components.append(component)
+    return components
+
+
+def _plan(numbers, upstream):
+    plans = [_plan_connected(component, upstream) for component in _components(numbers, upstream)]
+    return plans[0] if len(plans) == 1 else ("group", plans)
+
+
+def _plan_connected(numbers, upstream):
+    local = {number: upstream[number] & numbers for number in numbers}
+    sources = sorted(number for number in numbers if not local[number])
+
+    if len(sources) == 1:
+        rest = numbers - set(sources)
+        if not rest:
+            return sources[0]
+        after = _plan(rest, upstream)
+        return ("chain", [sources[0]] + (after[1] if isinstance(after, tuple) and after[0] == "chain" else [after]))
+
+    # Which sources each step descends from; steps reached from one source only run in that source's branch
+    origins = {}
+    for level in topological_levels(local):
+        for number in level:
+            origins[number] = set().union(*(origins[other] for other in local[number])) if local[number] else {number}
+    branches = [{number for number in numbers if origins[number] == {source}} for source in sources]
+    joined = numbers - set().union(*branches)
+    return ("chord", [_plan(branch, upstream) for branch in branches], _plan(joined, upstream))
+
+
+def collect_step_results(prev_result, seed_results=None):
+    """Flatten what Celery hands a step (one result, or a list from a chord) into {step_number: result}."""
+    results = {int(number): result for number, result in (seed_results or {}).items()}
+
+    pending = [prev_result]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, (list, tuple)):
+            pending.extend(item)
+        elif isinstance(item, dict):
+            for number, result in item.get("history", {}).items():
+                results.setdefault(int(number), result)
+            if "step_number" in item:
+                results[int(item["step_number"])] = {key: value for key, value in item.items() if key != "history"}
+
+    return results
+
+
+def resolve_input_path(result):
+    return (
+        result.get("video_file")
+        or result.get("image_folder")
+        or result.get("csv_file")
+        or result.get("output_path")
+    )
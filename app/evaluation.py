@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+FRAME_COLUMN = 'Frame No'
+COUNT_COLUMN = 'Object Count'
+
+
+def count_csv_rows(csv_path):
+    """Data rows in a CSV with a header line, without parsing it."""
+    lines, last = 0, b'\n'
+    with open(csv_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def read_counts(csv_path, chunksize):
+    """Stream a results CSV into sorted, de-duplicated frame/count arrays.
+
+    Any other numeric column is treated as a per-class count and summed. When a
+    frame appears more than once, its last row wins.
+    """
+    frames, counts, class_totals = [], [], {}
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        frames.append(chunk[FRAME_COLUMN].to_numpy(dtype=np.int64))
+        counts.append(chunk[COUNT_COLUMN].to_numpy(dtype=np.float64))
+        for column in chunk.columns:
+            if column in (FRAME_COLUMN, COUNT_COLUMN) or not pd.api.types.is_numeric_dtype(chunk[column]):
+                continue
+            class_totals[column] = class_totals.get(column, 0) + chunk[column].sum()
+
+    frames = np.concatenate(frames) if frames else np.empty(0, dtype=np.int64)
+    counts = np.concatenate(counts) if counts else np.empty(0, dtype=np.float64)
+
+    # np.unique keeps the first occurrence, so run it over the reversed arrays
+    unique_frames, first_in_reversed = np.unique(frames[::-1], return_index=True)
+    last_index = len(frames) - 1 - first_in_reversed
+
+    return unique_frames, counts[last_index], {name: float(total) for name, total in class_totals.items()}
+
+
+def evaluate_results(ground_truth_path, model_result_path, chunksize=500_000):
+    """Compare a model's per-frame object counts against the ground truth.
+
+    Frames are aligned with a sorted intersection rather than per-frame lookups.
+    Returns exact-match accuracy (percent), MAE, RMSE, the number of compared
+    frames and per-class count totals for both files.
+    """
+    gt_frames, gt_counts, gt_classes = read_counts(ground_truth_path, chunksize)
+    model_frames, model_counts, model_classes = read_counts(model_result_path, chunksize)
+
+    _, gt_index, model_index = np.intersect1d(gt_frames, model_frames, assume_unique=True, return_indices=True)
+    difference = model_counts[model_index] - gt_counts[gt_index]
+
+    if len(difference):
+        accuracy = float(np.mean(difference == 0) * 100)
+        mae = float(np.mean(np.abs(difference)))
+        rmse = float(np.sqrt(np.mean(difference ** 2)))
+    else:
+        accuracy = mae = rmse = 0.0
+
+    return {
+        'accuracy': round(accuracy, 2),
+        'mae': round(mae, 4),
+        'rmse': round(rmse, 4),
+        'frames_evaluated': int(len(difference)),
+        'class_counts': {'ground_truth': gt_classes, 'model': model_classes},
+    }
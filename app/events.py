@@ -0,0 +1,199 @@
+"""Run state events, published by the tasks and streamed to clients as server-sent events.
+
+On PostgreSQL events go through LISTEN/NOTIFY on one channel per run, so web and
+worker processes need nothing besides the database they already share. Each web
+process listens on a single shared connection and fans notifications out to its
+streams' queues. Other databases skip NOTIFY and publish straight to those
+queues, which is enough for eager/dev setups.
+"""
+import json
+import os
+import queue
+import select
+import threading
+import time
+from django.db import DatabaseError, connection
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer
+
+_local_subscribers = {}
+_local_lock = threading.Lock()
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+class EventStreamRenderer(BaseRenderer):
+    media_type = 'text/event-stream'
+    format = 'txt'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return format_event('error', data)
+
+
+def channel_name(run_id):
+    return f"workflow_run_{int(run_id)}"
+
+
+def uses_notify():
+    return connection.vendor == 'postgresql'
+
+
+def deliver(message):
+    """Hand an event to this process's subscribers of its run."""
+    with _local_lock:
+        subscribers = list(_local_subscribers.get(message["run_id"], ()))
+    for subscriber in subscribers:
+        subscriber.put(message)
+
+
+def publish(run_id, event, **data):
+    message = dict(data, event=event, run_id=run_id, time=timezone.now().isoformat())
+
+    if not uses_notify():
+        deliver(message)
+        return
+
+    try:
+        # Delivered when the surrounding transaction (if any) commits
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [channel_name(run_id), json.dumps(message, default=str)])
+    except DatabaseError as e:
+        # Events are best effort and must never fail the step
+        print("Event publish failed:", e)
+
+
+class Listener:
+    """The process's one LISTEN connection, shared by all of its event streams.
+
+    A daemon thread waits on the connection and delivers notifications; streams
+    only add and remove channels. If the connection drops it is reopened and
+    every channel listened to again.
+    """
+    POLL_SECONDS = 1
+    RECONNECT_SECONDS = 5
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.database = connection.Database
+        self.connection_params = connection.get_connection_params()
+        self.new_connection = connection.get_new_connection
+        self.lock = threading.Lock()
+        # Channel -> number of open subscriptions to it
+        self.channels = {}
+        self.connection = self.connect()
+        threading.Thread(target=self.run, name="event-listener", daemon=True).start()
+
+    def connect(self):
+        # LISTEN needs its own autocommit connection, apart from any request's
+        listener = self.new_connection(self.connection_params)
+        listener.autocommit = True
+        with listener.cursor() as cursor:
+            for channel in self.channels:
+                cursor.execute(f'LISTEN "{channel}"')
+        return listener
+
+    def listen(self, channel):
+        with self.lock:
+            if channel not in self.channels:
+                with self.connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{channel}"')
+            self.channels[channel] = self.channels.get(channel, 0) + 1
+
+    def unlisten(self, channel):
+        with self.lock:
+            self.channels[channel] -= 1
+            if self.channels[channel]:
+                return
+            del self.channels[channel]
+            try:
+                with self.connection.cursor() as cursor:
+                    cursor.execute(f'UNLISTEN "{channel}"')
+            except self.database.Error:
+                # The run loop reconnects, and only re-listens to channels still open
+                pass
+
+    def run(self):
+        while True:
+            try:
+                readable = select.select([self.connection], [], [], self.POLL_SECONDS)[0]
+                with self.lock:
+                    if readable:
+                        self.connection.poll()
+                    notifies = list(self.connection.notifies)
+                    self.connection.notifies.clear()
+            except (self.database.Error, OSError, ValueError) as e:
+                print("Event listener lost its connection:", e)
+                self.reconnect()
+                continue
+
+            for notify in notifies:
+                deliver(json.loads(notify.payload))
+
+    def reconnect(self):
+        while True:
+            time.sleep(self.RECONNECT_SECONDS)
+            with self.lock:
+                try:
+                    self.connection.close()
+                except self.database.Error:
+                    pass
+                try:
+                    self.connection = self.connect()
+                    return
+                except self.database.Error as e:
+                    print("Event listener reconnect failed:", e)
+
+
+def shared_listener():
+    global _listener
+    with _listener_lock:
+        # A forked worker can't share its parent's connection or thread
+        if _listener is None or _listener.pid != os.getpid():
+            _listener = Listener()
+        return _listener
+
+
+class Subscription:
+    """Events for one run, read with get(timeout) until close()."""
+
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.queue = queue.Queue()
+        with _local_lock:
+            _local_subscribers.setdefault(run_id, []).append(self.queue)
+
+        self.listener = shared_listener() if uses_notify() else None
+        if self.listener is not None:
+            try:
+                self.listener.listen(channel_name(run_id))
+            except Exception:
+                self.remove_queue()
+                raise
+
+    def get(self, timeout):
+        """Wait up to `timeout` seconds and return the events that arrived, possibly none."""
+        try:
+            events = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait())
+        return events
+
+    def close(self):
+        self.remove_queue()
+        if self.listener is not None:
+            self.listener.unlisten(channel_name(self.run_id))
+
+    def remove_queue(self):
+        with _local_lock:
+            subscribers = _local_subscribers.get(self.run_id, [])
+            if self.queue in subscribers:
+                subscribers.remove(self.queue)
+            if not subscribers:
+                _local_subscribers.pop(self.run_id, None)
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
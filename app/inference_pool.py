@@ -0,0 +1,277 @@
+import atexit
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Connection
+import psutil
+from django.conf import settings
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "inference_worker.py")
+
+
+class InferenceError(Exception):
+    def __init__(self, message, worker_traceback=""):
+        super().__init__(message)
+        self.worker_traceback = worker_traceback
+
+
+def _worker_env():
+    env = dict(os.environ)
+    if settings.INFERENCE_THREADS:
+        # Keep each worker to its share of the cores so concurrent steps don't oversubscribe
+        for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS"):
+            env[name] = str(settings.INFERENCE_THREADS)
+    # Applied by the worker itself before the wheel is imported
+    env["INFERENCE_WORKER_MAX_VMEM_MB"] = str(settings.INFERENCE_WORKER_MAX_VMEM_MB)
+    return env
+
+
+class ResourceSampler:
+    """CPU time, I/O bytes and peak RSS of a worker's process tree while one job runs on it."""
+
+    def __init__(self, pid):
+        self.process = psutil.Process(pid)
+        self.peak_rss = 0
+        self.start = self._own_usage()
+
+    def _own_usage(self):
+        # Descendants the worker has waited on are already folded into its own counters
+        cpu = self.process.cpu_times()
+        return (cpu.user + cpu.system + cpu.children_user + cpu.children_system, *_io_bytes(self.process))
+
+    def sample(self):
+        """Track peak RSS and return the (CPU seconds, read bytes, write bytes) of the live descendants."""
+        cpu_seconds, read, write = 0.0, 0, 0
+        rss = self.process.memory_info().rss
+        for child in self.process.children(recursive=True):
+            try:
+                with child.oneshot():
+                    cpu = child.cpu_times()
+                    child_read, child_write = _io_bytes(child)
+                    rss += child.memory_info().rss
+            except psutil.Error:
+                continue
+            cpu_seconds += cpu.user + cpu.system
+            read += child_read
+            write += child_write
+        self.peak_rss = max(self.peak_rss, rss)
+        return cpu_seconds, read, write
+
+    def usage(self):
+        try:
+            live = self.sample()
+            own = self._own_usage()
+        except psutil.Error:
+            return {}
+        cpu_seconds, read_bytes, write_bytes = (o - s + l for o, s, l in zip(own, self.start, live))
+        return {
+            "cpu_seconds": round(cpu_seconds, 3),
+            "read_bytes": read_bytes,
+            "write_bytes": write_bytes,
+            "peak_rss": self.peak_rss,
+        }
+
+
+def _io_bytes(process):
+    try:
+        io = process.io_counters()
+    except (AttributeError, psutil.AccessDenied):
+        # Not every platform exposes per-process I/O counters
+        return 0, 0
+    return io.read_bytes, io.write_bytes
+
+
+class InferenceWorker:
+    """A warm, isolated interpreter holding one wheel's inference module and model in memory."""
+
+    def __init__(self, key, env_dir, model_path):
+        self.key = key
+        self.jobs = 0
+        self.sampler = None
+        self.usage = {}
+        self.last_used = time.monotonic()
+
+        parent_sock, child_sock = socket.socketpair()
+        try:
+            self.process = subprocess.Popen(
+                [sys.executable, "-I", WORKER_SCRIPT, str(child_sock.fileno()), env_dir, model_path or ""],
+                pass_fds=(child_sock.fileno(),),
+                stdin=subprocess.DEVNULL,
+                env=_worker_env(),
+                start_new_session=True,
+            )
+        finally:
+            child_sock.close()
+        self.conn = Connection(parent_sock.detach())
+
+        message = self._recv()
+        if message[0] != "ready":
+            self.close()
+            raise InferenceError(message[1], message[2])
+
+    def _recv(self):
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError):
+            # The socket can close before the process is gone; reap it so the pool sees it dead
+            try:
+                code = self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                code = self.process.wait()
+            raise InferenceError(f"Inference worker exited unexpectedly (exit code {code})")
+
+    def _next_message(self):
+        max_rss = settings.INFERENCE_WORKER_MAX_RSS_MB * 1024 * 1024
+        while not self.conn.poll(1.0):
+            if not self.alive():
+                break
+            if self.sampler:
+                try:
+                    self.sampler.sample()
+                except psutil.Error:
+                    pass
+            if settings.INFERENCE_KILL_OVER_RSS and self.rss() > max_rss:
+                self.process.kill()
+                self.process.wait()
+                raise InferenceError(f"Inference worker exceeded {settings.INFERENCE_WORKER_MAX_RSS_MB} MB RSS and was killed")
+        return self._recv()
+
+    def _wait_for_reply(self, on_progress=None):
+        while True:
+            message = self._next_message()
+            if message[0] != "progress":
+                return message
+            if on_progress:
+                on_progress(message[1])
+
+    def run(self, on_progress=None, **kwargs):
+        if settings.INFERENCE_CPU_LIMIT_SECONDS:
+            kwargs.setdefault("cpu_limit", settings.INFERENCE_CPU_LIMIT_SECONDS)
+        if on_progress:
+            kwargs["progress_interval"] = settings.PROGRESS_UPDATE_INTERVAL
+        self.sampler = ResourceSampler(self.process.pid)
+        self.conn.send(("run", kwargs))
+        message = self._wait_for_reply(on_progress)
+        self.usage = self.sampler.usage()
+        self.sampler = None
+        self.jobs += 1
+        self.last_used = time.monotonic()
+
+        if message[0] == "error":
+            raise InferenceError(message[1], message[2])
+        if len(message) > 2 and message[2]:
+            # The worker's own peak for this job also catches spikes between samples
+            self.usage["peak_rss"] = max(self.usage.get("peak_rss", 0), message[2])
+        return message[1]
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def rss(self):
+        try:
+            return psutil.Process(self.process.pid).memory_info().rss
+        except psutil.Error:
+            return 0
+
+    def should_recycle(self):
+        return (
+            not self.alive()
+            or self.jobs >= settings.INFERENCE_WORKER_MAX_JOBS
+            or self.rss() > settings.INFERENCE_WORKER_MAX_RSS_MB * 1024 * 1024
+        )
+
+    def close(self):
+        try:
+            if self.alive():
+                self.conn.send(("stop",))
+            self.process.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        finally:
+            self.conn.close()
+
+
+_idle_workers = {}
+_pool_lock = threading.Lock()
+
+
+def _idle_too_long(worker, now):
+    max_idle = settings.INFERENCE_WORKER_MAX_IDLE_SECONDS
+    return bool(max_idle) and now - worker.last_used > max_idle
+
+
+def _checkout(key, env_dir, model_path):
+    retired = []
+    with _pool_lock:
+        workers = _idle_workers.get(key, [])
+        now = time.monotonic()
+        while workers:
+            worker = workers.pop()
+            if worker.alive() and not _idle_too_long(worker, now):
+                break
+            retired.append(worker)
+        else:
+            worker = None
+
+    for stale in retired:
+        stale.close()
+    return worker or InferenceWorker(key, env_dir, model_path)
+
+
+def _checkin(worker):
+    if worker.should_recycle():
+        worker.close()
+        return
+
+    retired = []
+    with _pool_lock:
+        _idle_workers.setdefault(worker.key, []).append(worker)
+
+        # Each idle worker keeps a model resident, so cap how many we hold on to and for how long
+        idle = sorted((w for ws in _idle_workers.values() for w in ws), key=lambda w: w.last_used)
+        excess = max(0, len(idle) - settings.INFERENCE_POOL_MAX_IDLE)
+        now = time.monotonic()
+        for index, stale in enumerate(idle):
+            if index < excess or _idle_too_long(stale, now):
+                _idle_workers[stale.key].remove(stale)
+                retired.append(stale)
+
+    for stale in retired:
+        stale.close()
+
+
+def run_inference(wheel_hash, env_dir, model_path, on_progress=None, stats=None, **kwargs):
+    """Run one step on a warm worker for (wheel_hash, model_path), starting one if none is idle.
+
+    `on_progress` is called in this process with each progress dict the wheel reports.
+    When `stats` is a dict, the job's CPU seconds, read/write bytes and peak RSS
+    in bytes are stored in it as "cpu_seconds", "read_bytes", "write_bytes" and "peak_rss".
+    """
+    worker = _checkout((wheel_hash, model_path), env_dir, model_path)
+    try:
+        result = worker.run(model_path=model_path, on_progress=on_progress, **kwargs)
+        if stats is not None:
+            stats.update(worker.usage)
+    except InferenceError:
+        # The job failed but the worker answered (or died, which _checkin notices)
+        _checkin(worker)
+        raise
+    except Exception:
+        worker.close()
+        raise
+    _checkin(worker)
+    return result
+
+
+@atexit.register
+def shutdown():
+    with _pool_lock:
+        workers = [w for ws in _idle_workers.values() for w in ws]
+        _idle_workers.clear()
+    for worker in workers:
+        worker.close()
@@ -0,0 +1,195 @@
+"""Long-lived inference process started by app.inference_pool.
+
+Usage: python -I inference_worker.py <connection fd> <wheel env dir> [model path]
+
+The wheel's `inference.inference` module is imported once, and when the wheel
+exposes `load_model(model_path)` the loaded model is kept and handed to every
+`run_inference` call as `model=`. Jobs arrive as ("run", kwargs) messages.
+
+Each job runs with its own working directory (the step's output folder), its
+stdout/stderr (including output from native libraries) sent to the step's log
+file, and an optional CPU-seconds limit. Wheels whose `run_inference` accepts
+`progress_callback` get one; calling it as `progress_callback(frames_done, total_frames)`
+sends throttled ("progress", {...}) messages back before the job's result.
+Results are sent as ("result", value, peak RSS bytes of that job or None).
+"""
+import importlib
+import inspect
+import os
+import resource
+import sys
+import time
+import traceback
+from contextlib import contextmanager
+from multiprocessing.connection import Connection
+
+
+def load_resident_model(module, model_path):
+    if model_path and hasattr(module, "load_model"):
+        return module.load_model(model_path)
+    return None
+
+
+@contextmanager
+def redirect_output(log_file):
+    if not log_file:
+        yield
+        return
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = os.dup(1), os.dup(2)
+    log_fd = os.open(log_file, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    os.dup2(log_fd, 1)
+    os.dup2(log_fd, 2)
+    os.close(log_fd)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved_fds[0], 1)
+        os.dup2(saved_fds[1], 2)
+        os.close(saved_fds[0])
+        os.close(saved_fds[1])
+
+
+@contextmanager
+def cpu_limit(seconds):
+    if not seconds:
+        yield
+        return
+
+    # RLIMIT_CPU counts the whole process lifetime, so allow `seconds` on top of what is used
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    limit = int(usage.ru_utime + usage.ru_stime) + seconds
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def accepts_argument(function, name):
+    try:
+        parameters = inspect.signature(function).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(p.name == name or p.kind == p.VAR_KEYWORD for p in parameters)
+
+
+def progress_sender(conn, interval):
+    started = time.monotonic()
+    last_sent = [0.0]
+
+    def progress_callback(frames_done, total_frames=None):
+        now = time.monotonic()
+        finished = total_frames is not None and frames_done >= total_frames
+        if now - last_sent[0] < interval and not finished:
+            return
+        last_sent[0] = now
+        elapsed = now - started
+        conn.send(("progress", {
+            "frames_done": int(frames_done),
+            "total_frames": int(total_frames) if total_frames is not None else None,
+            "fps": round(frames_done / elapsed, 2) if elapsed > 0 else 0.0,
+        }))
+
+    return progress_callback
+
+
+def run_job(module, model, kwargs, conn):
+    log_file = kwargs.pop("log_file", None)
+    cpu_seconds = kwargs.pop("cpu_limit", None)
+    progress_interval = kwargs.pop("progress_interval", None)
+    if model is not None:
+        kwargs["model"] = model
+    if progress_interval is not None and accepts_argument(module.run_inference, "progress_callback"):
+        kwargs["progress_callback"] = progress_sender(conn, progress_interval)
+
+    cwd = os.getcwd()
+    if kwargs.get("output_path"):
+        os.chdir(kwargs["output_path"])
+    try:
+        with redirect_output(log_file), cpu_limit(cpu_seconds):
+            return module.run_inference(**kwargs)
+    finally:
+        os.chdir(cwd)
+
+
+def reset_peak_rss():
+    """Start a new peak RSS window for this process; False where the kernel doesn't allow it.
+
+    ru_maxrss only ever grows, so on a warm worker it would report the heaviest
+    job so far rather than the current one.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    """Peak RSS in bytes since the last reset_peak_rss(), or None when unavailable."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def main(argv):
+    conn = Connection(int(argv[1]))
+    env_dir = argv[2]
+    model_path = argv[3] if len(argv) > 3 and argv[3] else None
+
+    # Only the wheel environment should shadow site-packages, not this script's folder
+    sys.path[0:1] = [env_dir]
+
+    max_vmem_mb = int(os.environ.get("INFERENCE_WORKER_MAX_VMEM_MB") or 0)
+    if max_vmem_mb:
+        hard = resource.getrlimit(resource.RLIMIT_AS)[1]
+        limit = max_vmem_mb * 1024 * 1024
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+    try:
+        module = importlib.import_module("inference.inference")
+        model = load_resident_model(module, model_path)
+    except BaseException as e:
+        conn.send(("error", f"{type(e).__name__}: {e}", traceback.format_exc()))
+        return 1
+
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+
+        if message[0] == "stop":
+            break
+
+        try:
+            measured = reset_peak_rss()
+            result = run_job(module, model, dict(message[1]), conn)
+            # This job's own peak, resident model included; None leaves it to the pool's sampling
+            conn.send(("result", result, peak_rss() if measured else None))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}", traceback.format_exc()))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,85 @@
+"""The model leaderboard: one ModelLeaderboardEntry per (wheel, model, ground truth).
+
+Entries are folded forward as evaluate_performance writes ModelPerformance rows,
+so serving the leaderboard never touches the performance table. Deleting runs
+doesn't take their rows back out; rebuild_leaderboard recomputes from scratch.
+"""
+from django.db import transaction
+from app.models import ModelLeaderboardEntry, ModelPerformance
+
+
+def entry_key(performance):
+    step = performance.workflow_step_run.workflow_step
+    return step.wheel_file_id, step.model_file_id, step.ground_truth_file_id
+
+
+def fold(entry, performances):
+    """Add performance rows (oldest first) to an entry's aggregates."""
+    for performance in performances:
+        entry.run_count += 1
+        entry.latest_run_id = performance.workflow_run_id
+
+        if performance.accuracy is not None:
+            entry.accuracy_sum += performance.accuracy
+            entry.accuracy_samples += 1
+            if entry.best_accuracy is None or performance.accuracy > entry.best_accuracy:
+                entry.best_accuracy = performance.accuracy
+            entry.latest_accuracy = performance.accuracy
+
+        step_run = performance.workflow_step_run
+        if step_run.start_time and step_run.end_time:
+            entry.step_seconds_sum += (step_run.end_time - step_run.start_time).total_seconds()
+            entry.step_seconds_samples += 1
+
+    if entry.accuracy_samples:
+        entry.mean_accuracy = entry.accuracy_sum / entry.accuracy_samples
+    if entry.step_seconds_samples:
+        entry.mean_step_seconds = entry.step_seconds_sum / entry.step_seconds_samples
+    return entry
+
+
+def record_performances(performances):
+    """Fold newly created performance rows into their entries.
+
+    Their step runs and steps should already be loaded. Entry rows are locked
+    while they're updated, so concurrent evaluations of different runs don't
+    lose each other's counts.
+    """
+    grouped = {}
+    for performance in sorted(performances, key=lambda p: p.id or 0):
+        grouped.setdefault(entry_key(performance), []).append(performance)
+
+    with transaction.atomic():
+        # A fixed lock order keeps two evaluations from deadlocking on each other's entries
+        for (wheel_id, model_id, ground_truth_id), rows in sorted(grouped.items(), key=lambda item: tuple(i or 0 for i in item[0])):
+            # The entry's unique constraint treats a missing file as 0, so two evaluations
+            # creating the same entry at once end up sharing it even when a file is null
+            entry, _ = ModelLeaderboardEntry.objects.get_or_create(
+                wheel_file_id=wheel_id,
+                model_file_id=model_id,
+                ground_truth_file_id=ground_truth_id
+            )
+            entry = ModelLeaderboardEntry.objects.select_for_update().get(id=entry.id)
+            fold(entry, rows).save()
+
+
+def rebuild_leaderboard(chunk_size=2000):
+    """Recompute every entry from the performance table; returns the number of entries."""
+    entries = {}
+    performances = (
+        ModelPerformance.objects
+        .select_related('workflow_step_run__workflow_step')
+        .order_by('id')
+        .iterator(chunk_size=chunk_size)
+    )
+    for performance in performances:
+        key = entry_key(performance)
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = ModelLeaderboardEntry(wheel_file_id=key[0], model_file_id=key[1], ground_truth_file_id=key[2])
+        fold(entry, [performance])
+
+    with transaction.atomic():
+        ModelLeaderboardEntry.objects.all().delete()
+        ModelLeaderboardEntry.objects.bulk_create(entries.values(), batch_size=chunk_size)
+    return len(entries)
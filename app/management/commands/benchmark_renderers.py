@@ -0,0 +1,72 @@
+"""
+Management command to measure JSON render time and bytes on the wire for the run and
+model performance listings, comparing DRF's JSON renderer with FastJSONRenderer and
+identity/gzip/brotli encodings. Payloads are built from the current database through
+the real list views.
+"""
+
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import resolve, reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from utils.middleware import brotli, compress
+from utils.renderers import FastJSONRenderer, orjson
+
+PAYLOADS = [
+    ('runs', 'all_workflow_runs', {}),
+    ('runs expanded', 'all_workflow_runs', {'expand': 'workflow.input,workflow.steps.wheel_file,workflow.steps.model_file,workflow.steps.class_file,workflow.steps.ground_truth_file'}),
+    ('performance', 'model_performance_list', {}),
+]
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON rendering and response compression on the large list endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=500,
+            help='Rows per payload (capped by API_MAX_PAGE_SIZE)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Renders per measurement; the fastest is reported',
+        )
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed; FastJSONRenderer falls back to the json module'))
+        encodings = ['gzip'] + (['br'] if brotli is not None else [])
+
+        self.stdout.write(f"{'payload':<16}{'rows':>6}{'renderer':>18}{'render ms':>11}{'bytes':>11}" + ''.join(f'{name:>9}' for name in encodings))
+        for label, url_name, params in PAYLOADS:
+            data = self.payload(url_name, dict(params, page_size=options['page_size']))
+            rows = len(data.get('results', []))
+            for renderer in (JSONRenderer(), FastJSONRenderer()):
+                seconds, content = self.render(renderer, data, options['repeat'])
+                sizes = ''.join(f'{len(compress(content, name)):>9}' for name in encodings)
+                self.stdout.write(f'{label:<16}{rows:>6}{type(renderer).__name__:>18}{seconds * 1000:>11.2f}{len(content):>11}{sizes}')
+
+        if brotli is None:
+            self.stdout.write(self.style.WARNING('brotli is not installed; responses are only gzip compressed'))
+
+    def payload(self, url_name, params):
+        request = APIRequestFactory().get(reverse(url_name), params)
+        force_authenticate(request, user=get_user_model()(username='benchmark'))
+        match = resolve(request.path)
+        with override_settings(RESPONSE_CACHE_ENABLED=False):
+            return match.func(request, *match.args, **match.kwargs).data
+
+    def render(self, renderer, data, repeat):
+        best = None
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            content = renderer.render(data)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, content
@@ -0,0 +1,24 @@
+"""
+Management command to recompute the model leaderboard from the ModelPerformance table.
+Needed after runs are deleted, since the leaderboard is only ever added to.
+"""
+
+from django.core.management.base import BaseCommand
+from app.leaderboard import rebuild_leaderboard
+
+class Command(BaseCommand):
+    help = 'Rebuild the model leaderboard from all recorded model performance rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Performance rows read per query',
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_leaderboard(chunk_size=options['chunk_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {count} leaderboard entries')
+        )
@@ -0,0 +1,35 @@
+"""
+Management command to bring the artifact manifest in line with the run output folders.
+Needed after output folders are edited by hand, and once to index runs that finished
+before artifacts were recorded.
+"""
+
+from django.core.management.base import BaseCommand
+from app.artifacts import reconcile_run
+from app.models import WorkflowRun
+
+class Command(BaseCommand):
+    help = 'Re-scan workflow run output folders and update their artifact manifests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'run_ids',
+            nargs='*',
+            type=int,
+            help='Runs to reconcile (default: every run with an output folder)',
+        )
+
+    def handle(self, *args, **options):
+        runs = WorkflowRun.objects.exclude(output__isnull=True).exclude(output='').order_by('id')
+        if options['run_ids']:
+            runs = runs.filter(id__in=options['run_ids'])
+
+        totals = [0, 0, 0]
+        for run in runs.iterator():
+            counts = reconcile_run(run)
+            totals = [total + count for total, count in zip(totals, counts)]
+
+        added, updated, removed = totals
+        self.stdout.write(
+            self.style.SUCCESS(f'Artifacts added: {added}, updated: {updated}, removed: {removed}')
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_alter_workflowstep_wheel_file_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflowstep',
+            name='depends_on',
+            field=models.ManyToManyField(blank=True, related_name='dependents', to='app.workflowstep'),
+        ),
+    ]
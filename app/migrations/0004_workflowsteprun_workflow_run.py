@@ -0,0 +1,19 @@
+# Generated by Django 4.2.21 on 2026-10-18 13:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_workflowstep_depends_on'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflowsteprun',
+            name='workflow_run',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='step_runs', to='app.workflowrun'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.21 on 2026-10-18 13:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_workflowsteprun_workflow_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelperformance',
+            name='class_counts',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='modelperformance',
+            name='frames_evaluated',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='modelperformance',
+            name='mae',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='modelperformance',
+            name='rmse',
+            field=models.FloatField(null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.21 on 2026-10-18 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_modelperformance_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflowsteprun',
+            name='shard_task_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='workflowsteprun',
+            name='task_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
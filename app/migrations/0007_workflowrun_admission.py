@@ -0,0 +1,51 @@
+# Generated by Django 4.2.21 on 2026-10-18 13:43
+
+from django.db import migrations, models
+
+
+def set_existing_status(apps, schema_editor):
+    # Runs from before admission control were dispatched immediately
+    WorkflowRun = apps.get_model('app', 'WorkflowRun')
+    WorkflowRun.objects.filter(error=True).update(status='failed')
+    WorkflowRun.objects.filter(error=False).update(status='finished')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_workflowsteprun_task_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflowrun',
+            name='admitted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workflowrun',
+            name='estimated_cpu_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workflowrun',
+            name='estimated_memory_mb',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workflowrun',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('finished', 'Finished'), ('failed', 'Failed')], default='queued', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='workflowsteprun',
+            name='input_bytes',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workflowsteprun',
+            name='peak_rss_mb',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(set_existing_status, migrations.RunPython.noop),
+    ]
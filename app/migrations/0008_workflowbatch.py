@@ -0,0 +1,39 @@
+# Generated by Django 4.2.21 on 2026-10-18 13:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_workflowrun_admission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflowrun',
+            name='input_path',
+            field=models.CharField(blank=True, max_length=1024),
+        ),
+        migrations.CreateModel(
+            name='WorkflowBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_by', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('max_concurrency', models.PositiveIntegerField(blank=True, null=True)),
+                ('total_runs', models.PositiveIntegerField(default=0)),
+                ('finished_runs', models.PositiveIntegerField(default=0)),
+                ('failed_runs', models.PositiveIntegerField(default=0)),
+                ('mean_accuracy', models.FloatField(blank=True, null=True)),
+                ('workflow', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batches', to='app.workflow')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='workflowrun',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='app.workflowbatch'),
+        ),
+    ]
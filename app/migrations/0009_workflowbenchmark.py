@@ -0,0 +1,44 @@
+# Generated by Django 4.2.21 on 2026-10-18 13:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_workflowbatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflowrun',
+            name='cache_enabled',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='workflowsteprun',
+            name='frames',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workflowsteprun',
+            name='queue_wait_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='WorkflowBenchmark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_by', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+                ('iterations', models.PositiveIntegerField()),
+                ('warmup', models.PositiveIntegerField(default=0)),
+                ('report', models.JSONField(blank=True, null=True)),
+                ('regressions', models.JSONField(blank=True, null=True)),
+                ('baseline', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='compared_benchmarks', to='app.workflowbenchmark')),
+                ('batch', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='benchmark', to='app.workflowbatch')),
+                ('workflow', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='benchmarks', to='app.workflow')),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.21 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_workflowbenchmark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflowsteprun',
+            name='cpu_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workflowsteprun',
+            name='fps',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workflowsteprun',
+            name='read_bytes',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workflowsteprun',
+            name='write_bytes',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.21 on 2026-10-18 13:54
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_workflowsteprun_resources'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='modelperformance',
+            index=models.Index(models.OrderBy(django.db.models.functions.comparison.Coalesce('accuracy', models.Value(-1.0)), descending=True), name='modelperf_accuracy_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workflow',
+            index=models.Index(fields=['-pinned', '-id'], name='app_workflo_pinned_28ba76_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workflowrun',
+            index=models.Index(fields=['workflow', '-id'], name='app_workflo_workflo_d8327b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workflowrun',
+            index=models.Index(fields=['run_by', '-id'], name='app_workflo_run_by_8e3c4d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workflowrun',
+            index=models.Index(fields=['status', '-id'], name='app_workflo_status_41e65a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workflowrun',
+            index=models.Index(fields=['error', '-id'], name='app_workflo_error_9cae1f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workflowrun',
+            index=models.Index(fields=['start_time'], name='app_workflo_start_t_bdabe7_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.21 on 2026-10-18 13:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0002_listing_indexes'),
+        ('app', '0011_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelLeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_count', models.PositiveIntegerField(default=0)),
+                ('best_accuracy', models.FloatField(null=True)),
+                ('mean_accuracy', models.FloatField(null=True)),
+                ('latest_accuracy', models.FloatField(null=True)),
+                ('mean_step_seconds', models.FloatField(null=True)),
+                ('accuracy_sum', models.FloatField(default=0)),
+                ('accuracy_samples', models.PositiveIntegerField(default=0)),
+                ('step_seconds_sum', models.FloatField(default=0)),
+                ('step_seconds_samples', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ground_truth_file', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='files.uploadedgroundtruthfile')),
+                ('latest_run', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.workflowrun')),
+                ('model_file', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='files.uploadedmodelfile')),
+                ('wheel_file', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='files.uploadedwheelfile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-best_accuracy'], name='app_modelle_best_ac_f11a17_idx'), models.Index(fields=['-mean_accuracy'], name='app_modelle_mean_ac_62aef5_idx'), models.Index(fields=['-latest_accuracy'], name='app_modelle_latest__828a63_idx')],
+                'unique_together': {('wheel_file', 'model_file', 'ground_truth_file')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.21 on 2026-10-18 14:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_modelleaderboardentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkflowArtifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('step_number', models.PositiveIntegerField(blank=True, null=True)),
+                ('path', models.CharField(max_length=1024)),
+                ('kind', models.CharField(max_length=16)),
+                ('size', models.BigIntegerField()),
+                ('modified_at', models.DateTimeField()),
+                ('duration_seconds', models.FloatField(blank=True, null=True)),
+                ('frames', models.IntegerField(blank=True, null=True)),
+                ('checksum', models.CharField(blank=True, max_length=64)),
+                ('recorded_at', models.DateTimeField(auto_now=True)),
+                ('workflow_run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='artifacts', to='app.workflowrun')),
+                ('workflow_step_run', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='artifacts', to='app.workflowsteprun')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['workflow_run', 'kind', 'path'], name='app_workflo_workflo_a14f7d_idx')],
+                'unique_together': {('workflow_run', 'path')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.21 on 2026-10-18 14:20
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_scores(apps, schema_editor):
+    # Keep the first row written for each step run
+    ModelPerformance = apps.get_model('app', 'ModelPerformance')
+    first_ids = (
+        ModelPerformance.objects
+        .values('workflow_step_run')
+        .annotate(first_id=Min('id'))
+        .values('first_id')
+    )
+    ModelPerformance.objects.exclude(id__in=first_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_workflowartifact'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_scores, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='modelperformance',
+            constraint=models.UniqueConstraint(fields=('workflow_step_run',), name='modelperf_unique_step_run'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.21 on 2026-10-18 14:27
+
+import app.models
+from django.db import migrations, models
+
+
+def merge_duplicate_entries(apps, schema_editor):
+    # Entries with a null file could be created twice; fold each extra one into the oldest
+    ModelLeaderboardEntry = apps.get_model('app', 'ModelLeaderboardEntry')
+    entries, updated_at = {}, {}
+    for entry in ModelLeaderboardEntry.objects.order_by('id'):
+        key = (entry.wheel_file_id, entry.model_file_id, entry.ground_truth_file_id)
+        kept = entries.setdefault(key, entry)
+        if kept is entry:
+            updated_at[key] = entry.updated_at
+            continue
+
+        kept.run_count += entry.run_count
+        kept.accuracy_sum += entry.accuracy_sum
+        kept.accuracy_samples += entry.accuracy_samples
+        kept.step_seconds_sum += entry.step_seconds_sum
+        kept.step_seconds_samples += entry.step_seconds_samples
+        if entry.best_accuracy is not None and (kept.best_accuracy is None or entry.best_accuracy > kept.best_accuracy):
+            kept.best_accuracy = entry.best_accuracy
+        if entry.updated_at >= updated_at[key]:
+            updated_at[key] = entry.updated_at
+            kept.latest_accuracy = entry.latest_accuracy
+            kept.latest_run_id = entry.latest_run_id
+        if kept.accuracy_samples:
+            kept.mean_accuracy = kept.accuracy_sum / kept.accuracy_samples
+        if kept.step_seconds_samples:
+            kept.mean_step_seconds = kept.step_seconds_sum / kept.step_seconds_samples
+        kept.save()
+        entry.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_modelperformance_unique_step_run'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_entries, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='modelleaderboardentry',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='modelleaderboardentry',
+            constraint=models.UniqueConstraint(app.models.IdOrZero('wheel_file'), app.models.IdOrZero('model_file'), app.models.IdOrZero('ground_truth_file'), name='leaderboard_entry_unique_files'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from files.models import UploadedWheelFile, UploadedModelFile, UploadedInputFile, UploadedClassFile, UploadedGroundTruthFile
 
 # Create your models here.
@@ -22,6 +24,9 @@ class Workflow(models.Model):
 
     class Meta:
         ordering = ['-pinned']
+        indexes = [
+            models.Index(fields=['-pinned', '-id']),
+        ]
 
     def __str__(self):
         return self.name
@@ -35,6 +40,7 @@ class WorkflowStep(models.Model):
     ground_truth_file = models.ForeignKey(UploadedGroundTruthFile, null=True, on_delete=models.CASCADE)
     result_file = models.CharField(max_length=2048, blank=True)
     input_type = models.CharField(max_length=24, blank=True)
+    depends_on = models.ManyToManyField('self', symmetrical=False, blank=True, related_name='dependents')
 
     class Meta:
         unique_together = ('workflow', 'step_number')
@@ -45,8 +51,19 @@ class WorkflowStep(models.Model):
 
 class WorkflowStepRun(models.Model):
     workflow_step = models.ForeignKey(WorkflowStep, on_delete=models.CASCADE, related_name='run_steps')
+    workflow_run = models.ForeignKey('WorkflowRun', null=True, on_delete=models.CASCADE, related_name='step_runs')
     start_time = models.DateTimeField(auto_now_add=True, null=True)
     end_time = models.DateTimeField(null=True)
+    task_id = models.CharField(max_length=255, blank=True)
+    shard_task_ids = models.JSONField(default=list, blank=True)
+    input_bytes = models.BigIntegerField(null=True, blank=True)
+    peak_rss_mb = models.IntegerField(null=True, blank=True)
+    cpu_seconds = models.FloatField(null=True, blank=True)
+    read_bytes = models.BigIntegerField(null=True, blank=True)
+    write_bytes = models.BigIntegerField(null=True, blank=True)
+    frames = models.IntegerField(null=True, blank=True)
+    fps = models.FloatField(null=True, blank=True)
+    queue_wait_seconds = models.FloatField(null=True, blank=True)
 
     class Meta:
         ordering = ['end_time']
@@ -54,7 +71,32 @@ class WorkflowStepRun(models.Model):
     def __str__(self):
         return f"{self.workflow_step.workflow.name} - Step {self.workflow_step.step_number}"
 
+class WorkflowBatch(models.Model):
+    workflow = models.ForeignKey(Workflow, on_delete=models.CASCADE, related_name='batches')
+    created_by = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, null=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    max_concurrency = models.PositiveIntegerField(null=True, blank=True)
+    total_runs = models.PositiveIntegerField(default=0)
+    finished_runs = models.PositiveIntegerField(default=0)
+    failed_runs = models.PositiveIntegerField(default=0)
+    mean_accuracy = models.FloatField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.workflow.name} - Batch {self.id}"
+
 class WorkflowRun(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FINISHED, 'Finished'),
+        (FAILED, 'Failed'),
+    ]
+
     workflow = models.ForeignKey(Workflow, on_delete=models.CASCADE, related_name='workflowrun')
     start_time = models.DateTimeField(auto_now_add=True, null=True)
     end_time = models.DateTimeField(null=True)
@@ -63,14 +105,128 @@ class WorkflowRun(models.Model):
     error = models.BooleanField(default=False)
     error_message = models.CharField(max_length=255, blank=True)
     task_id = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    estimated_memory_mb = models.IntegerField(null=True, blank=True)
+    estimated_cpu_seconds = models.FloatField(null=True, blank=True)
+    admitted_at = models.DateTimeField(null=True, blank=True)
+    batch = models.ForeignKey(WorkflowBatch, null=True, blank=True, on_delete=models.CASCADE, related_name='runs')
+    # Relative to MEDIA_ROOT; empty means the workflow's own input
+    input_path = models.CharField(max_length=1024, blank=True)
+    cache_enabled = models.BooleanField(default=True)
+
+    class Meta:
+        # Listings page newest first by id, so each filter gets an index ending in -id
+        indexes = [
+            models.Index(fields=['workflow', '-id']),
+            models.Index(fields=['run_by', '-id']),
+            models.Index(fields=['status', '-id']),
+            models.Index(fields=['error', '-id']),
+            models.Index(fields=['start_time']),
+        ]
 
     def __str__(self):
         return self.workflow.name
 
+class WorkflowBenchmark(models.Model):
+    workflow = models.ForeignKey(Workflow, on_delete=models.CASCADE, related_name='benchmarks')
+    # Benchmark runs are a batch limited to one run at a time
+    batch = models.OneToOneField(WorkflowBatch, on_delete=models.CASCADE, related_name='benchmark')
+    baseline = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='compared_benchmarks')
+    created_by = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, null=True)
+    iterations = models.PositiveIntegerField()
+    warmup = models.PositiveIntegerField(default=0)
+    report = models.JSONField(null=True, blank=True)
+    regressions = models.JSONField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.workflow.name} - Benchmark {self.id}"
+
+class WorkflowArtifact(models.Model):
+    """A file a step wrote into its run's output folder, recorded when the step finished."""
+    workflow_run = models.ForeignKey(WorkflowRun, on_delete=models.CASCADE, related_name='artifacts')
+    workflow_step_run = models.ForeignKey(WorkflowStepRun, null=True, blank=True, on_delete=models.SET_NULL, related_name='artifacts')
+    step_number = models.PositiveIntegerField(null=True, blank=True)
+    # Relative to MEDIA_ROOT
+    path = models.CharField(max_length=1024)
+    kind = models.CharField(max_length=16)
+    size = models.BigIntegerField()
+    modified_at = models.DateTimeField()
+    duration_seconds = models.FloatField(null=True, blank=True)
+    frames = models.IntegerField(null=True, blank=True)
+    checksum = models.CharField(max_length=64, blank=True)
+    recorded_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('workflow_run', 'path')
+        indexes = [
+            models.Index(fields=['workflow_run', 'kind', 'path']),
+        ]
+
+    def __str__(self):
+        return self.path
+
 class ModelPerformance(models.Model):
     workflow_run = models.ForeignKey(WorkflowRun, null=False, on_delete=models.CASCADE, related_name='performance_workflow_run')
     workflow_step_run = models.ForeignKey(WorkflowStepRun, null=False, on_delete=models.CASCADE, related_name='performance_workflow_step_run')
     accuracy = models.FloatField(null=True)
+    mae = models.FloatField(null=True)
+    rmse = models.FloatField(null=True)
+    frames_evaluated = models.IntegerField(null=True)
+    class_counts = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Matches the leaderboard ordering, which ranks missing accuracy as -1
+            models.Index(Coalesce('accuracy', Value(-1.0)).desc(), name='modelperf_accuracy_rank_idx'),
+        ]
+        constraints = [
+            # A step run is scored once, however many evaluations of its run overlap
+            models.UniqueConstraint(fields=['workflow_step_run'], name='modelperf_unique_step_run'),
+        ]
+
+    def __str__(self):
+        return self.workflow_run.workflow.name
+
+class IdOrZero(models.Func):
+    """A nullable foreign key's id, with 0 standing in for null."""
+    function = 'COALESCE'
+    template = '%(function)s(%(expressions)s, 0)'
+    output_field = models.BigIntegerField()
+
+class ModelLeaderboardEntry(models.Model):
+    """Running aggregate of the ModelPerformance rows for one wheel, model and ground truth."""
+    wheel_file = models.ForeignKey(UploadedWheelFile, null=True, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    model_file = models.ForeignKey(UploadedModelFile, null=True, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    ground_truth_file = models.ForeignKey(UploadedGroundTruthFile, null=True, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    run_count = models.PositiveIntegerField(default=0)
+    best_accuracy = models.FloatField(null=True)
+    mean_accuracy = models.FloatField(null=True)
+    latest_accuracy = models.FloatField(null=True)
+    mean_step_seconds = models.FloatField(null=True)
+    # Running sums, so a new row updates the means without rereading the old ones
+    accuracy_sum = models.FloatField(default=0)
+    accuracy_samples = models.PositiveIntegerField(default=0)
+    step_seconds_sum = models.FloatField(default=0)
+    step_seconds_samples = models.PositiveIntegerField(default=0)
+    latest_run = models.ForeignKey(WorkflowRun, null=True, on_delete=models.SET_NULL, related_name='+')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # unique_together wouldn't stop two entries with a null file, as nulls never compare equal
+            models.UniqueConstraint(
+                IdOrZero('wheel_file'),
+                IdOrZero('model_file'),
+                IdOrZero('ground_truth_file'),
+                name='leaderboard_entry_unique_files'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['-best_accuracy']),
+            models.Index(fields=['-mean_accuracy']),
+            models.Index(fields=['-latest_accuracy']),
+        ]
 
     def __str__(self):
-        return self.workflow_run.workflow.name
\ No newline at end of file
+        return f"{self.wheel_file} / {self.model_file} / {self.ground_truth_file}"
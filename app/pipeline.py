@@ -0,0 +1,310 @@
+import json
+import os
+from datetime import timedelta
+from celery import chain, chord, group
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from backend.celery import app as celery_app
+from app import admission, events
+from app.models import WorkflowBatch, WorkflowRun, WorkflowStepRun
+from app.dag import execution_plan, step_dependencies
+from app.tasks import run_whl_task, chain_step_wrapper, step_queue, update_batch_summary
+
+# Task states that mean a run's canvas will never get any further
+LOST_TASK_STATES = ('FAILURE', 'REVOKED')
+
+
+def media_path(relative_path):
+    return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+
+def run_input_path(workflow_run):
+    relative_path = workflow_run.input_path or (workflow_run.workflow.input.path if workflow_run.workflow.input else None)
+    return media_path(relative_path) if relative_path else None
+
+
+def folder_inputs(folder):
+    """Inputs found directly under a MEDIA_ROOT folder: videos, images and image folders."""
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    folder_path = os.path.realpath(media_path(folder))
+    if not folder_path.startswith(media_root + os.sep) or not os.path.isdir(folder_path):
+        raise ValueError(f'{folder} is not a folder under the media root.')
+
+    inputs = []
+    for name in sorted(os.listdir(folder_path)):
+        path = os.path.join(folder_path, name)
+        if name.startswith('.'):
+            continue
+        if os.path.isdir(path) or name.lower().endswith(settings.VIDEO_EXTENSIONS + settings.IMAGE_EXTENSIONS):
+            inputs.append(os.path.relpath(path, media_root))
+    return inputs
+
+
+def workflow_steps(workflow):
+    return list(
+        workflow.steps
+        .select_related('wheel_file', 'model_file', 'class_file', 'ground_truth_file')
+        .prefetch_related('depends_on')
+    )
+
+
+def step_task_kwargs(workflow_run, step):
+    return {
+        'run_id': workflow_run.id,
+        'step_number': step.step_number,
+        'step_id': step.id,
+        'whl_path': media_path(step.wheel_file.path),
+        'output_path': media_path(workflow_run.output),
+        'classes_path': media_path(step.class_file.path),
+        'ground_truth_path': media_path(step.ground_truth_file.path),
+        'model_path': media_path(step.model_file.path) if step.model_file else None,
+        'input_type': step.input_type.lower(),
+    }
+
+
+def completed_step_results(workflow_run):
+    """Results of the steps that already finished in this run, read back from its output folder."""
+    output_path = media_path(workflow_run.output)
+    finished = (
+        # Step runs recorded before they were linked to their run are found through ModelPerformance
+        WorkflowStepRun.objects
+        .filter(Q(workflow_run=workflow_run) | Q(performance_workflow_step_run__workflow_run=workflow_run))
+        .filter(end_time__isnull=False)
+        .order_by()
+        .values_list('workflow_step__step_number', flat=True)
+        .distinct()
+    )
+
+    completed = {}
+    for number in finished:
+        try:
+            with open(os.path.join(output_path, f"{number}_result.json")) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            # Older runs only have the output files
+            result = {'output_path': output_path}
+            for field, name in (('csv_file', f"{number}_results.csv"), ('video_file', f"{number}_output.mp4")):
+                if os.path.exists(os.path.join(output_path, name)):
+                    result[field] = os.path.join(output_path, name)
+            if len(result) == 1:
+                continue
+
+        completed[number] = dict(result, step_number=number)
+
+    return completed
+
+
+def plan_canvas(plan, signatures):
+    if not isinstance(plan, tuple):
+        return signatures[plan]
+    parts = [plan_canvas(part, signatures) for part in plan[1]]
+    if plan[0] == "chain":
+        return chain(*parts)
+    if plan[0] == "group":
+        return group(parts)
+    return chord(parts, plan_canvas(plan[2], signatures))
+
+
+def build_workflow_canvas(workflow_run, completed=None):
+    """Compile a run's step DAG into a Celery canvas.
+
+    Independent branches run as a group of chains and a step with several
+    inputs is the body of a chord over them, so each step starts as soon as
+    the steps it depends on are done (see app.dag.execution_plan).
+    `completed` maps step_number -> result for steps that are already done.
+    """
+    completed = completed or {}
+    steps = workflow_steps(workflow_run.workflow)
+    by_number = {step.step_number: step for step in steps}
+    dependencies = step_dependencies(steps)
+    plan = execution_plan(dependencies, completed=completed)
+
+    if plan is None:
+        raise ValueError('This workflow has no steps left to run.')
+
+    signatures = {}
+    for number, step in by_number.items():
+        if number in completed:
+            continue
+        kwargs = step_task_kwargs(workflow_run, step)
+        upstream = dependencies[number]
+
+        if not upstream:
+            # Roots ignore whatever a preceding canvas returns
+            signature = run_whl_task.si(
+                input_path=run_input_path(workflow_run),
+                **kwargs
+            )
+        elif all(other in completed for other in upstream):
+            # Every upstream step already finished in an earlier attempt
+            signature = chain_step_wrapper.si(None, upstream=upstream, seed_results=completed, **kwargs)
+        else:
+            signature = chain_step_wrapper.s(upstream=upstream, seed_results=completed, **kwargs)
+
+        signatures[number] = signature.set(queue=step_queue(kwargs['input_type']))
+
+    return plan_canvas(plan, signatures)
+
+
+def queue_runs(workflow_runs):
+    """Estimate each run's resources and put the runs in the admission queue."""
+    estimators = {}
+    for workflow_run in workflow_runs:
+        if workflow_run.workflow_id not in estimators:
+            estimators[workflow_run.workflow_id] = admission.run_estimator(workflow_steps(workflow_run.workflow))
+        estimate = estimators[workflow_run.workflow_id]
+        workflow_run.estimated_memory_mb, workflow_run.estimated_cpu_seconds = estimate(
+            admission.path_bytes(run_input_path(workflow_run))
+        )
+        workflow_run.status = WorkflowRun.QUEUED
+
+    WorkflowRun.objects.bulk_update(
+        workflow_runs,
+        ['estimated_memory_mb', 'estimated_cpu_seconds', 'status', 'error', 'error_message', 'end_time']
+    )
+
+    queued_ids = list(WorkflowRun.objects.filter(status=WorkflowRun.QUEUED).order_by('id').values_list('id', flat=True))
+    positions = {run_id: index + 1 for index, run_id in enumerate(queued_ids)}
+    for workflow_run in workflow_runs:
+        events.publish(workflow_run.id, "queued", position=positions.get(workflow_run.id))
+
+
+def queue_run(workflow_run):
+    queue_runs([workflow_run])
+
+
+def create_batch(workflow, run_by, input_paths, max_concurrency=None, cache_enabled=True):
+    """Create a batch with one queued run per input; raises ValueError when the workflow can't run."""
+    with transaction.atomic():
+        batch = WorkflowBatch.objects.create(
+            workflow=workflow,
+            created_by=run_by,
+            max_concurrency=max_concurrency,
+            total_runs=len(input_paths)
+        )
+        runs = WorkflowRun.objects.bulk_create([
+            WorkflowRun(
+                workflow=workflow,
+                start_time=timezone.now(),
+                run_by=run_by,
+                batch=batch,
+                input_path=input_path,
+                cache_enabled=cache_enabled
+            )
+            for input_path in input_paths
+        ])
+        for workflow_run in runs:
+            workflow_run.output = f"output/{workflow.name}_{workflow_run.id}/"
+        WorkflowRun.objects.bulk_update(runs, ['output'])
+
+        # Every run shares the workflow's graph, so checking one is enough
+        build_workflow_canvas(runs[0])
+        queue_runs(runs)
+
+    return batch, runs
+
+
+def fail_run(workflow_run, error_message):
+    workflow_run.status = WorkflowRun.FAILED
+    workflow_run.error = True
+    workflow_run.error_message = error_message[:255]
+    workflow_run.save()
+    events.publish(workflow_run.id, "failed", error_message=error_message)
+    update_batch_summary(workflow_run.batch_id)
+
+
+def dispatch_runs(workflow_runs):
+    """Start admitted runs, all in one Celery group when there are several."""
+    canvases, started = [], []
+    for workflow_run in workflow_runs:
+        try:
+            canvases.append(build_workflow_canvas(workflow_run, completed=completed_step_results(workflow_run)))
+            started.append(workflow_run)
+        except ValueError as e:
+            fail_run(workflow_run, str(e))
+
+    if not canvases:
+        return []
+
+    try:
+        if len(canvases) == 1:
+            results = [canvases[0].apply_async()]
+        else:
+            results = group(canvases).apply_async().results
+    except Exception as e:
+        # The broker refused the canvases; failing the runs gives their capacity back
+        for workflow_run in started:
+            fail_run(workflow_run, f"Could not dispatch the run: {e}")
+        return []
+
+    for workflow_run, result in zip(started, results):
+        workflow_run.task_id = result.id
+    # The steps update the runs' status themselves, possibly before we get here
+    WorkflowRun.objects.bulk_update(started, ['task_id'])
+    for workflow_run in started:
+        events.publish(workflow_run.id, "started", task_id=workflow_run.task_id)
+    return started
+
+
+def run_task_ids(workflow_run):
+    """The run's canvas task and the step and shard tasks of its unfinished steps."""
+    task_ids = [workflow_run.task_id]
+    for step_run in workflow_run.step_runs.filter(end_time__isnull=True):
+        task_ids.append(step_run.task_id)
+        task_ids.extend(step_run.shard_task_ids or [])
+    return [task_id for task_id in task_ids if task_id]
+
+
+def lost_run_error(workflow_run):
+    """Why a running run will never finish on its own, or None while it still can.
+
+    A step that raises fails its run itself. One whose worker process dies or hits
+    a time limit leaves only a FAILURE state behind, which Celery also copies to
+    the rest of the chain. A run admitted but never handed to the broker has no
+    task id once the dispatch grace period is over.
+    """
+    if not workflow_run.task_id:
+        dispatch_deadline = timezone.now() - timedelta(seconds=settings.ADMISSION_DISPATCH_GRACE_SECONDS)
+        if workflow_run.admitted_at and workflow_run.admitted_at < dispatch_deadline:
+            return "The run was admitted but never dispatched."
+        return None
+
+    for task_id in run_task_ids(workflow_run):
+        result = celery_app.AsyncResult(task_id)
+        if result.state in LOST_TASK_STATES:
+            return f"Task {task_id} ended in {result.state} without finishing the run: {result.result}"
+    return None
+
+
+@celery_app.task(name="tasks.admit_queued_runs")
+def admit_queued_runs():
+    """Start as many queued runs, oldest first, as the concurrency and memory caps allow."""
+    with transaction.atomic():
+        admission.lock_admission()
+
+        # Runs that have been "running" for too long are assumed lost, and are failed like
+        # any other lost run so their batch completes and their streams end
+        stale_before = timezone.now() - timedelta(seconds=settings.ADMISSION_STALE_SECONDS)
+        running = []
+        for workflow_run in WorkflowRun.objects.filter(status=WorkflowRun.RUNNING, admitted_at__isnull=False):
+            if workflow_run.admitted_at < stale_before:
+                error_message = f"The run was still running after {settings.ADMISSION_STALE_SECONDS} seconds."
+            else:
+                error_message = lost_run_error(workflow_run)
+            if error_message:
+                fail_run(workflow_run, error_message)
+            else:
+                running.append(workflow_run)
+        queued = list(WorkflowRun.objects.filter(status=WorkflowRun.QUEUED).select_related('batch').order_by('id'))
+
+        admitted = admission.select_admissible(queued, running) if settings.ADMISSION_ENABLED else queued
+        for workflow_run in admitted:
+            workflow_run.status = WorkflowRun.RUNNING
+            workflow_run.admitted_at = timezone.now()
+        WorkflowRun.objects.bulk_update(admitted, ['status', 'admitted_at'])
+
+    dispatch_runs(admitted)
+
+    return [workflow_run.id for workflow_run in admitted]
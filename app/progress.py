@@ -0,0 +1,95 @@
+import time
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from app.admission import queue_position
+from app.events import Subscription, format_event
+from app.tasks import celery_app, run_is_complete
+
+
+def task_progress(task_id):
+    """(state, progress dict) of one step or shard task as last reported to the result backend."""
+    if not task_id:
+        return "PENDING", {}
+    result = celery_app.AsyncResult(task_id)
+    info = result.info if result.state == "PROGRESS" and isinstance(result.info, dict) else {}
+    return result.state, info
+
+
+def step_progress(step_run):
+    """Live progress of a step run, summed over its shards when it was split."""
+    states, frames_done, total_frames, fps = [], 0, 0, 0.0
+    for task_id in step_run.shard_task_ids or [step_run.task_id]:
+        state, info = task_progress(task_id)
+        states.append(state)
+        frames_done += info.get("frames_done") or 0
+        total_frames += info.get("total_frames") or 0
+        # Shards run side by side, so their rates add up
+        fps += info.get("fps") or 0.0
+
+    if step_run.end_time:
+        state = "finished"
+    elif "FAILURE" in states:
+        state = "failed"
+    elif "PROGRESS" in states:
+        state = "running"
+    else:
+        state = "started"
+
+    end = step_run.end_time or timezone.now()
+    return {
+        "step_number": step_run.workflow_step.step_number,
+        "step_run_id": step_run.id,
+        "state": state,
+        "shards": len(step_run.shard_task_ids),
+        "frames_done": frames_done,
+        "total_frames": total_frames or None,
+        "percent": round(frames_done / total_frames * 100, 2) if total_frames else None,
+        "fps": round(fps, 2),
+        "elapsed_seconds": round((end - step_run.start_time).total_seconds(), 1) if step_run.start_time else None,
+        "eta_seconds": round((total_frames - frames_done) / fps, 1) if state == "running" and fps and total_frames else None,
+    }
+
+
+def run_progress(workflow_run):
+    step_runs = workflow_run.step_runs.select_related("workflow_step").order_by("workflow_step__step_number", "id")
+    return [step_progress(step_run) for step_run in step_runs]
+
+
+def run_event_stream(workflow_run):
+    """Server-sent events for a run: a snapshot, then its events until it finishes or fails."""
+    # Subscribe before taking the snapshot so nothing in between is lost
+    subscription = Subscription(workflow_run.id)
+    try:
+        workflow_run.refresh_from_db()
+        finished = run_is_complete(workflow_run)
+        yield format_event("snapshot", {
+            "run_id": workflow_run.id,
+            "status": workflow_run.status,
+            "queue_position": queue_position(workflow_run),
+            "error": workflow_run.error,
+            "error_message": workflow_run.error_message,
+            "finished": finished,
+            "steps": run_progress(workflow_run),
+        })
+        if workflow_run.error or finished:
+            return
+
+        # Events arrive through the shared listener, so the stream needn't keep a
+        # database connection open while it waits
+        if not connection.in_atomic_block:
+            connection.close()
+
+        deadline = time.monotonic() + settings.EVENT_STREAM_MAX_SECONDS
+        while time.monotonic() < deadline:
+            events = subscription.get(timeout=settings.EVENT_STREAM_HEARTBEAT_SECONDS)
+            if not events:
+                # Comment lines keep proxies from closing an idle stream
+                yield ": heartbeat\n\n"
+                continue
+            for event in events:
+                yield format_event(event["event"], event)
+                if event["event"] in ("finished", "failed"):
+                    return
+    finally:
+        subscription.close()
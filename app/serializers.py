@@ -1,10 +1,16 @@
+from django.db.models import Count, F, Prefetch
 from rest_framework import serializers
+from utils.serializers import FlexFieldsMixin
 from .models import (
     Workflow, 
     ModelPerformance,
     WorkflowStep,
     WorkflowRun,
-    WorkflowStepRun
+    WorkflowStepRun,
+    WorkflowBatch,
+    WorkflowBenchmark,
+    WorkflowArtifact,
+    ModelLeaderboardEntry
 )
 from files.serializers import (
     UploadedInputFileSerializer,
@@ -20,10 +26,18 @@ class WorkflowStepReadSerializer(serializers.ModelSerializer):
     model_file = UploadedModelFileSerializer()
     class_file = UploadedClassFileSerializer()
     ground_truth_file = UploadedGroundTruthFileSerializer()
+    depends_on = serializers.SlugRelatedField(slug_field='step_number', many=True, read_only=True)
 
     class Meta:
         model = WorkflowStep
-        fields = ['id','step_number', 'wheel_file', 'model_file', 'class_file', 'ground_truth_file', 'result_file', 'input_type']
+        fields = ['id','step_number', 'wheel_file', 'model_file', 'class_file', 'ground_truth_file', 'result_file', 'input_type', 'depends_on']
+
+    @staticmethod
+    def setup_eager_loading(queryset, prefix=''):
+        """Load everything the serializer nests, so the query count doesn't grow with the rows."""
+        return queryset.select_related(
+            *(prefix + name for name in ('wheel_file', 'model_file', 'class_file', 'ground_truth_file'))
+        ).prefetch_related(prefix + 'depends_on')
 
 class WorkflowStepRunSerializer(serializers.ModelSerializer):
     workflow_step = WorkflowStepReadSerializer()
@@ -32,6 +46,10 @@ class WorkflowStepRunSerializer(serializers.ModelSerializer):
         model = WorkflowStepRun
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset, prefix=''):
+        return WorkflowStepReadSerializer.setup_eager_loading(queryset, prefix + 'workflow_step__')
+
 class WorkflowReadSerializer(serializers.ModelSerializer):
 
     input = UploadedInputFileSerializer()
@@ -41,6 +59,53 @@ class WorkflowReadSerializer(serializers.ModelSerializer):
         model = Workflow
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset, prefix=''):
+        steps = WorkflowStepReadSerializer.setup_eager_loading(WorkflowStep.objects.all())
+        return queryset.select_related(prefix + 'input').prefetch_related(Prefetch(prefix + 'steps', queryset=steps))
+
+class WorkflowStepListSerializer(FlexFieldsMixin, serializers.ModelSerializer):
+    depends_on = serializers.SlugRelatedField(slug_field='step_number', many=True, read_only=True)
+
+    expandable_fields = {
+        'wheel_file': (UploadedWheelFileSerializer, {}),
+        'model_file': (UploadedModelFileSerializer, {}),
+        'class_file': (UploadedClassFileSerializer, {}),
+        'ground_truth_file': (UploadedGroundTruthFileSerializer, {}),
+    }
+
+    class Meta:
+        model = WorkflowStep
+        fields = ['id', 'step_number', 'wheel_file', 'model_file', 'class_file', 'ground_truth_file', 'result_file', 'input_type', 'depends_on']
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, expand=None):
+        return queryset.select_related(*cls.expanded(expand)).prefetch_related('depends_on')
+
+class WorkflowListSerializer(FlexFieldsMixin, serializers.ModelSerializer):
+    """Workflow summary for listings: the input file id and a step count, unless expanded."""
+    step_count = serializers.IntegerField(read_only=True)
+
+    expandable_fields = {
+        'input': (UploadedInputFileSerializer, {}),
+        'steps': (WorkflowStepListSerializer, {'many': True, 'read_only': True}),
+    }
+
+    class Meta:
+        model = Workflow
+        fields = ['id', 'name', 'description', 'input', 'created_by', 'created_at', 'pinned', 'step_count']
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, expand=None):
+        expand = cls.expanded(expand)
+        queryset = queryset.annotate(step_count=Count('steps'))
+        if 'input' in expand:
+            queryset = queryset.select_related('input')
+        if 'steps' in expand:
+            steps = WorkflowStepListSerializer.setup_eager_loading(WorkflowStep.objects.all(), expand['steps'])
+            queryset = queryset.prefetch_related(Prefetch('steps', queryset=steps))
+        return queryset
+
 class WorkflowWriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Workflow
@@ -73,6 +138,30 @@ class WorkflowRunReadSerializer(serializers.ModelSerializer):
         model = WorkflowRun
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset, prefix=''):
+        return WorkflowReadSerializer.setup_eager_loading(queryset, prefix + 'workflow__').select_related(prefix + 'workflow')
+
+class WorkflowRunListSerializer(FlexFieldsMixin, serializers.ModelSerializer):
+    workflow_name = serializers.CharField(read_only=True)
+
+    expandable_fields = {
+        'workflow': (WorkflowListSerializer, {}),
+    }
+
+    class Meta:
+        model = WorkflowRun
+        fields = ['id', 'workflow', 'workflow_name', 'batch', 'status', 'run_by', 'start_time', 'end_time', 'error', 'error_message', 'output']
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, expand=None):
+        expand = cls.expanded(expand)
+        queryset = queryset.annotate(workflow_name=F('workflow__name'))
+        if 'workflow' in expand:
+            workflows = WorkflowListSerializer.setup_eager_loading(Workflow.objects.all(), expand['workflow'])
+            queryset = queryset.prefetch_related(Prefetch('workflow', queryset=workflows))
+        return queryset
+
 class WorkflowRunWriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = WorkflowRun
@@ -88,7 +177,53 @@ class WorkflowRunWriteSerializer(serializers.ModelSerializer):
 class ModelPerformanceSerializer(serializers.ModelSerializer):
     workflow_run = WorkflowRunReadSerializer()
     workflow_step_run = WorkflowStepRunSerializer()
+    accuracy_per_cpu_second = serializers.FloatField(read_only=True, default=None)
 
     class Meta:
         model = ModelPerformance
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        queryset = WorkflowRunReadSerializer.setup_eager_loading(queryset, 'workflow_run__')
+        return WorkflowStepRunSerializer.setup_eager_loading(queryset, 'workflow_step_run__')
+
+class WorkflowBatchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WorkflowBatch
+        fields = '__all__'
+
+class WorkflowBenchmarkSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WorkflowBenchmark
+        fields = '__all__'
+
+class WorkflowArtifactSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WorkflowArtifact
+        fields = '__all__'
+
+class ModelLeaderboardEntrySerializer(serializers.ModelSerializer):
+    wheel_file = UploadedWheelFileSerializer()
+    model_file = UploadedModelFileSerializer()
+    ground_truth_file = UploadedGroundTruthFileSerializer()
+
+    class Meta:
+        model = ModelLeaderboardEntry
+        fields = [
+            'id',
+            'wheel_file',
+            'model_file',
+            'ground_truth_file',
+            'run_count',
+            'best_accuracy',
+            'mean_accuracy',
+            'latest_accuracy',
+            'mean_step_seconds',
+            'latest_run',
+            'updated_at'
+        ]
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('wheel_file', 'model_file', 'ground_truth_file')
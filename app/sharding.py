@@ -0,0 +1,174 @@
+import math
+import os
+import shutil
+import subprocess
+import cv2
+import pandas as pd
+
+
+def video_frame_info(video_path):
+    capture = cv2.VideoCapture(video_path)
+    try:
+        return int(capture.get(cv2.CAP_PROP_FRAME_COUNT)), capture.get(cv2.CAP_PROP_FPS) or 0.0
+    finally:
+        capture.release()
+
+
+def plan_frame_ranges(total_frames, min_frames, max_shards):
+    """Split [0, total_frames) into at most max_shards ranges of at least min_frames each."""
+    if not min_frames or max_shards < 2 or total_frames < 2 * min_frames:
+        return [(0, total_frames)]
+
+    shard_count = min(max_shards, total_frames // min_frames)
+    size = math.ceil(total_frames / shard_count)
+    return [(start, min(start + size, total_frames)) for start in range(0, total_frames, size)]
+
+
+def list_images(folder, extensions):
+    entries = []
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        if name.lower().endswith(extensions) and os.path.isfile(path):
+            entries.append((name, os.path.getsize(path)))
+    return entries
+
+
+def plan_image_chunks(entries, min_files, max_shards):
+    """Split a sorted (name, size) listing into contiguous chunks balanced by file count and bytes.
+
+    Chunks stay contiguous so each keeps a single offset into the folder's sorted order.
+    """
+    if not min_files or max_shards < 2 or len(entries) < 2 * min_files:
+        return [entries]
+
+    shard_count = min(max_shards, len(entries) // min_files)
+    total_bytes = sum(size for _, size in entries) or 1
+    # Weigh each file half by its share of the count and half by its share of the bytes
+    costs = [0.5 / len(entries) + 0.5 * size / total_bytes for _, size in entries]
+
+    chunks, current, spent = [], [], 0.0
+    for entry, cost in zip(entries, costs):
+        current.append(entry)
+        spent += cost
+        if spent >= (len(chunks) + 1) / shard_count and len(chunks) < shard_count - 1:
+            chunks.append(current)
+            current = []
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def link_images(folder, names, target_dir):
+    os.makedirs(target_dir, exist_ok=True)
+    for name in names:
+        source = os.path.join(folder, name)
+        target = os.path.join(target_dir, name)
+        try:
+            os.symlink(os.path.abspath(source), target)
+        except OSError:
+            shutil.copy2(source, target)
+    return target_dir
+
+
+def shards_root(output_path, step_number):
+    return os.path.join(output_path, ".shards", f"step_{step_number}")
+
+
+def shard_output_path(output_path, step_number, index):
+    return os.path.join(shards_root(output_path, step_number), f"shard_{index:04d}")
+
+
+def remove_shards(output_path, step_number):
+    shutil.rmtree(shards_root(output_path, step_number), ignore_errors=True)
+    try:
+        os.rmdir(os.path.dirname(shards_root(output_path, step_number)))
+    except OSError:
+        # Another step's shards are still in there
+        pass
+
+
+def extract_frame_range(video_path, start_frame, end_frame, fps, target_path):
+    # Seeking before -i and re-encoding keeps the cut frame accurate for constant frame rate input
+    subprocess.check_call([
+        "ffmpeg", "-y", "-v", "error",
+        "-ss", f"{start_frame / fps:.6f}",
+        "-i", video_path,
+        "-frames:v", str(end_frame - start_frame),
+        "-an", "-c:v", "libx264", "-preset", "veryfast", "-crf", "18",
+        target_path
+    ])
+    return target_path
+
+
+def shard_csv_path(shard_result, step_number):
+    return shard_result.get("csv_file") or os.path.join(shard_result["output_path"], f"{step_number}_results.csv")
+
+
+def check_shard_frame_numbers(numbers, shard, step_number):
+    """Make sure a shard's 'Frame No' values count its own frames or images, from 0 or 1.
+
+    Shifting by the shard's start_frame only gives global numbers if the wheel
+    numbered the shard's input by position; anything outside that range means
+    it numbers frames some other way, and the merged CSV would be wrong.
+    """
+    count = shard["end_frame"] - shard["start_frame"]
+    if len(numbers) and (numbers.min() < 0 or numbers.max() > count):
+        raise ValueError(
+            f"Step {step_number} shard {shard['index']} numbers frames {numbers.min()}-{numbers.max()} "
+            f"for {count} frames, so its results can't be merged; run it unsharded "
+            f"(VIDEO_SHARD_MIN_FRAMES / IMAGE_SHARD_MIN_FILES = 0)"
+        )
+
+
+def merge_shard_csvs(shard_results, step_number, target_path):
+    """Concatenate per-shard result CSVs in shard order, shifting 'Frame No' to global frame numbers."""
+    frames = []
+    for shard_result in sorted(shard_results, key=lambda r: r["shard"]["start_frame"]):
+        csv_path = shard_csv_path(shard_result, step_number)
+        if not os.path.exists(csv_path):
+            continue
+        df = pd.read_csv(csv_path)
+        if "Frame No" in df.columns:
+            check_shard_frame_numbers(df["Frame No"], shard_result["shard"], step_number)
+            df["Frame No"] = df["Frame No"] + shard_result["shard"]["start_frame"]
+        frames.append(df)
+
+    merged = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["Frame No", "Object Count"])
+    merged.to_csv(target_path, index=False)
+    return target_path
+
+
+def merge_shard_folders(shard_results, output_path):
+    """Move each shard's output image folder into the same place under the step's output folder."""
+    merged = None
+    for shard_result in shard_results:
+        image_folder = shard_result.get("image_folder")
+        if not image_folder or not os.path.isdir(image_folder):
+            continue
+
+        relative = os.path.relpath(image_folder, shard_result["output_path"])
+        target = os.path.normpath(os.path.join(output_path, relative))
+        os.makedirs(target, exist_ok=True)
+        for name in os.listdir(image_folder):
+            source = os.path.join(image_folder, name)
+            # Skip the shard's linked input and anything another shard already produced
+            if os.path.islink(source) or os.path.isdir(source) or os.path.exists(os.path.join(target, name)):
+                continue
+            shutil.move(source, os.path.join(target, name))
+        merged = target
+    return merged
+
+
+def concat_videos(video_paths, target_path):
+    list_path = f"{target_path}.txt"
+    with open(list_path, "w") as f:
+        for video_path in video_paths:
+            f.write(f"file '{os.path.abspath(video_path)}'\n")
+    try:
+        subprocess.check_call([
+            "ffmpeg", "-y", "-v", "error", "-f", "concat", "-safe", "0",
+            "-i", list_path, "-c", "copy", target_path
+        ])
+    finally:
+        os.remove(list_path)
+    return target_path
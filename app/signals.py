@@ -1,8 +1,16 @@
 import os
 import shutil
-from django.db.models.signals import post_delete
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
-from app.models import WorkflowRun
+from app.models import Workflow, WorkflowRun, WorkflowStep
+from files.models import (
+    UploadedWheelFile,
+    UploadedModelFile,
+    UploadedInputFile,
+    UploadedClassFile,
+    UploadedGroundTruthFile
+)
+from utils.cache import bump_generation, invalidate
 from django.conf import settings
 
 @receiver(post_delete, sender=WorkflowRun)
@@ -11,4 +19,41 @@ def delete_workflowrun_output(sender, instance, **kwargs):
         folder_path = os.path.join(settings.MEDIA_ROOT, instance.output)
 
         if os.path.exists(folder_path) and os.path.isdir(folder_path):
-            shutil.rmtree(folder_path)
\ No newline at end of file
+            shutil.rmtree(folder_path)
+
+
+def invalidate_workflows(*workflow_ids):
+    invalidate(*(f'workflow:{workflow_id}' for workflow_id in workflow_ids))
+    bump_generation('workflows')
+
+@receiver([post_save, post_delete], sender=Workflow)
+def invalidate_workflow(sender, instance, **kwargs):
+    invalidate_workflows(instance.id)
+
+@receiver([post_save, post_delete], sender=WorkflowStep)
+def invalidate_workflow_step(sender, instance, **kwargs):
+    invalidate_workflows(instance.workflow_id)
+
+@receiver(m2m_changed, sender=WorkflowStep.depends_on.through)
+def invalidate_workflow_step_dependencies(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_workflows(instance.workflow_id)
+
+# Where each uploaded file model hangs off the workflows whose responses nest it
+FILE_WORKFLOW_LOOKUPS = {
+    UploadedInputFile: 'input',
+    UploadedWheelFile: 'steps__wheel_file',
+    UploadedModelFile: 'steps__model_file',
+    UploadedClassFile: 'steps__class_file',
+    UploadedGroundTruthFile: 'steps__ground_truth_file',
+}
+
+def invalidate_file_workflows(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    workflow_ids = set(Workflow.objects.filter(**{FILE_WORKFLOW_LOOKUPS[sender]: instance}).values_list('id', flat=True))
+    if workflow_ids:
+        invalidate_workflows(*workflow_ids)
+
+for file_model in FILE_WORKFLOW_LOOKUPS:
+    post_save.connect(invalidate_file_workflows, sender=file_model)
@@ -0,0 +1,63 @@
+import hashlib
+import os
+import tempfile
+from django.test import TestCase, override_settings
+from .artifacts import fill_checksums, reconcile_run, record_step_artifacts
+from .models import Workflow, WorkflowArtifact, WorkflowRun, WorkflowStep, WorkflowStepRun
+
+
+class ArtifactChecksumTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+        self.folder = os.path.join(media.name, 'output', 'run')
+        os.makedirs(self.folder)
+        self.csv_path = self.write('1_results.csv', 'Frame No,Object Count\n1,2\n2,3\n')
+        self.write('1_result.json', '{}')
+
+        workflow = Workflow.objects.create(name='workflow', description='workflow')
+        step = WorkflowStep.objects.create(workflow=workflow, step_number=1, input_type='video')
+        self.run = WorkflowRun.objects.create(workflow=workflow, output='output/run/')
+        self.step_run = WorkflowStepRun.objects.create(workflow_step=step, workflow_run=self.run)
+
+    def write(self, name, text):
+        path = os.path.join(self.folder, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def sha256(self, path):
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def test_finished_steps_are_recorded_without_hashing(self):
+        record_step_artifacts(self.step_run, 1, self.folder, {})
+        artifact = WorkflowArtifact.objects.get(path='output/run/1_results.csv')
+        self.assertEqual((artifact.kind, artifact.size, artifact.frames, artifact.checksum), ('csv', 30, 2, ''))
+
+        self.assertEqual(fill_checksums(WorkflowArtifact.objects.filter(checksum='')), 2)
+        artifact.refresh_from_db()
+        self.assertEqual(artifact.checksum, self.sha256(self.csv_path))
+
+    def test_changed_or_missing_files_are_left_for_reconcile(self):
+        record_step_artifacts(self.step_run, 1, self.folder, {})
+        self.write('1_results.csv', 'Frame No,Object Count\n1,2\n2,3\n3,4\n')
+        os.remove(os.path.join(self.folder, '1_result.json'))
+
+        self.assertEqual(fill_checksums(WorkflowArtifact.objects.all()), 0)
+        self.assertFalse(WorkflowArtifact.objects.exclude(checksum='').exists())
+
+        reconcile_run(self.run)
+        artifact = WorkflowArtifact.objects.get()
+        self.assertEqual((artifact.frames, artifact.checksum), (3, self.sha256(self.csv_path)))
+
+    def test_re_recorded_files_lose_their_old_checksum(self):
+        record_step_artifacts(self.step_run, 1, self.folder, {})
+        fill_checksums(WorkflowArtifact.objects.all())
+
+        self.write('1_results.csv', 'Frame No,Object Count\n1,5\n')
+        record_step_artifacts(self.step_run, 1, self.folder, {})
+        self.assertEqual(WorkflowArtifact.objects.get(path='output/run/1_results.csv').checksum, '')
@@ -0,0 +1,62 @@
+from django.test import SimpleTestCase
+from .benchmarks import compare_reports, summarize
+
+
+def report(**steps):
+    return {'steps': {number.lstrip('s'): metrics for number, metrics in steps.items()}}
+
+
+def stats(p50, p95=None):
+    return {'p50': p50, 'p95': p50 if p95 is None else p95}
+
+
+class SummarizeTests(SimpleTestCase):
+
+    def test_percentiles(self):
+        summary = summarize([4, 1, 3, 2, None])
+        self.assertEqual(summary['samples'], 4)
+        self.assertEqual((summary['min'], summary['max'], summary['mean'], summary['p50']), (1, 4, 2.5, 2.5))
+        self.assertEqual(summary['p95'], 3.85)
+
+    def test_no_values(self):
+        self.assertIsNone(summarize([None, None]))
+
+
+class CompareReportTests(SimpleTestCase):
+
+    def test_slower_wall_time_is_a_regression(self):
+        regressions = compare_reports(
+            report(s1={'wall_seconds': stats(12, 30)}),
+            report(s1={'wall_seconds': stats(10, 20)}),
+            threshold=0.1
+        )
+        self.assertEqual(regressions, [
+            {'step_number': 1, 'metric': 'wall_seconds', 'stat': 'p50', 'baseline': 10, 'current': 12, 'change': 0.2},
+            {'step_number': 1, 'metric': 'wall_seconds', 'stat': 'p95', 'baseline': 20, 'current': 30, 'change': 0.5},
+        ])
+
+    def test_lower_fps_is_a_regression(self):
+        regressions = compare_reports(report(s1={'fps': stats(20)}), report(s1={'fps': stats(25)}), threshold=0.1)
+        self.assertEqual([(r['metric'], r['stat'], r['change']) for r in regressions], [('fps', 'p50', -0.2), ('fps', 'p95', -0.2)])
+
+    def test_improvements_are_not_regressions(self):
+        self.assertEqual(compare_reports(
+            report(s1={'wall_seconds': stats(5), 'fps': stats(50)}),
+            report(s1={'wall_seconds': stats(10), 'fps': stats(25)}),
+            threshold=0.1
+        ), [])
+
+    def test_changes_within_the_threshold_are_ignored(self):
+        self.assertEqual(compare_reports(report(s1={'wall_seconds': stats(10.5)}), report(s1={'wall_seconds': stats(10)}), threshold=0.1), [])
+
+    def test_missing_steps_metrics_and_zero_baselines_are_skipped(self):
+        self.assertEqual(compare_reports(
+            report(
+                s1={'wall_seconds': stats(30)},
+                s2={'wall_seconds': None, 'cpu_seconds': stats(8)},
+                s3={'queue_wait_seconds': stats(5)}
+            ),
+            report(s2={'wall_seconds': stats(1), 'cpu_seconds': None}, s3={'queue_wait_seconds': stats(0)}),
+            threshold=0.1
+        ), [])
+        self.assertEqual(compare_reports({}, report(s1={'wall_seconds': stats(1)}), threshold=0.1), [])
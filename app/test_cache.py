@@ -0,0 +1,212 @@
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from . import cache
+from .cache import LAST_USED_MARKER, evict_lru, get_wheel_env, load_step_result, path_sha256, step_cache_key, store_step_result
+
+
+def build_wheel(path, source='def run_inference(**kwargs):\n    return {}\n'):
+    with zipfile.ZipFile(path, 'w') as z:
+        z.writestr('inference/__init__.py', '')
+        z.writestr('inference/inference.py', source)
+        z.writestr('demo-1.0.data/purelib/demo_extra.py', 'VALUE = 1\n')
+        z.writestr('demo-1.0.dist-info/METADATA', 'Name: demo\nVersion: 1.0\n')
+    return path
+
+
+def age(entry_path, seconds):
+    used_at = time.time() - seconds
+    os.utime(os.path.join(entry_path, LAST_USED_MARKER), (used_at, used_at))
+
+
+class WheelEnvTests(SimpleTestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        self.root = os.path.join(folder.name, 'wheels')
+        self.enterContext(override_settings(WHEEL_CACHE_ROOT=self.root, WHEEL_CACHE_MAX_BYTES=10 ** 9, WHEEL_CACHE_MIN_AGE=0))
+
+    def test_identical_wheels_share_one_env(self):
+        first = build_wheel(os.path.join(self.folder, 'a.whl'))
+        second = os.path.join(self.folder, 'copy.whl')
+        shutil.copy(first, second)
+
+        digest, env_dir = get_wheel_env(first)
+        self.assertEqual(env_dir, os.path.join(self.root, digest))
+        self.assertTrue(os.path.exists(os.path.join(env_dir, 'inference', 'inference.py')))
+        # Modules under .data/purelib are lifted to the root, as pip would install them
+        self.assertTrue(os.path.exists(os.path.join(env_dir, 'demo_extra.py')))
+
+        open(os.path.join(env_dir, 'marker'), 'w').close()
+        self.assertEqual(get_wheel_env(second), (digest, env_dir))
+        self.assertTrue(os.path.exists(os.path.join(env_dir, 'marker')))
+
+        other = build_wheel(os.path.join(self.folder, 'b.whl'), 'def run_inference(**kwargs):\n    return {"b": 1}\n')
+        self.assertNotEqual(get_wheel_env(other)[0], digest)
+        self.assertEqual(sorted(name for name in os.listdir(self.root) if not name.startswith('.')), sorted([digest, get_wheel_env(other)[0]]))
+
+    def test_evicted_envs_are_extracted_again(self):
+        first = build_wheel(os.path.join(self.folder, 'a.whl'))
+        second = build_wheel(os.path.join(self.folder, 'b.whl'), '# b\n')
+        _, first_env = get_wheel_env(first)
+        age(first_env, 60)
+
+        # Room for one env: unpacking the second evicts the least recently used first one
+        with override_settings(WHEEL_CACHE_MAX_BYTES=1):
+            _, second_env = get_wheel_env(second)
+        self.assertFalse(os.path.exists(first_env))
+        self.assertTrue(os.path.exists(second_env))
+
+        self.assertEqual(get_wheel_env(first)[1], first_env)
+        self.assertTrue(os.path.exists(os.path.join(first_env, 'inference', 'inference.py')))
+
+    def test_lookups_refresh_the_last_used_time(self):
+        _, env_dir = get_wheel_env(build_wheel(os.path.join(self.folder, 'a.whl')))
+        age(env_dir, 3600)
+        get_wheel_env(os.path.join(self.folder, 'a.whl'))
+        self.assertLess(time.time() - os.stat(os.path.join(env_dir, LAST_USED_MARKER)).st_mtime, 60)
+
+
+class EvictLruTests(SimpleTestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.root = folder.name
+
+    def entry(self, name, size, used_seconds_ago):
+        entry_path = os.path.join(self.root, name)
+        os.makedirs(entry_path)
+        with open(os.path.join(entry_path, 'data'), 'wb') as f:
+            f.write(b'x' * size)
+        open(os.path.join(entry_path, LAST_USED_MARKER), 'w').close()
+        age(entry_path, used_seconds_ago)
+        return entry_path
+
+    def test_least_recently_used_entries_go_first(self):
+        oldest = self.entry('oldest', 100, 300)
+        older = self.entry('older', 100, 200)
+        newest = self.entry('newest', 100, 100)
+
+        self.assertEqual(evict_lru(self.root, 150), 100)
+        self.assertEqual([os.path.exists(p) for p in (oldest, older, newest)], [False, False, True])
+
+    def test_kept_and_recently_used_entries_survive(self):
+        kept = self.entry('kept', 100, 300)
+        recent = self.entry('recent', 100, 10)
+        old = self.entry('old', 100, 200)
+
+        self.assertEqual(evict_lru(self.root, 0, keep={kept}, min_age=60), 200)
+        self.assertEqual([os.path.exists(p) for p in (kept, recent, old)], [True, True, False])
+
+    def test_nothing_is_removed_under_the_limit(self):
+        entry = self.entry('entry', 100, 300)
+        self.assertEqual(evict_lru(self.root, 1000), 100)
+        self.assertTrue(os.path.exists(entry))
+
+
+class StepCacheKeyTests(SimpleTestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        self.paths = {
+            'input': self.write('input/0001.jpg', 'frame 1'),
+            'wheel': self.write('detector.whl', 'wheel'),
+            'model': self.write('model.pt', 'weights'),
+            'classes': self.write('classes.txt', '0: person'),
+        }
+        self.write('input/0002.jpg', 'frame 2')
+
+    def write(self, name, text):
+        path = os.path.join(self.folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def key(self, input_type='image'):
+        input_folder = os.path.dirname(self.paths['input'])
+        return step_cache_key(input_folder, self.paths['wheel'], self.paths['model'], self.paths['classes'], input_type)
+
+    def test_changing_any_input_changes_the_key(self):
+        key = self.key()
+        self.assertEqual(self.key(), key)
+        self.assertNotEqual(self.key('video'), key)
+
+        seen = {key}
+        for name, path in self.paths.items():
+            with self.subTest(name):
+                with open(path, 'a') as f:
+                    f.write(' changed')
+                changed = self.key()
+                self.assertNotIn(changed, seen)
+                seen.add(changed)
+
+        self.write('input/0003.jpg', 'frame 3')
+        self.assertNotIn(self.key(), seen)
+
+    def test_missing_files_count_as_empty(self):
+        self.assertEqual(
+            step_cache_key(self.paths['input'], self.paths['wheel'], None, None, 'image'),
+            step_cache_key(self.paths['input'], self.paths['wheel'], os.path.join(self.folder, 'missing.pt'), '', 'image')
+        )
+
+    def test_unchanged_folders_are_not_read_again(self):
+        input_folder = os.path.dirname(self.paths['input'])
+        digest = path_sha256(input_folder)
+        with mock.patch.object(cache._sha256, '__wrapped__', wraps=cache._sha256.__wrapped__) as read:
+            self.assertEqual(path_sha256(input_folder), digest)
+            self.assertEqual(read.call_count, 0)
+
+            with open(self.paths['input'], 'a') as f:
+                f.write(' changed')
+            self.assertNotEqual(path_sha256(input_folder), digest)
+            self.assertEqual(read.call_count, 2)
+
+
+@override_settings(STEP_CACHE_MAX_BYTES=10 ** 9)
+class StepResultTests(SimpleTestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.enterContext(override_settings(STEP_CACHE_ROOT=os.path.join(folder.name, 'steps')))
+        self.source = os.path.join(folder.name, 'run-1')
+        self.target = os.path.join(folder.name, 'run-2')
+        os.makedirs(os.path.join(self.source, 'frames'))
+        for name, text in (('1_results.csv', 'Frame No,Object Count\n1,2\n'), ('1_output.mp4', 'video'), ('frames/0001.jpg', 'frame')):
+            with open(os.path.join(self.source, name), 'w') as f:
+                f.write(text)
+
+    def test_round_trip(self):
+        result = {'csv_file': os.path.join(self.source, '1_results.csv'), 'image_folder': os.path.join(self.source, 'frames'), 'count': 2}
+        store_step_result('key', 1, self.source, result)
+
+        restored = load_step_result('key', 2, self.target)
+        self.assertEqual(restored, {
+            'csv_file': os.path.join(self.target, '2_results.csv'),
+            'video_file': os.path.join(self.target, '2_output.mp4'),
+            'image_folder': os.path.join(self.target, 'frames'),
+            'output_path': self.target,
+            'count': 2,
+        })
+        with open(restored['csv_file']) as f:
+            self.assertEqual(f.read(), 'Frame No,Object Count\n1,2\n')
+        self.assertTrue(os.path.exists(os.path.join(self.target, 'frames', '0001.jpg')))
+
+    def test_miss(self):
+        self.assertIsNone(load_step_result('missing', 1, self.target))
+        self.assertFalse(os.path.exists(self.target))
+
+    def test_first_stored_result_wins(self):
+        store_step_result('key', 1, self.source, {'count': 1})
+        store_step_result('key', 1, self.source, {'count': 2})
+        self.assertEqual(load_step_result('key', 1, self.target)['count'], 1)
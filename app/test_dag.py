@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+from django.test import SimpleTestCase
+from .dag import collect_step_results, execution_plan, step_dependencies, topological_levels
+
+
+def step(number, *upstream):
+    depends_on = [SimpleNamespace(step_number=other) for other in upstream]
+    return SimpleNamespace(step_number=number, depends_on=SimpleNamespace(all=lambda: depends_on))
+
+
+class StepDependencyTests(SimpleTestCase):
+
+    def test_undeclared_dependencies_chain_by_step_number(self):
+        self.assertEqual(step_dependencies([step(3), step(1), step(2)]), {1: [], 2: [1], 3: [2]})
+
+    def test_declared_dependencies_are_kept(self):
+        self.assertEqual(step_dependencies([step(1), step(2), step(3, 2, 1)]), {1: [], 2: [], 3: [1, 2]})
+
+
+class TopologicalLevelTests(SimpleTestCase):
+
+    def test_levels(self):
+        self.assertEqual(topological_levels({1: [], 2: [1], 3: [1], 4: [2, 3]}), [[1], [2, 3], [4]])
+
+    def test_completed_steps_are_left_out(self):
+        self.assertEqual(topological_levels({1: [], 2: [1], 3: [2]}, completed=[1]), [[2], [3]])
+
+    def test_cycle(self):
+        with self.assertRaisesMessage(ValueError, "circular"):
+            topological_levels({1: [3], 2: [1], 3: [2]})
+
+    def test_self_dependency(self):
+        with self.assertRaisesMessage(ValueError, "circular"):
+            topological_levels({1: [1]})
+
+    def test_unknown_dependency(self):
+        with self.assertRaisesMessage(ValueError, "unknown step(s) [5]"):
+            topological_levels({1: [], 2: [5]})
+
+
+class ExecutionPlanTests(SimpleTestCase):
+
+    def test_linear(self):
+        self.assertEqual(execution_plan({1: [], 2: [1], 3: [2]}), ("chain", [1, 2, 3]))
+
+    def test_independent_branches_do_not_wait_on_each_other(self):
+        self.assertEqual(
+            execution_plan({1: [], 2: [1], 3: [], 4: [3]}),
+            ("group", [("chain", [1, 2]), ("chain", [3, 4])])
+        )
+
+    def test_fan_out(self):
+        self.assertEqual(execution_plan({1: [], 2: [1], 3: [1]}), ("chain", [1, ("group", [2, 3])]))
+
+    def test_diamond_joins_in_a_chord(self):
+        self.assertEqual(execution_plan({1: [], 2: [1], 3: [1], 4: [2, 3]}), ("chain", [1, ("chord", [2, 3], 4)]))
+
+    def test_branch_tail_runs_beside_the_join(self):
+        # 4 only needs 2, so it runs in 2's branch instead of after 1
+        self.assertEqual(execution_plan({1: [], 2: [], 3: [1, 2], 4: [2]}), ("chord", [1, ("chain", [2, 4])], 3))
+
+    def test_resume_skips_completed_steps(self):
+        self.assertEqual(execution_plan({1: [], 2: [1], 3: [1], 4: [2, 3]}, completed=[1, 2]), ("chain", [3, 4]))
+        self.assertIsNone(execution_plan({1: [], 2: [1]}, completed=[1, 2]))
+
+    def test_every_step_appears_once(self):
+        dependencies = {1: [], 2: [1], 3: [1], 4: [2], 5: [3, 4], 6: [], 7: [6, 5], 8: [2]}
+
+        def numbers(plan):
+            if not isinstance(plan, tuple):
+                return [plan]
+            return [number for part in plan[1] + list(plan[2:]) for number in numbers(part)]
+
+        self.assertEqual(sorted(numbers(execution_plan(dependencies))), list(range(1, 9)))
+
+    def test_cycle(self):
+        with self.assertRaises(ValueError):
+            execution_plan({1: [2], 2: [1]})
+
+
+class CollectStepResultTests(SimpleTestCase):
+
+    def test_chord_results_and_history_are_flattened(self):
+        results = collect_step_results(
+            [
+                {"step_number": 2, "csv_file": "2.csv", "history": {"1": {"step_number": 1, "video_file": "1.mp4"}}},
+                {"step_number": 3, "csv_file": "3.csv", "history": {}},
+            ],
+            seed_results={"0": {"video_file": "seed.mp4"}}
+        )
+        self.assertEqual(sorted(results), [0, 1, 2, 3])
+        self.assertEqual(results[2], {"step_number": 2, "csv_file": "2.csv"})
+        self.assertEqual(results[1]["video_file"], "1.mp4")
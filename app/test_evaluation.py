@@ -0,0 +1,90 @@
+import os
+import tempfile
+import pandas as pd
+from django.test import SimpleTestCase
+from .evaluation import count_csv_rows, evaluate_results, read_counts
+from .tasks import compute_accuracy
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'testdata', 'evaluation')
+
+
+def fixture(name):
+    return os.path.join(FIXTURES, name)
+
+
+def reference_accuracy(ground_truth_path, model_result_path):
+    """The per-frame lookup compute_accuracy used before evaluate_results replaced it."""
+    gt_counts = pd.read_csv(ground_truth_path).set_index('Frame No')['Object Count']
+    model_counts = pd.read_csv(model_result_path).set_index('Frame No')['Object Count']
+
+    common_frames = gt_counts.index.intersection(model_counts.index)
+    correct = sum(gt_counts[frame] == model_counts[frame] for frame in common_frames)
+    accuracy = (correct / len(common_frames)) * 100 if common_frames.any() else 0
+    return round(accuracy, 2)
+
+
+class EvaluationMatchesReferenceTests(SimpleTestCase):
+
+    def test_accuracy_matches_the_reference(self):
+        for name in ['results_full.csv', 'results_partial_classes.csv', 'results_disjoint.csv', 'ground_truth.csv']:
+            with self.subTest(name=name):
+                expected = reference_accuracy(fixture('ground_truth.csv'), fixture(name))
+                self.assertEqual(evaluate_results(fixture('ground_truth.csv'), fixture(name))['accuracy'], expected)
+                self.assertEqual(compute_accuracy(fixture('ground_truth.csv'), fixture(name)), expected)
+
+    def test_chunk_size_does_not_change_the_result(self):
+        whole = evaluate_results(fixture('ground_truth.csv'), fixture('results_partial_classes.csv'))
+        chunked = evaluate_results(fixture('ground_truth.csv'), fixture('results_partial_classes.csv'), chunksize=7)
+        self.assertEqual(chunked, whole)
+
+    def test_only_common_frames_are_compared(self):
+        # 32 of the 40 ground truth frames are in the file; frames 41 and 42 are not in the ground truth
+        self.assertEqual(evaluate_results(fixture('ground_truth.csv'), fixture('results_partial_classes.csv'))['frames_evaluated'], 32)
+
+    def test_no_common_frames(self):
+        metrics = evaluate_results(fixture('ground_truth.csv'), fixture('results_disjoint.csv'))
+        self.assertEqual((metrics['accuracy'], metrics['mae'], metrics['rmse'], metrics['frames_evaluated']), (0.0, 0.0, 0.0, 0))
+
+    def test_unreadable_results_score_zero(self):
+        self.assertEqual(compute_accuracy(fixture('ground_truth.csv'), fixture('missing.csv')), 0.0)
+
+
+class EvaluationMetricTests(SimpleTestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.folder.name, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_errors(self):
+        gt = self.write('gt.csv', 'Frame No,Object Count\n1,2\n2,2\n3,2\n4,2\n')
+        model = self.write('model.csv', 'Frame No,Object Count\n4,2\n3,5\n2,1\n1,2\n')
+        metrics = evaluate_results(gt, model)
+        self.assertEqual(metrics['accuracy'], 50.0)
+        self.assertEqual(metrics['mae'], 1.0)
+        self.assertEqual(metrics['rmse'], round((10 / 4) ** 0.5, 4))
+
+    def test_last_row_wins_for_repeated_frames(self):
+        path = self.write('model.csv', 'Frame No,Object Count\n2,1\n1,3\n2,4\n')
+        frames, counts, _ = read_counts(path, chunksize=2)
+        self.assertEqual(frames.tolist(), [1, 2])
+        self.assertEqual(counts.tolist(), [3.0, 4.0])
+
+    def test_numeric_columns_are_class_totals(self):
+        metrics = evaluate_results(fixture('ground_truth.csv'), fixture('results_partial_classes.csv'))
+        self.assertEqual(metrics['class_counts']['ground_truth'], {})
+        self.assertEqual(set(metrics['class_counts']['model']), {'person', 'car'})
+        frame = pd.read_csv(fixture('results_partial_classes.csv'))
+        self.assertEqual(metrics['class_counts']['model']['person'], float(frame['person'].sum()))
+
+    def test_count_csv_rows(self):
+        self.assertEqual(count_csv_rows(self.write('a.csv', 'Frame No,Object Count\n1,2\n2,3\n')), 2)
+        self.assertEqual(count_csv_rows(self.write('b.csv', 'Frame No,Object Count\n1,2\n2,3')), 2)
+        self.assertEqual(count_csv_rows(self.write('c.csv', 'Frame No,Object Count\n')), 0)
+        self.assertEqual(count_csv_rows(self.write('d.csv', '')), 0)
+        self.assertEqual(count_csv_rows(fixture('ground_truth.csv')), 40)
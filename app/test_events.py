@@ -0,0 +1,71 @@
+from unittest import mock
+from django.db import connection
+from django.test import SimpleTestCase
+from .events import Listener, Subscription, channel_name, publish
+
+
+class FakeListenConnection:
+    autocommit = False
+
+    def __init__(self):
+        self.executed = []
+        self.notifies = []
+
+    def cursor(self):
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.execute = self.executed.append
+        return cursor
+
+
+class SubscriptionTests(SimpleTestCase):
+
+    def test_events_reach_every_subscriber_of_the_run(self):
+        first, second, other = Subscription(1), Subscription(1), Subscription(2)
+        self.addCleanup(other.close)
+        self.addCleanup(second.close)
+
+        publish(1, "started", step_number=1)
+        self.assertEqual([event["event"] for event in first.get(timeout=0)], ["started"])
+        self.assertEqual([event["step_number"] for event in second.get(timeout=0)], [1])
+        self.assertEqual(other.get(timeout=0), [])
+
+        first.close()
+        publish(1, "finished")
+        self.assertEqual(first.get(timeout=0), [])
+        self.assertEqual([event["event"] for event in second.get(timeout=0)], ["finished"])
+
+
+class ListenerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.connection = FakeListenConnection()
+        with mock.patch.object(connection, 'get_new_connection', return_value=self.connection), \
+                mock.patch('app.events.threading.Thread'):
+            self.listener = Listener()
+
+    def test_one_listen_per_channel(self):
+        channel = channel_name(7)
+        self.listener.listen(channel)
+        self.listener.listen(channel)
+        self.assertEqual(self.connection.executed, [f'LISTEN "{channel}"'])
+
+        self.listener.unlisten(channel)
+        self.assertEqual(len(self.connection.executed), 1)
+        self.listener.unlisten(channel)
+        self.assertEqual(self.connection.executed[-1], f'UNLISTEN "{channel}"')
+        self.assertEqual(self.listener.channels, {})
+
+    def test_reconnect_listens_to_open_channels_again(self):
+        self.listener.listen(channel_name(7))
+        self.listener.listen(channel_name(8))
+        self.listener.unlisten(channel_name(8))
+
+        replacement = FakeListenConnection()
+        self.listener.new_connection = mock.Mock(return_value=replacement)
+        self.connection.close = mock.Mock()
+        with mock.patch('app.events.time.sleep'):
+            self.listener.reconnect()
+
+        self.assertIs(self.listener.connection, replacement)
+        self.assertTrue(replacement.autocommit)
+        self.assertEqual(replacement.executed, [f'LISTEN "{channel_name(7)}"'])
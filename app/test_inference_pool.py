@@ -0,0 +1,206 @@
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import psutil
+from django.test import SimpleTestCase, override_settings
+from . import inference_pool
+from .inference_pool import InferenceError, ResourceSampler, run_inference
+
+STUB_INFERENCE = '''
+import os
+import sys
+
+LOADS = []
+
+
+def load_model(model_path):
+    LOADS.append(model_path)
+    return {"path": model_path}
+
+
+def run_inference(model=None, fail=False, crash=False, text=None, allocate_mb=0, **kwargs):
+    if crash:
+        os._exit(3)
+    if fail:
+        raise ValueError("bad input")
+    if text:
+        print(text)
+        sys.stderr.write(text + " on stderr\\n")
+        os.system("echo " + text + " from a child process")
+    block = b"\\x01" * (allocate_mb * 1024 * 1024)
+    del block
+    return {"pid": os.getpid(), "loads": len(LOADS), "model": model}
+'''
+
+
+@override_settings(
+    INFERENCE_WORKER_MAX_JOBS=50,
+    INFERENCE_POOL_MAX_IDLE=2,
+    INFERENCE_WORKER_MAX_IDLE_SECONDS=600,
+    INFERENCE_CPU_LIMIT_SECONDS=0,
+    INFERENCE_WORKER_MAX_VMEM_MB=0
+)
+class InferencePoolTests(SimpleTestCase):
+    """Runs a stub wheel, whose `inference.inference` module reports the worker's pid, on real workers."""
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        self.env_dir = os.path.join(folder.name, 'env')
+        os.makedirs(os.path.join(self.env_dir, 'inference'))
+        open(os.path.join(self.env_dir, 'inference', '__init__.py'), 'w').close()
+        with open(os.path.join(self.env_dir, 'inference', 'inference.py'), 'w') as f:
+            f.write(STUB_INFERENCE)
+        self.addCleanup(inference_pool.shutdown)
+
+    def run_step(self, model_path='model.pt', **kwargs):
+        return run_inference('wheel', self.env_dir, model_path, **kwargs)
+
+    def idle_workers(self, model_path='model.pt'):
+        return inference_pool._idle_workers.get(('wheel', model_path), [])
+
+    def test_workers_are_reused_with_the_model_loaded_once(self):
+        first = self.run_step()
+        second = self.run_step()
+        self.assertEqual(first['pid'], second['pid'])
+        self.assertEqual(second['loads'], 1)
+        self.assertEqual(second['model'], {'path': 'model.pt'})
+
+        self.assertNotEqual(self.run_step(model_path='other.pt')['pid'], first['pid'])
+
+    @override_settings(INFERENCE_WORKER_MAX_JOBS=2)
+    def test_workers_are_recycled_after_max_jobs(self):
+        pids = [self.run_step()['pid'] for _ in range(3)]
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+
+    def test_workers_idle_too_long_are_stopped(self):
+        first = self.run_step()['pid']
+        worker, = self.idle_workers()
+        worker.last_used -= 601
+
+        self.assertNotEqual(self.run_step()['pid'], first)
+        self.assertFalse(worker.alive())
+
+    @override_settings(INFERENCE_POOL_MAX_IDLE=1)
+    def test_idle_workers_are_capped(self):
+        self.run_step()
+        worker, = self.idle_workers()
+        self.run_step(model_path='other.pt')
+
+        self.assertEqual(self.idle_workers(), [])
+        self.assertEqual(len(self.idle_workers('other.pt')), 1)
+        self.assertFalse(worker.alive())
+
+    def test_dead_idle_workers_are_replaced(self):
+        first = self.run_step()['pid']
+        worker, = self.idle_workers()
+        worker.process.kill()
+        worker.process.wait()
+
+        self.assertNotEqual(self.run_step()['pid'], first)
+        self.assertEqual(len(self.idle_workers()), 1)
+
+    def test_failed_jobs_keep_the_worker(self):
+        first = self.run_step()['pid']
+        with self.assertRaisesMessage(InferenceError, 'ValueError: bad input') as raised:
+            self.run_step(fail=True)
+        self.assertIn('raise ValueError', raised.exception.worker_traceback)
+        self.assertEqual(self.run_step()['pid'], first)
+
+    def test_crashed_workers_are_not_reused(self):
+        first = self.run_step()['pid']
+        with self.assertRaisesMessage(InferenceError, 'Inference worker exited unexpectedly (exit code 3)'):
+            self.run_step(crash=True)
+        self.assertEqual(self.idle_workers(), [])
+        self.assertNotEqual(self.run_step()['pid'], first)
+
+    def test_jobs_report_their_resource_usage(self):
+        stats = {}
+        self.run_step(allocate_mb=100, stats=stats)
+        self.assertEqual(sorted(stats), ['cpu_seconds', 'peak_rss', 'read_bytes', 'write_bytes'])
+        self.assertGreaterEqual(stats['peak_rss'], 100 * 1024 * 1024)
+        self.assertGreaterEqual(stats['cpu_seconds'], 0)
+
+    def test_a_lighter_job_after_a_heavy_one_reports_its_own_peak(self):
+        # Benchmarks and admission estimates read these peaks, so a warm worker must not carry one over
+        heavy, light = {}, {}
+        first = self.run_step(allocate_mb=200, stats=heavy)['pid']
+        self.assertEqual(self.run_step(allocate_mb=20, stats=light)['pid'], first)
+
+        self.assertGreaterEqual(heavy['peak_rss'], 200 * 1024 * 1024)
+        self.assertLess(light['peak_rss'], heavy['peak_rss'] - 100 * 1024 * 1024)
+
+    def test_wheel_output_goes_to_the_step_log(self):
+        worker_output = os.path.join(self.folder, 'worker.out')
+        # The worker inherits this process's stdout and stderr when it starts
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved_fds = os.dup(1), os.dup(2)
+        with open(worker_output, 'w') as out:
+            os.dup2(out.fileno(), 1)
+            os.dup2(out.fileno(), 2)
+            try:
+                self.run_step()
+            finally:
+                os.dup2(saved_fds[0], 1)
+                os.dup2(saved_fds[1], 2)
+                os.close(saved_fds[0])
+                os.close(saved_fds[1])
+
+        first_log, second_log = os.path.join(self.folder, 'first.log'), os.path.join(self.folder, 'second.log')
+        self.run_step(text='first', log_file=first_log)
+        self.run_step(text='second', log_file=second_log)
+        self.run_step(text='unlogged')
+        # Stopping the worker flushes its own buffered stdout
+        inference_pool.shutdown()
+
+        with open(first_log) as f:
+            self.assertCountEqual(f.read().splitlines(), ['first', 'first on stderr', 'first from a child process'])
+        with open(second_log) as f:
+            self.assertCountEqual(f.read().splitlines(), ['second', 'second on stderr', 'second from a child process'])
+        with open(worker_output) as f:
+            worker_lines = f.read().splitlines()
+        self.assertIn('unlogged', worker_lines)
+        self.assertFalse([line for line in worker_lines if line.startswith(('first', 'second'))])
+
+
+class ResourceSamplerTests(SimpleTestCase):
+
+    def test_cpu_time_is_counted_from_the_start(self):
+        process = psutil.Process()
+        sampler = ResourceSampler(process.pid)
+        started = sum(process.cpu_times()[:2])
+        while sum(process.cpu_times()[:2]) - started < 0.2:
+            pass
+
+        usage = sampler.usage()
+        self.assertGreaterEqual(usage['cpu_seconds'], 0.2)
+        self.assertLess(usage['cpu_seconds'], 5)
+        self.assertGreaterEqual(usage['peak_rss'], process.memory_info().rss // 2)
+        self.assertIsInstance(usage['read_bytes'], int)
+        self.assertIsInstance(usage['write_bytes'], int)
+
+    def test_live_children_count_towards_the_peak(self):
+        parent = subprocess.Popen([sys.executable, '-c', (
+            'import subprocess, sys;'
+            'subprocess.run([sys.executable, "-c", "import time; block = b\'x\' * (80 * 1024 * 1024); print(flush=True); time.sleep(30)"])'
+        )], stdout=subprocess.PIPE, start_new_session=True)
+        self.addCleanup(parent.stdout.close)
+        self.addCleanup(parent.wait)
+        self.addCleanup(os.killpg, parent.pid, signal.SIGKILL)
+        sampler = ResourceSampler(parent.pid)
+        parent.stdout.readline()
+        own_rss = psutil.Process(parent.pid).memory_info().rss
+
+        sampler.sample()
+        self.assertGreaterEqual(sampler.peak_rss - own_rss, 80 * 1024 * 1024)
+
+    def test_exited_processes_report_nothing(self):
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        sampler = ResourceSampler(process.pid)
+        process.wait()
+        self.assertEqual(sampler.usage(), {})
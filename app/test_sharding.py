@@ -0,0 +1,90 @@
+import os
+import tempfile
+import pandas as pd
+from django.test import SimpleTestCase
+from .sharding import merge_shard_csvs, merge_shard_folders, plan_frame_ranges, plan_image_chunks
+
+
+class PlanFrameRangeTests(SimpleTestCase):
+
+    def test_short_video_is_not_split(self):
+        self.assertEqual(plan_frame_ranges(150, 100, 8), [(0, 150)])
+
+    def test_ranges_cover_every_frame_once(self):
+        ranges = plan_frame_ranges(1001, 100, 4)
+        self.assertEqual(len(ranges), 4)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], 1001)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+
+    def test_disabled(self):
+        self.assertEqual(plan_frame_ranges(100000, 0, 8), [(0, 100000)])
+        self.assertEqual(plan_frame_ranges(100000, 100, 1), [(0, 100000)])
+
+
+class PlanImageChunkTests(SimpleTestCase):
+
+    def test_chunks_are_contiguous_and_complete(self):
+        entries = [(f"{index:03d}.jpg", 100) for index in range(50)]
+        chunks = plan_image_chunks(entries, 10, 4)
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual([entry for chunk in chunks for entry in chunk], entries)
+
+    def test_large_files_get_smaller_chunks(self):
+        entries = [(f"{index:03d}.jpg", 10000 if index < 10 else 100) for index in range(40)]
+        chunks = plan_image_chunks(entries, 5, 2)
+        self.assertLess(len(chunks[0]), len(chunks[1]))
+
+    def test_small_folder_is_not_split(self):
+        entries = [(f"{index}.jpg", 1) for index in range(15)]
+        self.assertEqual(plan_image_chunks(entries, 10, 4), [entries])
+
+
+class MergeShardTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def shard_result(self, index, start, end, frame_numbers):
+        output_path = os.path.join(self.tmp.name, f"shard_{index}")
+        os.makedirs(output_path)
+        pd.DataFrame({"Frame No": frame_numbers, "Object Count": [index] * len(frame_numbers)}).to_csv(
+            os.path.join(output_path, "1_results.csv"), index=False
+        )
+        return {"output_path": output_path, "shard": {"index": index, "start_frame": start, "end_frame": end}}
+
+    def test_frames_are_shifted_and_ordered_by_shard(self):
+        results = [self.shard_result(1, 3, 5, [1, 2]), self.shard_result(0, 0, 3, [1, 2, 3])]
+        target = merge_shard_csvs(results, 1, os.path.join(self.tmp.name, "merged.csv"))
+        merged = pd.read_csv(target)
+        self.assertEqual(merged["Frame No"].tolist(), [1, 2, 3, 4, 5])
+        self.assertEqual(merged["Object Count"].tolist(), [0, 0, 0, 1, 1])
+
+    def test_zero_based_numbering(self):
+        results = [self.shard_result(0, 0, 2, [0, 1]), self.shard_result(1, 2, 4, [0, 1])]
+        merged = pd.read_csv(merge_shard_csvs(results, 1, os.path.join(self.tmp.name, "merged.csv")))
+        self.assertEqual(merged["Frame No"].tolist(), [0, 1, 2, 3])
+
+    def test_numbering_outside_the_shard_is_rejected(self):
+        # e.g. a wheel that numbers images by something other than their position
+        results = [self.shard_result(0, 0, 2, [1, 2]), self.shard_result(1, 2, 4, [17, 42])]
+        with self.assertRaisesMessage(ValueError, "can't be merged"):
+            merge_shard_csvs(results, 1, os.path.join(self.tmp.name, "merged.csv"))
+
+    def test_missing_shard_csvs_give_an_empty_result(self):
+        target = merge_shard_csvs([], 1, os.path.join(self.tmp.name, "merged.csv"))
+        self.assertEqual(list(pd.read_csv(target).columns), ["Frame No", "Object Count"])
+
+    def test_image_folders_are_merged(self):
+        results = []
+        for index in range(2):
+            output_path = os.path.join(self.tmp.name, f"shard_{index}")
+            image_folder = os.path.join(output_path, "images")
+            os.makedirs(image_folder)
+            open(os.path.join(image_folder, f"{index}.jpg"), "w").close()
+            results.append({"output_path": output_path, "image_folder": image_folder})
+
+        target = merge_shard_folders(results, os.path.join(self.tmp.name, "step"))
+        self.assertEqual(sorted(os.listdir(target)), ["0.jpg", "1.jpg"])
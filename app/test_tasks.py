@@ -0,0 +1,67 @@
+import os
+import tempfile
+from django.test import SimpleTestCase
+from .models import WorkflowStepRun
+from .tasks import get_task_logger, record_usage, release_task_logger, step_logger
+
+
+class TaskLoggerTests(SimpleTestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_each_task_logs_only_to_its_own_file(self):
+        first, first_file = get_task_logger('task-a', self.folder)
+        second, second_file = get_task_logger('task-b', os.path.join(self.folder, 'other'))
+        first.info('from a')
+        second.info('from b')
+        step_logger.info('from no task')
+        release_task_logger(first)
+        release_task_logger(second)
+
+        self.assertEqual(first_file, os.path.join(self.folder, 'task-a.log'))
+        self.assertIn('INFO - from a', self.read(first_file))
+        self.assertNotIn('from b', self.read(first_file))
+        self.assertIn('from b', self.read(second_file))
+        self.assertNotIn('from a', self.read(second_file))
+        self.assertNotIn('from no task', self.read(first_file) + self.read(second_file))
+
+    def test_released_loggers_stop_writing(self):
+        logger, log_file = get_task_logger('task-a', self.folder)
+        release_task_logger(logger)
+        logger.info('after release')
+        self.assertNotIn(logger.handler, step_logger.handlers)
+        self.assertEqual(self.read(log_file), '')
+
+
+class RecordUsageTests(SimpleTestCase):
+    mb = 1024 * 1024
+
+    def test_shards_are_summed_and_the_largest_peak_kept(self):
+        step_run = WorkflowStepRun()
+        record_usage(step_run, [
+            {'cpu_seconds': 1.25, 'read_bytes': 10, 'write_bytes': 5, 'peak_rss': 300 * self.mb},
+            None,
+            {'cpu_seconds': 2, 'read_bytes': 1, 'write_bytes': 1, 'peak_rss': 100 * self.mb + 1},
+        ])
+        self.assertEqual(
+            (step_run.cpu_seconds, step_run.read_bytes, step_run.write_bytes, step_run.peak_rss_mb),
+            (3.25, 11, 6, 300)
+        )
+
+    def test_partial_usage(self):
+        step_run = WorkflowStepRun()
+        record_usage(step_run, [{'cpu_seconds': 0.5}])
+        self.assertEqual((step_run.cpu_seconds, step_run.read_bytes, step_run.write_bytes), (0.5, 0, 0))
+        self.assertIsNone(step_run.peak_rss_mb)
+
+    def test_no_usage_leaves_the_step_run_alone(self):
+        step_run = WorkflowStepRun()
+        record_usage(step_run, [{}, None])
+        self.assertEqual((step_run.cpu_seconds, step_run.peak_rss_mb), (None, None))
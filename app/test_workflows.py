@@ -0,0 +1,177 @@
+from django.db import transaction
+from django.test import TestCase
+from files.models import UploadedWheelFile, UploadedModelFile, UploadedInputFile, UploadedGroundTruthFile
+from .models import Workflow, WorkflowStep
+from .workflows import WorkflowSpecError, create_workflows, update_workflow_steps, validate_workflows
+
+
+def spec(name, steps=None, **fields):
+    return dict({
+        'name': name,
+        'description': f'{name} description',
+        'steps': steps if steps is not None else [{'step_number': 1, 'input_type': 'video'}],
+    }, **fields)
+
+
+class ValidateWorkflowTests(TestCase):
+
+    def setUp(self):
+        self.wheel = UploadedWheelFile.objects.create(name='detector', path='wheel/d.whl', description='wheel')
+        self.model = UploadedModelFile.objects.create(name='yolo', path='model/y.pt', description='model', size=1)
+        self.input = UploadedInputFile.objects.create(name='clip', path='input/clip.mp4', description='input')
+
+    def assertSpecErrors(self, specs, *messages):
+        with self.assertRaises(WorkflowSpecError) as raised:
+            validate_workflows(specs)
+        for message in messages:
+            self.assertTrue(
+                any(message in error for error in raised.exception.errors),
+                f'{message!r} not in {raised.exception.errors}'
+            )
+        return raised.exception.errors
+
+    def test_references_resolve_by_id_or_name(self):
+        inputs, files = validate_workflows([
+            spec('a', input='clip', steps=[{'step_number': 1, 'script': self.wheel.id, 'model': 'yolo'}]),
+            spec('b', input=str(self.input.id), steps=[{'step_number': 1, 'script': 'detector', 'model': str(self.model.id)}]),
+        ])
+        self.assertEqual(inputs, {'clip': self.input.id, str(self.input.id): self.input.id})
+        self.assertEqual(files[UploadedWheelFile], {self.wheel.id: self.wheel.id, 'detector': self.wheel.id})
+        self.assertEqual(files[UploadedModelFile], {'yolo': self.model.id, str(self.model.id): self.model.id})
+
+    def test_lookups_do_not_grow_with_the_request(self):
+        specs = [
+            spec(f'w{n}', input='clip', steps=[{'step_number': 1, 'script': 'detector', 'model': self.model.id}])
+            for n in range(20)
+        ]
+        # Existing names, inputs, wheels and models; class and ground truth files aren't referenced
+        with self.assertNumQueries(4):
+            validate_workflows(specs)
+
+    def test_every_problem_is_reported(self):
+        errors = self.assertSpecErrors(
+            [
+                spec('a', steps=[]),
+                spec('a'),
+                spec('c', steps=[{'step_number': 0}]),
+                spec('d', steps=[{'step_number': 1}, {'step_number': 1}]),
+                spec('e', steps=[{'step_number': 1, 'depends_on': [2]}, {'step_number': 2, 'depends_on': [1]}]),
+                {'name': '', 'description': 'x', 'steps': [{'step_number': 1}]},
+                'not a workflow',
+            ],
+            'Workflow a: steps must be a non-empty list',
+            'Workflow a: name appears more than once',
+            'Workflow c: every step needs a positive integer step_number',
+            'Workflow d: step numbers must be unique',
+            'Workflow e: ',
+            'name must be a non-empty string',
+            'Workflow 6: expected an object',
+        )
+        self.assertEqual(len(errors), 8)
+
+    def test_existing_workflows_and_unknown_files(self):
+        Workflow.objects.create(name='taken', description='taken description')
+        self.assertSpecErrors(
+            [spec('taken', input='missing clip', steps=[{'step_number': 1, 'script': 'detector', 'model': 999}])],
+            'Workflow taken: a workflow with this name already exists',
+            "Workflow with description 'taken description' already exists",
+            "Workflow taken: input 'missing clip' not found",
+            'Workflow taken step 1: model 999 not found',
+        )
+
+    def test_empty_request(self):
+        self.assertSpecErrors([], 'Expected a non-empty list of workflows')
+
+    def test_create_workflows(self):
+        workflow, = create_workflows([spec('a', input='clip', steps=[
+            {'step_number': 1, 'script': 'detector', 'input_type': 'video'},
+            {'step_number': 2, 'script': 'detector', 'input_type': 'video'},
+            {'step_number': 3, 'model': 'yolo', 'input_type': 'video', 'depends_on': [1, 2]},
+        ])], created_by='tester')
+
+        self.assertEqual((workflow.input_id, workflow.created_by), (self.input.id, 'tester'))
+        steps = {step.step_number: step for step in workflow.steps.all()}
+        self.assertEqual(steps[1].wheel_file_id, self.wheel.id)
+        self.assertEqual(steps[3].model_file_id, self.model.id)
+        self.assertEqual(sorted(step.step_number for step in steps[3].depends_on.all()), [1, 2])
+
+
+class UpdateWorkflowStepTests(TestCase):
+
+    def setUp(self):
+        self.wheel = UploadedWheelFile.objects.create(name='detector', path='wheel/d.whl', description='wheel')
+        self.truth = UploadedGroundTruthFile.objects.create(name='truth', path='groundtruth/g.csv', description='truth')
+        self.workflow = Workflow.objects.create(name='workflow', description='workflow')
+        self.first = WorkflowStep.objects.create(workflow=self.workflow, step_number=1, input_type='video')
+        self.second = WorkflowStep.objects.create(workflow=self.workflow, step_number=2, input_type='video')
+        self.second.depends_on.add(self.first)
+
+    def update(self, steps):
+        with transaction.atomic():
+            update_workflow_steps(self.workflow, steps)
+
+    def test_files_and_dependencies_are_updated(self):
+        self.update([
+            {'id': self.first.id, 'step_number': 1, 'wheel_file': {'id': self.wheel.id}, 'ground_truth_file': 'truth'},
+            {'id': self.second.id, 'step_number': 2, 'input_type': 'image', 'depends_on': []},
+        ])
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.wheel_file_id, self.first.ground_truth_file_id), (self.wheel.id, self.truth.id))
+        self.assertEqual(self.second.input_type, 'image')
+        self.assertFalse(self.second.depends_on.exists())
+
+    def test_steps_without_depends_on_keep_their_dependencies(self):
+        self.update([{'id': self.second.id, 'step_number': 2, 'wheel_file': self.wheel.id}])
+        self.assertEqual(list(self.second.depends_on.all()), [self.first])
+
+    def test_steps_of_other_workflows_are_rejected(self):
+        other = Workflow.objects.create(name='other', description='other')
+        foreign = WorkflowStep.objects.create(workflow=other, step_number=1, input_type='video')
+        with self.assertRaisesMessage(WorkflowSpecError, f'step {foreign.id} does not belong to this workflow'):
+            self.update([{'id': foreign.id, 'step_number': 1}])
+
+    def test_nothing_is_written_when_a_file_is_unknown(self):
+        with self.assertRaisesMessage(WorkflowSpecError, "Workflow workflow step 1: wheel_file 'missing' not found"):
+            self.update([
+                {'id': self.first.id, 'step_number': 1, 'wheel_file': 'missing'},
+                {'id': self.second.id, 'step_number': 2, 'input_type': 'image', 'depends_on': []},
+            ])
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.input_type, 'video')
+        self.assertEqual(list(self.second.depends_on.all()), [self.first])
+
+    def test_cycles_are_rejected(self):
+        with self.assertRaisesMessage(WorkflowSpecError, 'circular'):
+            self.update([
+                {'id': self.first.id, 'step_number': 1, 'depends_on': [2]},
+                {'id': self.second.id, 'step_number': 2, 'depends_on': [1]},
+            ])
+
+    def test_partial_updates_can_depend_on_steps_they_leave_out(self):
+        third = WorkflowStep.objects.create(workflow=self.workflow, step_number=3, input_type='video')
+        self.update([{'id': third.id, 'step_number': 3, 'depends_on': [1, 2]}])
+        self.assertEqual(sorted(step.step_number for step in third.depends_on.all()), [1, 2])
+        self.assertEqual(list(self.second.depends_on.all()), [self.first])
+
+    def test_cycles_through_steps_left_out_are_rejected(self):
+        third = WorkflowStep.objects.create(workflow=self.workflow, step_number=3, input_type='video')
+        third.depends_on.add(self.second)
+        # 1 -> 3 closes the loop with the existing 2 -> 1 and 3 -> 2
+        with self.assertRaisesMessage(WorkflowSpecError, 'circular'):
+            self.update([{'id': self.first.id, 'step_number': 1, 'depends_on': [3]}])
+        self.assertFalse(self.first.depends_on.exists())
+
+    def test_renumbering_onto_a_step_left_out_is_rejected(self):
+        with self.assertRaisesMessage(WorkflowSpecError, 'Workflow workflow: step numbers must be unique'):
+            self.update([{'id': self.second.id, 'step_number': 1}])
+
+    def test_renumbered_steps_keep_their_dependencies(self):
+        self.update([{'id': self.first.id, 'step_number': 5}])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.step_number, 5)
+        self.assertEqual(list(self.second.depends_on.all()), [self.first])
+
+    def test_steps_listed_twice_are_rejected(self):
+        with self.assertRaisesMessage(WorkflowSpecError, 'each step may only be listed once'):
+            self.update([{'id': self.first.id, 'step_number': 1}, {'id': self.first.id, 'step_number': 3}])
@@ -1,3 +1,693 @@
-from django.test import TestCase
+import itertools
+import os
+from datetime import timedelta
+import tempfile
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from backend.celery import app as celery_app
+from files.models import (
+    UploadedWheelFile,
+    UploadedModelFile,
+    UploadedInputFile,
+    UploadedClassFile,
+    UploadedGroundTruthFile
+)
+from .models import Workflow, WorkflowBatch, WorkflowStep, WorkflowRun, WorkflowStepRun, ModelPerformance, ModelLeaderboardEntry
+from .leaderboard import record_performances
+from .pipeline import admit_queued_runs, build_workflow_canvas, completed_step_results
+from .tasks import compute_metrics, evaluate_performance, execute_step, finish_step, progress_reporter
 
-# Create your tests here.
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class QueryCountTests(TestCase):
+    """The list and detail views must cost the same number of queries however many rows they return."""
+
+    def setUp(self):
+        self.names = itertools.count()
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create(username='tester'))
+
+    def create_workflow(self, step_count=3):
+        number = next(self.names)
+        workflow = Workflow.objects.create(
+            name=f'workflow {number}',
+            description=f'workflow {number}',
+            input=UploadedInputFile.objects.create(name=f'input {number}', path='input/a.mp4', description='input')
+        )
+        run = WorkflowRun.objects.create(workflow=workflow, status=WorkflowRun.FINISHED)
+
+        previous = None
+        for step_number in range(1, step_count + 1):
+            # Fresh files per step, so nothing is served from an earlier row
+            step = WorkflowStep.objects.create(
+                workflow=workflow,
+                step_number=step_number,
+                wheel_file=UploadedWheelFile.objects.create(name=f'wheel {next(self.names)}', path='wheel/w.whl', description='wheel'),
+                model_file=UploadedModelFile.objects.create(name=f'model {next(self.names)}', path='model/m.pt', description='model', size=1),
+                class_file=UploadedClassFile.objects.create(name=f'classes {next(self.names)}', path='class/c.txt', description='classes'),
+                ground_truth_file=UploadedGroundTruthFile.objects.create(name=f'truth {next(self.names)}', path='groundtruth/g.csv', description='truth'),
+                input_type='video'
+            )
+            if previous:
+                step.depends_on.add(previous)
+            previous = step
+
+            step_run = WorkflowStepRun.objects.create(workflow_step=step, workflow_run=run)
+            ModelPerformance.objects.create(workflow_run=run, workflow_step_run=step_run, accuracy=0.5)
+
+        return workflow, run
+
+    def assertConstantQueries(self, num, url, grow=3):
+        self.create_workflow()
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        for _ in range(grow):
+            self.create_workflow(step_count=5)
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_workflow_list(self):
+        response = self.assertConstantQueries(1, reverse('all_workflows'))
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertNotIn('steps', response.data['results'][0])
+
+    def test_workflow_list_expanded(self):
+        response = self.assertConstantQueries(3, reverse('all_workflows') + '?expand=input,steps.model_file')
+        workflow = response.data['results'][0]
+        self.assertEqual(workflow['step_count'], 5)
+        self.assertEqual(workflow['input']['id'], Workflow.objects.get(id=workflow['id']).input_id)
+        self.assertIn('name', workflow['steps'][0]['model_file'])
+        self.assertIsInstance(workflow['steps'][0]['wheel_file'], int)
+
+    def test_workflow_run_list(self):
+        response = self.assertConstantQueries(1, reverse('all_workflow_runs'))
+        self.assertEqual(len(response.data['results']), 4)
+        run = response.data['results'][0]
+        self.assertEqual(run['workflow_name'], Workflow.objects.get(id=run['workflow']).name)
+
+    def test_workflow_run_list_expanded(self):
+        response = self.assertConstantQueries(4, reverse('all_workflow_runs') + '?expand=workflow.steps&fields=id,workflow.steps')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'workflow'})
+        self.assertEqual(len(response.data['results'][0]['workflow']['steps']), 5)
+
+    def test_unknown_expansion(self):
+        response = self.client.get(reverse('all_workflow_runs') + '?expand=owner')
+        self.assertEqual(response.status_code, 400)
+
+    def test_model_performance_list(self):
+        response = self.assertConstantQueries(4, reverse('model_performance_list'))
+        self.assertEqual(len(response.data['results']), 18)
+
+    def test_workflow_detail(self):
+        workflow, _ = self.create_workflow(step_count=8)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('workflow', args=[workflow.id]))
+        self.assertEqual(len(response.data['steps']), 8)
+
+    def test_workflow_run_detail(self):
+        _, run = self.create_workflow(step_count=8)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('workflow_run', args=[run.id]))
+        self.assertEqual(len(response.data['workflow']['steps']), 8)
+
+
+class EvaluatePerformanceTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+        os.makedirs(os.path.join(media.name, 'groundtruth'))
+        os.makedirs(os.path.join(media.name, 'output', 'run'))
+        with open(os.path.join(media.name, 'groundtruth', 'g.csv'), 'w') as f:
+            f.write('Frame No,Object Count\n1,2\n2,3\n')
+        with open(os.path.join(media.name, 'output', 'run', '1_results.csv'), 'w') as f:
+            f.write('Frame No,Object Count\n1,2\n2,4\n')
+
+        workflow = Workflow.objects.create(
+            name='workflow',
+            description='workflow',
+            input=UploadedInputFile.objects.create(name='input', path='input/a.mp4', description='input')
+        )
+        step = WorkflowStep.objects.create(
+            workflow=workflow,
+            step_number=1,
+            wheel_file=UploadedWheelFile.objects.create(name='wheel', path='wheel/w.whl', description='wheel'),
+            model_file=UploadedModelFile.objects.create(name='model', path='model/m.pt', description='model', size=1),
+            ground_truth_file=UploadedGroundTruthFile.objects.create(name='truth', path='groundtruth/g.csv', description='truth'),
+            input_type='video'
+        )
+        self.run = WorkflowRun.objects.create(workflow=workflow, output='output/run/', status=WorkflowRun.FINISHED)
+        self.step_run = WorkflowStepRun.objects.create(
+            workflow_step=step, workflow_run=self.run, start_time=timezone.now(), end_time=timezone.now()
+        )
+
+    def test_steps_are_scored_once(self):
+        self.assertEqual(evaluate_performance(self.run.id), 1)
+        self.assertEqual(evaluate_performance(self.run.id), 0)
+
+        self.assertEqual(ModelPerformance.objects.get(workflow_step_run=self.step_run).accuracy, 50.0)
+        self.assertEqual(ModelLeaderboardEntry.objects.get().run_count, 1)
+
+    def test_step_scored_by_an_overlapping_evaluation_is_dropped(self):
+        def score_elsewhere_first(*args):
+            # Another evaluation of the run inserts its row while this one is still scoring
+            ModelPerformance.objects.get_or_create(workflow_run=self.run, workflow_step_run=self.step_run, accuracy=50.0)
+            return compute_metrics(*args)
+
+        with mock.patch('app.tasks.compute_metrics', side_effect=score_elsewhere_first):
+            self.assertEqual(evaluate_performance(self.run.id), 0)
+
+        self.assertEqual(ModelPerformance.objects.filter(workflow_step_run=self.step_run).count(), 1)
+        self.assertFalse(ModelLeaderboardEntry.objects.exists())
+
+
+@override_settings(ADMISSION_ENABLED=True, ADMISSION_MAX_RUNNING=1, ADMISSION_DISPATCH_GRACE_SECONDS=60)
+class AdmissionRecoveryTests(TestCase):
+    """Runs that will never finish must give their capacity back long before ADMISSION_STALE_SECONDS."""
+
+    def setUp(self):
+        self.workflow = Workflow.objects.create(name='workflow', description='workflow')
+        canvas = mock.Mock()
+        canvas.apply_async.return_value.id = 'canvas-task'
+        patcher = mock.patch('app.pipeline.build_workflow_canvas', return_value=canvas)
+        self.canvas = canvas
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_run(self, **kwargs):
+        return WorkflowRun.objects.create(workflow=self.workflow, output='output/missing/', **kwargs)
+
+    def task_states(self, **states):
+        return mock.patch('app.pipeline.celery_app.AsyncResult', side_effect=lambda task_id: mock.Mock(
+            state=states.get(task_id, 'PENDING'), result='WorkerLostError()'
+        ))
+
+    def test_dispatch_failure_fails_the_run(self):
+        self.canvas.apply_async.side_effect = ConnectionError('broker unreachable')
+        run = self.create_run()
+
+        self.assertEqual(admit_queued_runs(), [run.id])
+        run.refresh_from_db()
+        self.assertEqual(run.status, WorkflowRun.FAILED)
+        self.assertIn('broker unreachable', run.error_message)
+
+    def test_run_with_a_failed_task_is_reaped(self):
+        lost = self.create_run(status=WorkflowRun.RUNNING, admitted_at=timezone.now(), task_id='lost-canvas')
+        step = WorkflowStep.objects.create(workflow=self.workflow, step_number=1, input_type='video')
+        WorkflowStepRun.objects.create(workflow_step=step, workflow_run=lost, task_id='lost-step', start_time=timezone.now())
+        queued = self.create_run()
+
+        with self.task_states(**{'lost-step': 'FAILURE'}):
+            self.assertEqual(admit_queued_runs(), [queued.id])
+
+        lost.refresh_from_db()
+        self.assertEqual(lost.status, WorkflowRun.FAILED)
+        self.assertIn('lost-step', lost.error_message)
+
+    def test_run_still_in_progress_keeps_its_slot(self):
+        running = self.create_run(status=WorkflowRun.RUNNING, admitted_at=timezone.now(), task_id='canvas')
+        self.create_run()
+
+        with self.task_states(canvas='PROGRESS'):
+            self.assertEqual(admit_queued_runs(), [])
+        running.refresh_from_db()
+        self.assertEqual(running.status, WorkflowRun.RUNNING)
+
+    def test_run_never_dispatched_is_reaped_after_the_grace_period(self):
+        recent = self.create_run(status=WorkflowRun.RUNNING, admitted_at=timezone.now())
+        with self.task_states():
+            self.assertEqual(admit_queued_runs(), [])
+
+        recent.admitted_at = timezone.now() - timedelta(minutes=5)
+        recent.save()
+        with self.task_states():
+            admit_queued_runs()
+        recent.refresh_from_db()
+        self.assertEqual(recent.status, WorkflowRun.FAILED)
+
+    @override_settings(ADMISSION_STALE_SECONDS=3600)
+    def test_stale_runs_are_failed(self):
+        batch = WorkflowBatch.objects.create(workflow=self.workflow, total_runs=1)
+        stale = self.create_run(
+            status=WorkflowRun.RUNNING,
+            admitted_at=timezone.now() - timedelta(hours=2),
+            task_id='canvas',
+            batch=batch
+        )
+        queued = self.create_run()
+
+        with self.task_states(canvas='PROGRESS'), mock.patch('app.pipeline.events.publish') as publish:
+            self.assertEqual(admit_queued_runs(), [queued.id])
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, WorkflowRun.FAILED)
+        self.assertIn('3600 seconds', stale.error_message)
+        publish.assert_any_call(stale.id, 'failed', error_message=stale.error_message)
+        batch.refresh_from_db()
+        self.assertEqual(batch.failed_runs, 1)
+        self.assertIsNotNone(batch.finished_at)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class KeysetPaginationTests(TestCase):
+    """More rows tie on the leading ordering field than DRF's cursor offsets can step over."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create(username='tester'))
+
+    def walk(self, url, direction='next'):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = [row['id'] for row in response.data['results']]
+            ids.extend(page if direction == 'next' else reversed(page))
+            url = response.data[direction]
+            pages += 1
+            self.assertLess(pages, 100, 'pagination is looping')
+        return ids, response
+
+    def test_workflows_tied_on_pinned(self):
+        Workflow.objects.bulk_create(
+            [Workflow(name=f'workflow {n}', description=f'workflow {n}', pinned=n % 400 == 0) for n in range(1205)]
+        )
+        expected = list(Workflow.objects.order_by('-pinned', '-id').values_list('id', flat=True))
+
+        ids, last = self.walk(reverse('all_workflows') + '?page_size=100')
+        self.assertEqual(ids, expected)
+
+        # And back again from the last page
+        back, _ = self.walk(last.data['previous'], direction='previous')
+        self.assertEqual(back, expected[:-len(last.data['results'])][::-1])
+
+    def test_performances_tied_on_accuracy(self):
+        workflow = Workflow.objects.create(name='workflow', description='')
+        run = WorkflowRun.objects.create(workflow=workflow)
+        step = WorkflowStep.objects.create(workflow=workflow, step_number=1, input_type='video')
+        step_runs = WorkflowStepRun.objects.bulk_create(
+            [WorkflowStepRun(workflow_step=step, workflow_run=run) for _ in range(1100)]
+        )
+        ModelPerformance.objects.bulk_create([
+            ModelPerformance(workflow_run=run, workflow_step_run=step_run, accuracy=None if n % 7 == 0 else 50.0)
+            for n, step_run in enumerate(step_runs)
+        ])
+
+        for query in ('', '&rank=efficiency'):
+            with self.subTest(query=query):
+                ids, _ = self.walk(reverse('model_performance_list') + '?page_size=250' + query)
+                self.assertEqual(len(ids), 1100)
+                self.assertEqual(len(set(ids)), 1100)
+
+
+class LeaderboardEntryTests(TestCase):
+
+    def setUp(self):
+        self.wheel = UploadedWheelFile.objects.create(name='wheel', path='wheel/w.whl', description='wheel')
+        self.model = UploadedModelFile.objects.create(name='model', path='model/m.pt', description='model', size=1)
+
+    def test_files_are_unique_even_when_one_is_missing(self):
+        ModelLeaderboardEntry.objects.create(wheel_file=self.wheel, model_file=self.model)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ModelLeaderboardEntry.objects.create(wheel_file=self.wheel, model_file=self.model)
+        ModelLeaderboardEntry.objects.create(wheel_file=self.wheel)
+
+    def test_runs_without_ground_truth_share_an_entry(self):
+        workflow = Workflow.objects.create(name='workflow', description='workflow')
+        step = WorkflowStep.objects.create(workflow=workflow, step_number=1, wheel_file=self.wheel, model_file=self.model, input_type='video')
+        for accuracy in (40.0, 60.0):
+            run = WorkflowRun.objects.create(workflow=workflow)
+            step_run = WorkflowStepRun.objects.create(workflow_step=step, workflow_run=run)
+            record_performances([ModelPerformance.objects.create(workflow_run=run, workflow_step_run=step_run, accuracy=accuracy)])
+
+        entry = ModelLeaderboardEntry.objects.get()
+        self.assertIsNone(entry.ground_truth_file_id)
+        self.assertEqual((entry.run_count, entry.mean_accuracy, entry.best_accuracy), (2, 50.0, 60.0))
+
+
+@override_settings(STEP_CACHE_ENABLED=True, STEP_CACHE_MAX_BYTES=10 ** 9)
+class StepCacheTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = media.name
+        self.enterContext(override_settings(MEDIA_ROOT=media.name, STEP_CACHE_ROOT=os.path.join(media.name, 'cache')))
+        for target in ('app.tasks.admission.has_free_memory', 'app.tasks.evaluate_performance.delay', 'app.tasks.checksum_artifacts.delay'):
+            self.enterContext(mock.patch(target, return_value=True))
+        self.enterContext(mock.patch('app.tasks.get_wheel_env', return_value=('hash', 'env')))
+        self.enterContext(mock.patch('app.tasks.get_package_name_from_whl', return_value='detector'))
+        self.inference = self.enterContext(mock.patch('app.tasks.inference_pool.run_inference', side_effect=self.fake_inference))
+
+        self.paths = {}
+        for name in ('input.jpg', 'detector.whl', 'model.pt', 'classes.txt'):
+            self.paths[name] = os.path.join(self.media, name)
+            with open(self.paths[name], 'w') as f:
+                f.write('0: person' if name == 'classes.txt' else name)
+
+        self.workflow = Workflow.objects.create(name='workflow', description='workflow')
+        self.step = WorkflowStep.objects.create(workflow=self.workflow, step_number=1, input_type='image')
+
+    def fake_inference(self, wheel_hash, env_dir, model_path, output_path, step_number, **kwargs):
+        csv_file = os.path.join(output_path, f'{step_number}_results.csv')
+        with open(csv_file, 'w') as f:
+            f.write('Frame No,Object Count\n1,2\n')
+        return {'csv_file': csv_file}
+
+    def run_step(self, cache_enabled=True):
+        run = WorkflowRun.objects.create(workflow=self.workflow, cache_enabled=cache_enabled)
+        run.output = f'output/run{run.id}/'
+        run.save()
+        output_path = os.path.join(self.media, run.output)
+        task = mock.Mock(request=mock.Mock(id=f'task-{run.id}', retries=0))
+        execute_step(
+            task, run.id, 1, self.step.id, self.paths['detector.whl'], self.paths['input.jpg'], output_path,
+            self.paths['classes.txt'], '', self.paths['model.pt'], 'image'
+        )
+        return output_path
+
+    def test_identical_steps_reuse_the_cached_result(self):
+        self.run_step()
+        output_path = self.run_step()
+        self.assertEqual(self.inference.call_count, 1)
+        with open(os.path.join(output_path, '1_results.csv')) as f:
+            self.assertEqual(f.read(), 'Frame No,Object Count\n1,2\n')
+        self.assertEqual(WorkflowStepRun.objects.filter(end_time__isnull=False).count(), 2)
+
+    def test_changed_inputs_miss_the_cache(self):
+        self.run_step()
+        with open(self.paths['model.pt'], 'a') as f:
+            f.write(' retrained')
+        self.run_step()
+        self.assertEqual(self.inference.call_count, 2)
+
+    def test_runs_with_caching_disabled_bypass_it(self):
+        self.run_step()
+        with mock.patch('app.tasks.load_step_result') as load, mock.patch('app.tasks.store_step_result') as store:
+            self.run_step(cache_enabled=False)
+        self.assertEqual(self.inference.call_count, 2)
+        load.assert_not_called()
+        store.assert_not_called()
+
+
+@override_settings(ADMISSION_ENABLED=True, ADMISSION_MAX_RUNNING=8)
+class ResumeRunTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.dispatch = self.enterContext(mock.patch('app.pipeline.build_workflow_canvas'))
+        self.dispatch.return_value.apply_async.return_value.id = 'canvas-task'
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create(username='tester'))
+
+        files = {
+            'wheel_file': UploadedWheelFile.objects.create(name='wheel', path='wheel/w.whl', description='wheel'),
+            'class_file': UploadedClassFile.objects.create(name='classes', path='class/c.txt', description='classes'),
+            'ground_truth_file': UploadedGroundTruthFile.objects.create(name='truth', path='groundtruth/g.csv', description='truth'),
+        }
+        self.workflow = Workflow.objects.create(name='workflow', description='workflow')
+        self.first = WorkflowStep.objects.create(workflow=self.workflow, step_number=1, input_type='video', **files)
+        self.second = WorkflowStep.objects.create(workflow=self.workflow, step_number=2, input_type='video', **files)
+        self.second.depends_on.add(self.first)
+
+        self.run = WorkflowRun.objects.create(
+            workflow=self.workflow,
+            output='output/run/',
+            status=WorkflowRun.FAILED,
+            error=True,
+            error_message='step 2 failed'
+        )
+        self.output_path = os.path.join(media.name, self.run.output)
+        os.makedirs(self.output_path)
+        WorkflowStepRun.objects.create(workflow_step=self.first, workflow_run=self.run, end_time=timezone.now())
+        WorkflowStepRun.objects.create(workflow_step=self.second, workflow_run=self.run)
+
+    def write(self, name, text=''):
+        with open(os.path.join(self.output_path, name), 'w') as f:
+            f.write(text)
+
+    def resume(self):
+        return self.client.post(reverse('resume_workflow_run', args=[self.run.id]))
+
+    def test_completed_steps_are_skipped(self):
+        self.write('1_result.json', '{"csv_file": "1_results.csv"}')
+
+        completed = completed_step_results(self.run)
+        self.assertEqual(completed, {1: {'csv_file': '1_results.csv', 'step_number': 1}})
+        canvas = build_workflow_canvas(self.run, completed=completed)
+        self.assertEqual(canvas.task, 'app.tasks.chain_step_wrapper')
+        self.assertEqual((canvas.kwargs['step_number'], canvas.kwargs['upstream']), (2, [1]))
+        self.assertEqual(canvas.kwargs['seed_results'], completed)
+
+        response = self.resume()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['completed_steps'], [1])
+        self.run.refresh_from_db()
+        self.assertEqual((self.run.error, self.run.error_message, self.run.status), (False, '', WorkflowRun.RUNNING))
+        self.dispatch.assert_called_once()
+        self.assertEqual(list(self.dispatch.call_args.kwargs['completed']), [1])
+
+    def test_older_runs_fall_back_to_their_output_files(self):
+        self.write('1_results.csv', 'Frame No,Object Count\n')
+        self.assertEqual(completed_step_results(self.run), {1: {
+            'output_path': self.output_path,
+            'csv_file': os.path.join(self.output_path, '1_results.csv'),
+            'step_number': 1,
+        }})
+
+    def test_finished_steps_without_outputs_are_run_again(self):
+        self.assertEqual(completed_step_results(self.run), {})
+
+    def test_only_failed_runs_can_be_resumed(self):
+        WorkflowRun.objects.filter(id=self.run.id).update(error=False, status=WorkflowRun.RUNNING)
+        response = self.resume()
+        self.assertEqual(response.status_code, 400)
+        self.dispatch.assert_not_called()
+
+    def test_concurrent_resumes_dispatch_once(self):
+        def resumed_elsewhere_first(workflow_run):
+            WorkflowRun.objects.filter(id=workflow_run.id).update(error=False, status=WorkflowRun.QUEUED)
+            return {}
+
+        with mock.patch('app.views.completed_step_results', side_effect=resumed_elsewhere_first):
+            response = self.resume()
+        self.assertEqual(response.status_code, 409)
+        self.dispatch.assert_not_called()
+
+
+class RunProgressTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create(username='tester'))
+        workflow = Workflow.objects.create(name='workflow', description='workflow')
+        self.run = WorkflowRun.objects.create(workflow=workflow, status=WorkflowRun.RUNNING)
+        first = WorkflowStep.objects.create(workflow=workflow, step_number=1, input_type='video')
+        second = WorkflowStep.objects.create(workflow=workflow, step_number=2, input_type='video')
+        WorkflowStepRun.objects.create(workflow_step=first, workflow_run=self.run, task_id='step-1', end_time=timezone.now())
+        WorkflowStepRun.objects.create(workflow_step=second, workflow_run=self.run, task_id='step-2', shard_task_ids=['shard-a', 'shard-b'])
+
+    def test_reported_progress_is_summed_over_shards(self):
+        # What progress_reporter stores through update_state for each shard task
+        task = mock.Mock()
+        progress_reporter(task, self.run.id, 2, shard_index=0)({'frames_done': 300, 'total_frames': 1000, 'fps': 30.0})
+        task.update_state.assert_called_once_with(state='PROGRESS', meta={
+            'frames_done': 300, 'total_frames': 1000, 'fps': 30.0, 'run_id': self.run.id, 'step_number': 2, 'shard': 0
+        })
+        states = {
+            'shard-a': mock.Mock(state='PROGRESS', info=task.update_state.call_args.kwargs['meta']),
+            'shard-b': mock.Mock(state='PROGRESS', info={'frames_done': 100, 'total_frames': 1000, 'fps': 20.0}),
+        }
+
+        with mock.patch('app.progress.celery_app.AsyncResult', side_effect=lambda task_id: states.get(task_id, mock.Mock(state='SUCCESS', info=None))):
+            response = self.client.get(reverse('workflow_run_progress', args=[self.run.id]))
+
+        self.assertEqual(response.status_code, 200)
+        first, second = response.json()['steps']
+        self.assertEqual(first['state'], 'finished')
+        self.assertEqual(
+            {key: second[key] for key in ('state', 'shards', 'frames_done', 'total_frames', 'percent', 'fps', 'eta_seconds')},
+            {'state': 'running', 'shards': 2, 'frames_done': 400, 'total_frames': 2000, 'percent': 20.0, 'fps': 50.0, 'eta_seconds': 32.0}
+        )
+
+    def test_failed_reports_never_fail_the_step(self):
+        task = mock.Mock()
+        task.update_state.side_effect = RuntimeError('result backend is down')
+        with self.assertLogs('app.tasks', 'WARNING') as logs:
+            progress_reporter(task, self.run.id, 1)({'frames_done': 1, 'total_frames': 2, 'fps': 1.0})
+        self.assertIn('result backend is down', logs.output[0])
+
+
+@override_settings(VIDEO_QUEUE='video', IMAGE_QUEUE='image', STEP_QUEUES={'video': 'video', 'image': 'image'})
+class QueueRoutingTests(TestCase):
+
+    def setUp(self):
+        files = {
+            'wheel_file': UploadedWheelFile.objects.create(name='wheel', path='wheel/w.whl', description='wheel'),
+            'class_file': UploadedClassFile.objects.create(name='classes', path='class/c.txt', description='classes'),
+            'ground_truth_file': UploadedGroundTruthFile.objects.create(name='truth', path='groundtruth/g.csv', description='truth'),
+        }
+        self.workflow = Workflow.objects.create(name='workflow', description='workflow')
+        video = WorkflowStep.objects.create(workflow=self.workflow, step_number=1, input_type='Video', **files)
+        image = WorkflowStep.objects.create(workflow=self.workflow, step_number=2, input_type='image', **files)
+        other = WorkflowStep.objects.create(workflow=self.workflow, step_number=3, input_type='audio', **files)
+        image.depends_on.add(video)
+        other.depends_on.add(image)
+
+    def test_steps_go_to_the_queue_for_their_input_type(self):
+        canvas = build_workflow_canvas(WorkflowRun.objects.create(workflow=self.workflow, output='output/run/'))
+        self.assertEqual(
+            [(signature.kwargs['step_number'], signature.options['queue']) for signature in canvas.tasks],
+            [(1, 'video'), (2, 'image'), (3, settings.CELERY_TASK_DEFAULT_QUEUE)]
+        )
+
+    def test_evaluation_and_bookkeeping_tasks_are_routed_by_name(self):
+        routes = {
+            name: celery_app.amqp.router.route({}, name)['queue'].name
+            for name in ('tasks.evaluate_performance', 'tasks.checksum_artifacts', 'tasks.merge_shards_task', 'tasks.admit_queued_runs')
+        }
+        self.assertEqual(routes, {
+            'tasks.evaluate_performance': settings.EVALUATION_QUEUE,
+            'tasks.checksum_artifacts': settings.EVALUATION_QUEUE,
+            'tasks.merge_shards_task': settings.CELERY_TASK_DEFAULT_QUEUE,
+            'tasks.admit_queued_runs': settings.CELERY_TASK_DEFAULT_QUEUE,
+        })
+
+
+@override_settings(ADMISSION_ENABLED=True, ADMISSION_MAX_RUNNING=8, ADMISSION_MAX_RUNNING_PER_USER=8)
+class BatchTriggerTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = media.name
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.enterContext(mock.patch('app.pipeline.build_workflow_canvas'))
+        self.enterContext(mock.patch('app.pipeline.dispatch_runs'))
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create(username='tester'))
+
+        self.workflow = Workflow.objects.create(name='workflow', description='workflow')
+        WorkflowStep.objects.create(workflow=self.workflow, step_number=1, input_type='video')
+        self.inputs = [
+            UploadedInputFile.objects.create(name=f'input {number}', path=f'input/{number}.mp4', description=f'input {number}')
+            for number in range(3)
+        ]
+        self.url = reverse('trigger-workflow-batch', args=[self.workflow.id])
+
+    def trigger(self, data, format='json'):
+        return self.client.post(self.url, data, format=format)
+
+    def run_inputs(self, response):
+        return list(WorkflowRun.objects.filter(id__in=response.json()['runs']).order_by('id').values_list('input_path', flat=True))
+
+    def test_inputs_by_id(self):
+        response = self.trigger({'inputs': [self.inputs[2].id, str(self.inputs[0].id)]})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.run_inputs(response), ['input/2.mp4', 'input/0.mp4'])
+        self.assertEqual(WorkflowBatch.objects.get(id=response.json()['batch_id']).total_runs, 2)
+
+    def test_inputs_from_a_form_body(self):
+        response = self.trigger({'inputs': [str(self.inputs[0].id), str(self.inputs[1].id)]}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.run_inputs(response), ['input/0.mp4', 'input/1.mp4'])
+
+    def test_bad_inputs(self):
+        for inputs, message in (
+            (self.inputs[0].id, 'inputs must be a list of input ids'),
+            (['three'], 'inputs must be a list of input ids'),
+            ([True], 'inputs must be a list of input ids'),
+            ([self.inputs[0].id, 999], 'Input files not found: [999]'),
+            ([], 'Provide a list of input ids or a folder'),
+        ):
+            with self.subTest(inputs=inputs):
+                response = self.trigger({'inputs': inputs})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(message, response.json()['error'])
+        self.assertFalse(WorkflowRun.objects.exists())
+
+    def test_folder_inputs(self):
+        folder = os.path.join(self.media, 'batch')
+        os.makedirs(os.path.join(folder, 'frames'))
+        for name in ('b.jpg', 'a.mp4', 'notes.txt', '.hidden.mp4'):
+            open(os.path.join(folder, name), 'w').close()
+
+        response = self.trigger({'folder': 'batch'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.run_inputs(response), ['batch/a.mp4', 'batch/b.jpg', 'batch/frames'])
+
+    def test_folders_outside_the_media_root_are_rejected(self):
+        outside = tempfile.TemporaryDirectory()
+        self.addCleanup(outside.cleanup)
+        open(os.path.join(outside.name, 'a.mp4'), 'w').close()
+        os.symlink(outside.name, os.path.join(self.media, 'link'))
+
+        for folder in ('..', '../' + os.path.basename(outside.name), outside.name, 'link', 'missing'):
+            with self.subTest(folder=folder):
+                response = self.trigger({'folder': folder})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('is not a folder under the media root', response.json()['error'])
+
+    def test_max_concurrency(self):
+        for value in ('two', 0, -1):
+            with self.subTest(value=value):
+                response = self.trigger({'inputs': [self.inputs[0].id], 'max_concurrency': value})
+                self.assertEqual(response.status_code, 400)
+
+        response = self.trigger({'inputs': [item.id for item in self.inputs], 'max_concurrency': '2'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(WorkflowBatch.objects.get(id=response.json()['batch_id']).max_concurrency, 2)
+        self.assertEqual(
+            list(WorkflowRun.objects.order_by('id').values_list('status', flat=True)),
+            [WorkflowRun.RUNNING, WorkflowRun.RUNNING, WorkflowRun.QUEUED]
+        )
+
+
+class FinishStepTests(TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.output_path = folder.name
+        for target in ('app.tasks.evaluate_performance.delay', 'app.tasks.checksum_artifacts.delay', 'app.tasks.release_capacity'):
+            self.enterContext(mock.patch(target))
+
+        workflow = Workflow.objects.create(name='workflow', description='workflow')
+        self.step = WorkflowStep.objects.create(workflow=workflow, step_number=1, input_type='video')
+        self.run = WorkflowRun.objects.create(workflow=workflow, status=WorkflowRun.RUNNING)
+        step_run = WorkflowStepRun.objects.create(workflow_step=self.step, workflow_run=self.run)
+        WorkflowStepRun.objects.filter(id=step_run.id).update(start_time=timezone.now() - timedelta(seconds=10))
+        self.step_run = WorkflowStepRun.objects.get(id=step_run.id)
+
+    def finish(self):
+        finish_step(self.run, self.step, self.step_run, 1, self.output_path, '', {}, None)
+        self.step_run.refresh_from_db()
+
+    def test_frames_and_fps_come_from_the_results_csv(self):
+        with open(os.path.join(self.output_path, '1_results.csv'), 'w') as f:
+            f.write('Frame No,Object Count\n' + ''.join(f'{frame},1\n' for frame in range(50)))
+
+        self.finish()
+        self.assertEqual(self.step_run.frames, 50)
+        self.assertAlmostEqual(self.step_run.fps, 5.0, delta=0.1)
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.status, WorkflowRun.FINISHED)
+
+    def test_steps_without_results_have_no_frame_counts(self):
+        self.finish()
+        self.assertIsNotNone(self.step_run.end_time)
+        self.assertEqual((self.step_run.frames, self.step_run.fps), (None, None))
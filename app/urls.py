@@ -1,24 +1,46 @@
 from django.urls import path
 from .views import (
     TriggerWorkFlowView,
+    TriggerWorkflowBatchView,
+    WorkflowBatchView,
+    WorkflowBenchmarkCreateView,
+    WorkflowBenchmarkView,
+    WorkflowBenchmarkCompareView,
     WorkFlowView,
+    WorkflowImportView,
     WorkflowListView,
     ModelPerformanceView,
     ModelPerformanceListView,
+    ModelLeaderboardView,
     WorkflowDetailView, 
     WorkflowRunListView,
     WorkflowRunView,
+    WorkflowRunArtifactsView,
+    WorkflowRunResumeView,
+    WorkflowRunProgressView,
+    WorkflowRunEventsView,
     WorkflowPinView
 )
 
 urlpatterns = [
     path('workflow/create/', WorkFlowView.as_view(), name='create-workflow'),
+    path('workflow/import/', WorkflowImportView.as_view(), name='import-workflows'),
     path('workflow/execute/<int:pk>/', TriggerWorkFlowView.as_view(), name='trigger-workflow'),
+    path('workflow/execute/<int:pk>/batch/', TriggerWorkflowBatchView.as_view(), name='trigger-workflow-batch'),
+    path('workflow/batch/<int:pk>/', WorkflowBatchView.as_view(), name='workflow_batch'),
+    path('workflow/<int:pk>/benchmark/', WorkflowBenchmarkCreateView.as_view(), name='create_workflow_benchmark'),
+    path('workflow/benchmark/<int:pk>/', WorkflowBenchmarkView.as_view(), name='workflow_benchmark'),
+    path('workflow/benchmark/<int:pk>/compare/<int:baseline_pk>/', WorkflowBenchmarkCompareView.as_view(), name='compare_workflow_benchmark'),
     path('workflow/', WorkflowListView.as_view(), name='all_workflows'),
     path('workflow/<int:pk>/', WorkflowDetailView.as_view(), name='workflow'),
     path('workflow/run/', WorkflowRunListView.as_view(), name='all_workflow_runs'),
     path('workflow/run/<int:pk>/', WorkflowRunView.as_view(), name='workflow_run'),
+    path('workflow/run/<int:pk>/artifacts/', WorkflowRunArtifactsView.as_view(), name='workflow_run_artifacts'),
+    path('workflow/run/<int:pk>/progress/', WorkflowRunProgressView.as_view(), name='workflow_run_progress'),
+    path('workflow/run/<int:pk>/events/', WorkflowRunEventsView.as_view(), name='workflow_run_events'),
+    path('workflow/run/<int:pk>/resume/', WorkflowRunResumeView.as_view(), name='resume_workflow_run'),
     path('modelperformance/<int:pk>/', ModelPerformanceView.as_view(), name='model_performance'),
     path('modelperformance/', ModelPerformanceListView.as_view(), name='model_performance_list'),
+    path('leaderboard/', ModelLeaderboardView.as_view(), name='model_leaderboard'),
     path('pinworkflow/<int:pk>/', WorkflowPinView.as_view(), name='pin_workflow'),
 ]
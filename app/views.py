@@ -4,6 +4,7 @@ from datetime import datetime
 from rest_framework.exceptions import ValidationError
 from rest_framework import generics
 from rest_framework.views import APIView
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
@@ -14,94 +15,116 @@ from .models import (
     ModelPerformance, 
     WorkflowStep,
     WorkflowRun,
-    WorkflowStepRun
+    WorkflowStepRun,
+    WorkflowBatch,
+    WorkflowBenchmark,
+    WorkflowArtifact,
+    ModelLeaderboardEntry
 )
+from files.models import UploadedInputFile
 from .serializers import (
     WorkflowReadSerializer,
+    WorkflowListSerializer,
     WorkflowWriteSerializer,
     WorkflowStepRunSerializer,
     WorkflowStepReadSerializer,
     WorkflowStepWriteSerializer,
     WorkflowRunReadSerializer,
+    WorkflowRunListSerializer,
     WorkflowRunWriteSerializer,
-    ModelPerformanceSerializer
+    ModelPerformanceSerializer,
+    WorkflowBatchSerializer,
+    WorkflowBenchmarkSerializer,
+    WorkflowArtifactSerializer,
+    ModelLeaderboardEntrySerializer
 )
-from celery import chain
+from .pipeline import build_workflow_canvas, completed_step_results, queue_run, create_batch, admit_queued_runs, folder_inputs
+from .benchmarks import compare_reports, finalize_benchmark
+from .admission import queue_position
+from .workflows import WorkflowSpecError, create_workflows, update_workflow_steps
+from .progress import run_progress, run_event_stream
+from .events import EventStreamRenderer
+from django.http import StreamingHttpResponse
+from utils.renderers import FastJSONRenderer
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, ExpressionWrapper, F, FloatField, Value
+from django.db.models.functions import Coalesce, NullIf
+from utils.filters import apply_filters, date_range, parse_bool
+from utils.pagination import CursorPagination, paginated_response
+from utils.cache import cached_response, listing_key
+from utils.parsers import LegacyYAMLParser, YAMLParser, load_yaml
 import os, shutil
 
 class WorkFlowView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        object_dict = {}
+        spec = {key: request.data.get(key) for key in ('name', 'description', 'input', 'steps')}
+        try:
+            workflow, = create_workflows([spec], request.user.username)
+        except WorkflowSpecError as e:
+            return Response({"error": str(e), "errors": e.errors}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = WorkflowWriteSerializer(data={
-            'name': request.data['name'],
-            'description': request.data['description'],
-            'input': request.data['input'],
-            'created_by': request.user.username,
-            'created_at': datetime.now()
-        })
-        serializer.is_valid(raise_exception=True)
-        instance = serializer.save()
-        instance_id = instance.id
-
-        step_counter = 0
-        for step in request.data['steps']:
-            step_counter += 1
-            workflow_step = WorkflowStepWriteSerializer(data={
-                'workflow': instance_id,
-                'step_number': step['step_number'],
-                'wheel_file': step['script'],
-                'model_file': step['model'],
-                'class_file': step['class'],
-                'input_type': step['input_type'],
-                'ground_truth_file': step['ground_truth'],
-                'result_file': f"media/output/u{step['step_number']}_inference.csv"
-            })
-            workflow_step.is_valid(raise_exception=True)
-            workflow_step_instance = workflow_step.save()
-
-        return Response({"detail": "Chained pipeline launched via Celery."}, status=status.HTTP_202_ACCEPTED)
+        return Response({"detail": "Chained pipeline launched via Celery.", "id": workflow.id}, status=status.HTTP_202_ACCEPTED)
 
-class WorkflowRunListView(APIView):
+class WorkflowImportView(APIView):
     permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, YAMLParser, LegacyYAMLParser, MultiPartParser]
+
+    def post(self, request):
+        # A JSON/YAML body, or the same document uploaded as "file"; JSON parses as YAML too
+        document = load_yaml(request.FILES['file'].read()) if 'file' in request.FILES else request.data
+        workflows = document.get('workflows') if isinstance(document, dict) else document
+
+        if isinstance(workflows, list) and len(workflows) > settings.WORKFLOW_IMPORT_MAX_WORKFLOWS:
+            return Response(
+                {"error": f"At most {settings.WORKFLOW_IMPORT_MAX_WORKFLOWS} workflows can be imported at once"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-    def get(self, request):
         try:
-            instances = WorkflowRun.objects.all()
-        except WorkflowRun.DoesNotExist:
-            return Response({"error": "Workflow not found"}, status=status.HTTP_404_NOT_FOUND)
+            created = create_workflows(workflows, request.user.username)
+        except WorkflowSpecError as e:
+            return Response({"error": str(e), "errors": e.errors}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = WorkflowRunReadSerializer(instances, many=True)
+        return Response(
+            {"detail": f"Imported {len(created)} workflows.", "ids": [workflow.id for workflow in created]},
+            status=status.HTTP_201_CREATED
+        )
 
-        if serializer:
-            return Response(serializer.data, status=status.HTTP_200_OK)
+WORKFLOW_RUN_FILTERS = dict({
+    'workflow': ('workflow_id', int),
+    'run_by': ('run_by', str),
+    'status': ('status', str),
+    'error': ('error', parse_bool),
+    'batch': ('batch_id', int),
+}, **date_range('start_time'))
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+class WorkflowRunListView(APIView):
+    permission_classes = [IsAuthenticated]
 
-def get_all_video_paths(base_path):
-    video_files = []
-    for root, dirs, files in os.walk(base_path):
-        for file in files:
-            if file.lower().endswith(settings.VIDEO_EXTENSIONS):
-                video_files.append(os.path.join(root, file))
-    return video_files
+    def get(self, request):
+        instances = apply_filters(WorkflowRun.objects.all(), request.query_params, WORKFLOW_RUN_FILTERS)
+        instances = WorkflowRunListSerializer.setup_eager_loading(instances, request.query_params.get('expand'))
+        return paginated_response(request, self, instances, WorkflowRunListSerializer)
 
 class WorkflowRunView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
         try:
-            instance = WorkflowRun.objects.get(id=pk)
+            instance = WorkflowRunReadSerializer.setup_eager_loading(WorkflowRun.objects.all()).get(id=pk)
         except WorkflowRun.DoesNotExist:
             return Response({"error": "Workflow not found"}, status=status.HTTP_404_NOT_FOUND)
 
         serializer = WorkflowRunReadSerializer(instance)
 
         if serializer:
-            video_paths = get_all_video_paths(os.path.join(settings.MEDIA_ROOT, 'output', f'{instance.workflow.name}_{instance.id}'))
+            video_paths = [
+                os.path.join(settings.MEDIA_ROOT, path)
+                for path in instance.artifacts.filter(kind='video').order_by('path').values_list('path', flat=True)
+            ]
             response = serializer.data
             response['video_paths'] = video_paths
             return Response(response, status=status.HTTP_200_OK)
@@ -122,6 +145,100 @@ class WorkflowRunView(APIView):
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+WORKFLOW_ARTIFACT_FILTERS = {
+    'kind': ('kind', str),
+    'step': ('step_number', int),
+}
+
+class WorkflowRunArtifactsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        if not WorkflowRun.objects.filter(id=pk).exists():
+            return Response({"error": "Workflow run not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        artifacts = apply_filters(WorkflowArtifact.objects.filter(workflow_run_id=pk), request.query_params, WORKFLOW_ARTIFACT_FILTERS)
+        return paginated_response(request, self, artifacts, WorkflowArtifactSerializer, ordering='path')
+
+class WorkflowRunProgressView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            instance = WorkflowRun.objects.get(id=pk)
+        except WorkflowRun.DoesNotExist:
+            return Response({"error": "Workflow run not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            "run_id": instance.id,
+            "status": instance.status,
+            "queue_position": queue_position(instance),
+            "error": instance.error,
+            "error_message": instance.error_message,
+            "steps": run_progress(instance)
+        }, status=status.HTTP_200_OK)
+
+class WorkflowRunEventsView(APIView):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, EventStreamRenderer]
+
+    def get(self, request, pk):
+        try:
+            instance = WorkflowRun.objects.get(id=pk)
+        except WorkflowRun.DoesNotExist:
+            return Response({"error": "Workflow run not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(run_event_stream(instance), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class WorkflowRunResumeView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        try:
+            workflow_run = WorkflowRun.objects.get(id=pk)
+        except WorkflowRun.DoesNotExist:
+            return Response({"error": "Workflow run not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if not workflow_run.error:
+            return Response({"error": "Only failed workflow runs can be resumed"}, status=status.HTTP_400_BAD_REQUEST)
+
+        completed = completed_step_results(workflow_run)
+
+        try:
+            build_workflow_canvas(workflow_run, completed=completed)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Claimed in one conditional update, so concurrent resumes can't both dispatch the remaining steps
+        claimed = WorkflowRun.objects.filter(id=workflow_run.id, error=True).update(
+            error=False,
+            error_message='',
+            end_time=None,
+            status=WorkflowRun.QUEUED
+        )
+        if not claimed:
+            return Response({"error": "This workflow run is already being resumed"}, status=status.HTTP_409_CONFLICT)
+
+        workflow_run.error = False
+        workflow_run.error_message = ''
+        workflow_run.end_time = None
+        queue_run(workflow_run)
+        admit_queued_runs()
+        workflow_run.refresh_from_db()
+
+        return Response(
+            {
+                "detail": "Workflow run resumed via Celery.",
+                "completed_steps": sorted(completed),
+                "status": workflow_run.status,
+                "queue_position": queue_position(workflow_run)
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+
 class TriggerWorkFlowView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -131,7 +248,8 @@ class TriggerWorkFlowView(APIView):
         except Workflow.DoesNotExist:
             return Response({"error": "Workflow not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = WorkflowReadSerializer(instance)
+        if not instance.steps.exists():
+            return Response('This workflow did not have any steps. Execution was stopped', status=status.HTTP_400_BAD_REQUEST)
 
         workflow_run = WorkflowRun.objects.create(
             workflow = instance,
@@ -142,52 +260,213 @@ class TriggerWorkFlowView(APIView):
         workflow_run.output = f"output/{instance.name}_{workflow_run.id}/"
         workflow_run.save()
 
-        if serializer:
-            serializer_data = serializer.data
-            
-            if not serializer_data['steps']:
-                return Response('This workflow did not have any steps. Execution was stopped', status=status.HTTP_400_BAD_REQUEST)
-
-            task_chain = []
-            # Seed the chain with the first task (dummy prev_result)
-            first = run_whl_task.s(
-                workflow_run.id,
-                1,
-                serializer_data['steps'][0]['id'],
-                os.path.join(settings.MEDIA_ROOT, serializer_data['steps'][0]['wheel_file']['path']),
-                os.path.join(settings.MEDIA_ROOT, instance.input.path),
-                os.path.join(settings.MEDIA_ROOT, workflow_run.output),
-                os.path.join(settings.MEDIA_ROOT, serializer_data['steps'][0]['class_file']['path']),
-                os.path.join(settings.MEDIA_ROOT, serializer_data['steps'][0]['ground_truth_file']['path']),
-                os.path.join(settings.MEDIA_ROOT, serializer_data['steps'][0]['model_file']['path']) if serializer_data['steps'][0]['model_file'] else None,
-                serializer_data['steps'][0]['input_type'].lower()
+        try:
+            build_workflow_canvas(workflow_run)
+        except ValueError as e:
+            workflow_run.delete()
+            return Response(str(e), status=status.HTTP_400_BAD_REQUEST)
+
+        # Starts right away when the workers have room, otherwise waits its turn
+        queue_run(workflow_run)
+        admit_queued_runs()
+        workflow_run.refresh_from_db()
+
+        return Response(
+            {
+                "detail": "Chained pipeline launched via Celery.",
+                "run_id": workflow_run.id,
+                "status": workflow_run.status,
+                "queue_position": queue_position(workflow_run)
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+
+class TriggerWorkflowBatchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        try:
+            instance = Workflow.objects.get(id=pk)
+        except Workflow.DoesNotExist:
+            return Response({"error": "Workflow not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if not instance.steps.exists():
+            return Response('This workflow did not have any steps. Execution was stopped', status=status.HTTP_400_BAD_REQUEST)
+
+        if hasattr(request.data, 'getlist'):
+            # Form bodies repeat the field once per input
+            input_ids = request.data.getlist('inputs') or None
+        else:
+            input_ids = request.data.get('inputs')
+        folder = request.data.get('folder')
+
+        if input_ids is not None and not isinstance(input_ids, list):
+            return Response({"error": "inputs must be a list of input ids"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if input_ids:
+            # Ids from form and YAML bodies arrive as strings
+            if not all(str(input_id).strip().isdigit() for input_id in input_ids):
+                return Response({"error": "inputs must be a list of input ids"}, status=status.HTTP_400_BAD_REQUEST)
+            input_ids = [int(input_id) for input_id in input_ids]
+            files = UploadedInputFile.objects.in_bulk(input_ids)
+            missing = [input_id for input_id in input_ids if input_id not in files]
+            if missing:
+                return Response({"error": f"Input files not found: {missing}"}, status=status.HTTP_400_BAD_REQUEST)
+            input_paths = [files[input_id].path for input_id in input_ids]
+        elif folder:
+            try:
+                input_paths = folder_inputs(folder)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            return Response({"error": "Provide a list of input ids or a folder"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not input_paths:
+            return Response({"error": "No inputs to run"}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_concurrency = request.data.get('max_concurrency')
+        if max_concurrency is not None and (not str(max_concurrency).isdigit() or int(max_concurrency) < 1):
+            return Response({"error": "max_concurrency must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            batch, runs = create_batch(
+                instance,
+                request.user.username,
+                input_paths,
+                max_concurrency=int(max_concurrency) if max_concurrency is not None else None
             )
-            task_chain.append(first)
-
-            # Remaining steps: use wrapper to inject previous result
-            for step in serializer_data['steps'][1:]:
-                task_chain.append(
-                    chain_step_wrapper.s(
-                        workflow_run.id,
-                        step['step_number'],
-                        step['id'],
-                        os.path.join(settings.MEDIA_ROOT, step['wheel_file']['path']),
-                        os.path.join(settings.MEDIA_ROOT, workflow_run.output),
-                        os.path.join(settings.MEDIA_ROOT, step['class_file']['path']),
-                        os.path.join(settings.MEDIA_ROOT, step['ground_truth_file']['path']),
-                        os.path.join(settings.MEDIA_ROOT, step['model_file']['path']) if step['model_file'] else None,
-                        step['input_type'].lower()
-                    )
-                )
-
-            chain(*task_chain).apply_async()
-            return Response({"detail": "Chained pipeline launched via Celery."}, status=status.HTTP_202_ACCEPTED)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        admit_queued_runs()
+
+        return Response(
+            {
+                "detail": "Batch queued via Celery.",
+                "batch_id": batch.id,
+                "runs": [workflow_run.id for workflow_run in runs]
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+class WorkflowBatchView(APIView):
+    permission_classes = [IsAuthenticated]
 
-class WorkflowListView(generics.ListAPIView):
-    queryset = Workflow.objects.all()
-    serializer_class = WorkflowReadSerializer
+    def get(self, request, pk):
+        try:
+            batch = WorkflowBatch.objects.get(id=pk)
+        except WorkflowBatch.DoesNotExist:
+            return Response({"error": "Workflow batch not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        response = WorkflowBatchSerializer(batch).data
+        response['runs'] = list(
+            batch.runs
+            .annotate(accuracy=Avg('performance_workflow_run__accuracy'))
+            .order_by('id')
+            .values('id', 'input_path', 'status', 'error_message', 'accuracy')
+        )
+        return Response(response, status=status.HTTP_200_OK)
+
+class WorkflowBenchmarkCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        try:
+            instance = Workflow.objects.get(id=pk)
+        except Workflow.DoesNotExist:
+            return Response({"error": "Workflow not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        iterations = request.data.get('iterations', 5)
+        warmup = request.data.get('warmup', 1)
+        if not str(iterations).isdigit() or int(iterations) < 1 or not str(warmup).isdigit():
+            return Response({"error": "iterations must be a positive integer and warmup a non-negative one"}, status=status.HTTP_400_BAD_REQUEST)
+        iterations, warmup = int(iterations), int(warmup)
+
+        baseline = None
+        if request.data.get('baseline'):
+            baseline = WorkflowBenchmark.objects.filter(id=request.data['baseline'], workflow=instance).first()
+            if not baseline:
+                return Response({"error": "Baseline benchmark not found for this workflow"}, status=status.HTTP_400_BAD_REQUEST)
+
+        input_path = ''
+        if request.data.get('input'):
+            input_file = UploadedInputFile.objects.filter(id=request.data['input']).first()
+            if not input_file:
+                return Response({"error": "Input file not found"}, status=status.HTTP_400_BAD_REQUEST)
+            input_path = input_file.path
+
+        try:
+            # One run at a time and no step cache, so runs don't skew each other's numbers
+            batch, runs = create_batch(
+                instance,
+                request.user.username,
+                [input_path] * (warmup + iterations),
+                max_concurrency=1,
+                cache_enabled=False
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        benchmark = WorkflowBenchmark.objects.create(
+            workflow=instance,
+            batch=batch,
+            baseline=baseline,
+            created_by=request.user.username,
+            iterations=iterations,
+            warmup=warmup
+        )
+
+        admit_queued_runs()
+
+        return Response(
+            {
+                "detail": "Benchmark queued via Celery.",
+                "benchmark_id": benchmark.id,
+                "runs": [workflow_run.id for workflow_run in runs]
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+
+class WorkflowBenchmarkView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            benchmark = WorkflowBenchmark.objects.select_related('batch', 'baseline').get(id=pk)
+        except WorkflowBenchmark.DoesNotExist:
+            return Response({"error": "Workflow benchmark not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if benchmark.batch.finished_at and request.query_params.get('refresh'):
+            finalize_benchmark(benchmark, settings.BENCHMARK_REGRESSION_THRESHOLD)
+
+        response = WorkflowBenchmarkSerializer(benchmark).data
+        response['finished_runs'] = benchmark.batch.finished_runs
+        response['failed_runs'] = benchmark.batch.failed_runs
+        response['total_runs'] = benchmark.batch.total_runs
+        return Response(response, status=status.HTTP_200_OK)
+
+class WorkflowBenchmarkCompareView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, baseline_pk):
+        benchmarks = WorkflowBenchmark.objects.in_bulk([pk, baseline_pk])
+        if pk not in benchmarks or baseline_pk not in benchmarks:
+            return Response({"error": "Workflow benchmark not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        report, baseline_report = benchmarks[pk].report, benchmarks[baseline_pk].report
+        if not report or not baseline_report:
+            return Response({"error": "Both benchmarks need a finished report"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            threshold = float(request.query_params.get('threshold', settings.BENCHMARK_REGRESSION_THRESHOLD))
+        except ValueError:
+            return Response({"error": "threshold must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+        regressions = compare_reports(report, baseline_report, threshold)
+        return Response(
+            {"benchmark": pk, "baseline": baseline_pk, "threshold": threshold, "regressed": bool(regressions), "regressions": regressions},
+            status=status.HTTP_200_OK
+        )
 
 class WorkflowPinView(APIView):
     permission_classes = [IsAuthenticated]
@@ -215,15 +494,33 @@ class WorkflowPinView(APIView):
 
 
 class WorkflowListView(generics.ListAPIView):
-    queryset = Workflow.objects.all()
-    serializer_class = WorkflowReadSerializer
+    serializer_class = WorkflowListSerializer
+    pagination_class = CursorPagination
+    filters = dict({
+        'created_by': ('created_by', str),
+        'pinned': ('pinned', parse_bool),
+    }, **date_range('created_at'))
+
+    def get_queryset(self):
+        queryset = apply_filters(Workflow.objects.all(), self.request.query_params, self.filters)
+        return WorkflowListSerializer.setup_eager_loading(queryset, self.request.query_params.get('expand'))
+
+    @cached_response(lambda request: listing_key('workflows', request))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def paginate_queryset(self, queryset):
+        # Pinned workflows first, as before; within each group newest first
+        self.paginator.ordering = ('-pinned', '-id')
+        return super().paginate_queryset(queryset)
 
 class WorkflowDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cached_response(lambda request, pk: f'workflow:{pk}')
     def get(self, request, pk):
         try:
-            instance = Workflow.objects.get(id=pk)
+            instance = WorkflowReadSerializer.setup_eager_loading(Workflow.objects.all()).get(id=pk)
         except Workflow.DoesNotExist:
             return Response({"error": "Workflow not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -246,25 +543,17 @@ class WorkflowDetailView(APIView):
             'input': request.data['input'],
         }, partial=True)
 
-        workflow_steps = instance.steps.all()
-        workflow_steps_id_mapping = {workflow_step.id: workflow_step for workflow_step in workflow_steps}
-
-        for step in request.data['steps']:
-            
-            workflow_steps_id_mapping[step['id']].workflow_id =  instance.id
-            workflow_steps_id_mapping[step['id']].step_number = step['step_number']
-            workflow_steps_id_mapping[step['id']].wheel_file_id = step['wheel_file']['id']
-            workflow_steps_id_mapping[step['id']].model_file_id = step['model_file']['id']
-            workflow_steps_id_mapping[step['id']].class_file_id = step['class_file']['id']
-            workflow_steps_id_mapping[step['id']].ground_truth_file_id =  step['ground_truth_file']['id']
-            workflow_steps_id_mapping[step['id']].input_type =  step['input_type']
-            workflow_steps_id_mapping[step['id']].save()
+        if not workflow_serializer.is_valid():
+            return Response(workflow_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        if workflow_serializer.is_valid():
-            workflow_serializer.save()
-            return Response(workflow_serializer.data, status=status.HTTP_200_OK)
+        try:
+            with transaction.atomic():
+                update_workflow_steps(instance, request.data.get('steps', []))
+                workflow_serializer.save()
+        except WorkflowSpecError as e:
+            return Response({"error": str(e), "errors": e.errors}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(workflow_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(workflow_serializer.data, status=status.HTTP_200_OK)
 
 
     def delete(self, request, pk):
@@ -277,12 +566,21 @@ class WorkflowDetailView(APIView):
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+def model_performances():
+    # Accuracy per CPU-second of the step that produced it, null when CPU time wasn't measured
+    return ModelPerformanceSerializer.setup_eager_loading(ModelPerformance.objects.all()).annotate(
+        accuracy_per_cpu_second=ExpressionWrapper(
+            F('accuracy') / NullIf(F('workflow_step_run__cpu_seconds'), 0),
+            output_field=FloatField()
+        )
+    )
+
 class ModelPerformanceView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
         try:
-            instances = ModelPerformance.objects.filter(workflow_run_id=pk)
+            instances = model_performances().filter(workflow_run_id=pk)
         except not instances:
             return Response({"error": "Model performance not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -293,19 +591,58 @@ class ModelPerformanceView(APIView):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+MODEL_PERFORMANCE_FILTERS = dict({
+    'workflow': ('workflow_run__workflow_id', int),
+    'run_by': ('workflow_run__run_by', str),
+    'error': ('workflow_run__error', parse_bool),
+    'min_accuracy': ('accuracy__gte', float),
+}, **date_range('workflow_run__start_time'))
+
 class ModelPerformanceListView(APIView):
     # permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        try:
-            instances = ModelPerformance.objects.all().order_by('-accuracy','-workflow_step_run__workflow_step__model_file__size')
-        except not instances:
-            return Response({"error": "Model performance not found"}, status=status.HTTP_404_NOT_FOUND)
-
-        serializer = ModelPerformanceSerializer(instances, many=True)
+        instances = apply_filters(model_performances(), request.query_params, MODEL_PERFORMANCE_FILTERS)
+        # Cursors compare whole keys as row values, which a null would break, so
+        # rows missing a score (or a model size) sort last as -1
+        if request.query_params.get('rank') == 'efficiency':
+            instances = instances.annotate(rank=Coalesce('accuracy_per_cpu_second', Value(-1.0)))
+            ordering = ('-rank', '-accuracy_rank', '-id')
+        else:
+            ordering = ('-accuracy_rank', '-model_size', '-id')
+        instances = instances.annotate(
+            accuracy_rank=Coalesce('accuracy', Value(-1.0)),
+            model_size=Coalesce(F('workflow_step_run__workflow_step__model_file__size'), Value(-1))
+        )
+        return paginated_response(request, self, instances, ModelPerformanceSerializer, ordering)
 
-        if serializer:
-            return Response(serializer.data, status=status.HTTP_200_OK)
+LEADERBOARD_FILTERS = {
+    'wheel': ('wheel_file_id', int),
+    'model': ('model_file_id', int),
+    'ground_truth': ('ground_truth_file_id', int),
+    'min_runs': ('run_count__gte', int),
+    'min_accuracy': ('best_accuracy__gte', float),
+}
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+class ModelLeaderboardView(APIView):
+    permission_classes = [IsAuthenticated]
 
+    def get(self, request):
+        order = request.query_params.get('order', 'best')
+        if order not in ('best', 'mean', 'latest'):
+            return Response({"error": "order must be one of best, mean, latest"}, status=status.HTTP_400_BAD_REQUEST)
+
+        top = request.query_params.get('top', settings.API_PAGE_SIZE)
+        if not str(top).isdigit() or int(top) < 1:
+            return Response({"error": "top must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+        top = min(int(top), settings.API_MAX_PAGE_SIZE)
+
+        instances = apply_filters(ModelLeaderboardEntry.objects.all(), request.query_params, LEADERBOARD_FILTERS)
+        instances = ModelLeaderboardEntrySerializer.setup_eager_loading(instances).order_by(
+            F(f'{order}_accuracy').desc(nulls_last=True), '-run_count', 'id'
+        )[:top]
+
+        data = ModelLeaderboardEntrySerializer(instances, many=True).data
+        for rank, entry in enumerate(data, start=1):
+            entry['rank'] = rank
+        return Response(data, status=status.HTTP_200_OK)
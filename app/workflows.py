@@ -0,0 +1,262 @@
+"""Validating and writing workflow definitions in bulk.
+
+Every workflow and step in a request is checked before anything is written,
+with one query per kind of lookup rather than one per row, and then written
+with bulk inserts/updates inside a single transaction. Bulk writes skip model
+signals, so the cached workflow responses are invalidated here instead.
+"""
+from django.db import transaction
+from django.db.models import Q
+from files.models import UploadedInputFile, UploadedWheelFile, UploadedModelFile, UploadedClassFile, UploadedGroundTruthFile
+from app.dag import topological_levels
+from app.models import Workflow, WorkflowStep
+from app.signals import invalidate_workflows
+
+# Step spec key -> (WorkflowStep field, file model)
+STEP_FILES = {
+    'script': ('wheel_file', UploadedWheelFile),
+    'model': ('model_file', UploadedModelFile),
+    'class': ('class_file', UploadedClassFile),
+    'ground_truth': ('ground_truth_file', UploadedGroundTruthFile),
+}
+
+STEP_UPDATE_FIELDS = ['step_number', 'wheel_file', 'model_file', 'class_file', 'ground_truth_file', 'input_type']
+
+
+class WorkflowSpecError(ValueError):
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def file_id(reference):
+    """The id a file reference names directly: an int or a digit string; None for names."""
+    if isinstance(reference, int) and not isinstance(reference, bool):
+        return reference
+    if isinstance(reference, str) and reference.isdigit():
+        return int(reference)
+    return None
+
+
+def resolve_files(model, references):
+    """Map file references (ids, or names for other strings) to ids with one query; unknown ones are left out."""
+    references = {ref for ref in references if isinstance(ref, (int, str)) and not isinstance(ref, bool)}
+    if not references:
+        return {}
+    ids = {file_id(ref) for ref in references} - {None}
+    names = {ref for ref in references if file_id(ref) is None}
+    found = dict(model.objects.filter(Q(id__in=ids) | Q(name__in=names)).values_list('name', 'id'))
+    found_ids = set(found.values())
+
+    resolved = {}
+    for ref in references:
+        if file_id(ref) is not None:
+            if file_id(ref) in found_ids:
+                resolved[ref] = file_id(ref)
+        elif ref in found:
+            resolved[ref] = found[ref]
+    return resolved
+
+
+def hashable(value):
+    return value if isinstance(value, (int, str)) else repr(value)
+
+
+def check_steps(label, steps, errors):
+    """Shape and dependency checks for one workflow's steps; problems are appended to `errors`."""
+    if not isinstance(steps, list) or not steps:
+        errors.append(f"{label}: steps must be a non-empty list")
+        return False
+
+    numbers = [step.get('step_number') if isinstance(step, dict) else None for step in steps]
+    if not all(isinstance(number, int) and number > 0 for number in numbers):
+        errors.append(f"{label}: every step needs a positive integer step_number")
+        return False
+    if len(set(numbers)) != len(numbers):
+        errors.append(f"{label}: step numbers must be unique")
+        return False
+
+    for step in steps:
+        input_type = step.get('input_type') or ''
+        if not isinstance(input_type, str) or len(input_type) > WorkflowStep._meta.get_field('input_type').max_length:
+            errors.append(f"{label} step {step['step_number']}: input_type must be a string of at most 24 characters")
+    try:
+        topological_levels({step['step_number']: step.get('depends_on') or [] for step in steps})
+    except (TypeError, ValueError) as e:
+        errors.append(f"{label}: {e}")
+        return False
+    return True
+
+
+def validate_workflows(specs):
+    """Check a list of workflow specs and resolve their file references.
+
+    Returns (input ids, {file model: {reference: id}}); raises WorkflowSpecError
+    listing every problem found.
+    """
+    errors = []
+    if not isinstance(specs, list) or not specs:
+        raise WorkflowSpecError(["Expected a non-empty list of workflows"])
+
+    seen_names, seen_descriptions = set(), set()
+    for index, spec in enumerate(specs):
+        if not isinstance(spec, dict):
+            errors.append(f"Workflow {index}: expected an object")
+            continue
+        label = f"Workflow {spec.get('name') or index}"
+        for field in ('name', 'description'):
+            value = spec.get(field)
+            if not isinstance(value, str) or not value or len(value) > Workflow._meta.get_field(field).max_length:
+                errors.append(f"{label}: {field} must be a non-empty string of at most 255 characters")
+        if spec.get('name') in seen_names:
+            errors.append(f"{label}: name appears more than once")
+        if spec.get('description') in seen_descriptions:
+            errors.append(f"{label}: description appears more than once")
+        seen_names.add(spec.get('name'))
+        seen_descriptions.add(spec.get('description'))
+        check_steps(label, spec.get('steps'), errors)
+    if errors:
+        raise WorkflowSpecError(errors)
+
+    taken = Workflow.objects.filter(Q(name__in=seen_names) | Q(description__in=seen_descriptions)).values_list('name', 'description')
+    for name, description in taken:
+        if name in seen_names:
+            errors.append(f"Workflow {name}: a workflow with this name already exists")
+        if description in seen_descriptions:
+            errors.append(f"Workflow with description {description!r} already exists")
+
+    inputs = resolve_files(UploadedInputFile, {hashable(spec['input']) for spec in specs if spec.get('input') is not None})
+    files = {
+        model: resolve_files(model, {hashable(step[key]) for spec in specs for step in spec['steps'] if step.get(key) is not None})
+        for key, (_, model) in STEP_FILES.items()
+    }
+
+    for spec in specs:
+        if spec.get('input') is not None and hashable(spec['input']) not in inputs:
+            errors.append(f"Workflow {spec['name']}: input {spec['input']!r} not found")
+        for step in spec['steps']:
+            for key, (_, model) in STEP_FILES.items():
+                if step.get(key) is not None and hashable(step[key]) not in files[model]:
+                    errors.append(f"Workflow {spec['name']} step {step['step_number']}: {key} {step[key]!r} not found")
+    if errors:
+        raise WorkflowSpecError(errors)
+
+    return inputs, files
+
+
+def create_workflows(specs, created_by):
+    """Create workflows with their steps and dependencies in one transaction; returns the workflows."""
+    inputs, files = validate_workflows(specs)
+
+    with transaction.atomic():
+        workflows = Workflow.objects.bulk_create([
+            Workflow(
+                name=spec['name'],
+                description=spec['description'],
+                input_id=inputs.get(hashable(spec.get('input'))),
+                created_by=created_by
+            )
+            for spec in specs
+        ])
+
+        steps = []
+        for workflow, spec in zip(workflows, specs):
+            for step in spec['steps']:
+                fields = {field: files[model].get(hashable(step.get(key))) for key, (field, model) in STEP_FILES.items()}
+                steps.append(WorkflowStep(
+                    workflow=workflow,
+                    step_number=step['step_number'],
+                    input_type=step.get('input_type') or '',
+                    result_file=f"media/output/u{step['step_number']}_inference.csv",
+                    **{f'{field}_id': file_id for field, file_id in fields.items()}
+                ))
+        steps = WorkflowStep.objects.bulk_create(steps)
+
+        by_number = {(step.workflow_id, step.step_number): step for step in steps}
+        WorkflowStep.depends_on.through.objects.bulk_create([
+            WorkflowStep.depends_on.through(
+                from_workflowstep_id=by_number[(workflow.id, step['step_number'])].id,
+                to_workflowstep_id=by_number[(workflow.id, number)].id
+            )
+            for workflow, spec in zip(workflows, specs)
+            for step in spec['steps']
+            for number in step.get('depends_on') or []
+        ])
+
+        transaction.on_commit(lambda: invalidate_workflows(*(workflow.id for workflow in workflows)))
+
+    return workflows
+
+
+def update_workflow_steps(workflow, steps):
+    """Validate and apply edits to a workflow's existing steps (the read serializer's shape).
+
+    Steps with a `depends_on` key get their dependencies replaced. Call inside a
+    transaction; raises WorkflowSpecError without writing if anything is invalid.
+    """
+    label = f"Workflow {workflow.name}"
+    errors = []
+    existing = {step.id: step for step in workflow.steps.prefetch_related('depends_on')}
+
+    if not isinstance(steps, list):
+        raise WorkflowSpecError([f"{label}: steps must be a list"])
+    for step in steps:
+        if not isinstance(step, dict) or hashable(step.get('id')) not in existing:
+            errors.append(f"{label}: step {step.get('id') if isinstance(step, dict) else step!r} does not belong to this workflow")
+    if errors:
+        raise WorkflowSpecError(errors)
+    submitted = {step['id']: step for step in steps}
+    if len(submitted) != len(steps):
+        raise WorkflowSpecError([f"{label}: each step may only be listed once"])
+
+    # Checked as the whole workflow after the edits, so a partial edit can depend on
+    # steps it doesn't resubmit and cycles through those steps are still caught
+    numbers = {
+        step_id: submitted[step_id].get('step_number') if step_id in submitted else instance.step_number
+        for step_id, instance in existing.items()
+    }
+    merged = []
+    for step_id, instance in existing.items():
+        step = dict(submitted.get(step_id, {'input_type': instance.input_type}), step_number=numbers[step_id])
+        if 'depends_on' not in step:
+            step['depends_on'] = [numbers[upstream.id] for upstream in instance.depends_on.all()]
+        merged.append(step)
+    check_steps(label, merged, errors)
+    if errors:
+        raise WorkflowSpecError(errors)
+
+    # Files come nested as in the read serializer, {"id": ...}
+    chosen = {
+        (step['id'], field): hashable(step[field].get('id') if isinstance(step[field], dict) else step[field])
+        for step in steps for field, _ in STEP_FILES.values() if step.get(field) is not None
+    }
+    references = {
+        model: resolve_files(model, {ref for (_, name), ref in chosen.items() if name == field})
+        for field, model in STEP_FILES.values()
+    }
+    for (step_id, field), ref in chosen.items():
+        if ref not in references[dict(STEP_FILES.values())[field]]:
+            errors.append(f"{label} step {existing[step_id].step_number}: {field} {ref!r} not found")
+    if errors:
+        raise WorkflowSpecError(errors)
+
+    for step in steps:
+        instance = existing[step['id']]
+        instance.step_number = step['step_number']
+        instance.input_type = step.get('input_type', instance.input_type) or ''
+        for field, model in STEP_FILES.values():
+            if field in step:
+                setattr(instance, f'{field}_id', references[model].get(chosen.get((step['id'], field))))
+    WorkflowStep.objects.bulk_update([existing[step['id']] for step in steps], STEP_UPDATE_FIELDS)
+
+    by_number = {step.step_number: step for step in existing.values()}
+    rewired = [step for step in steps if 'depends_on' in step]
+    through = WorkflowStep.depends_on.through
+    through.objects.filter(from_workflowstep_id__in=[step['id'] for step in rewired]).delete()
+    through.objects.bulk_create([
+        through(from_workflowstep_id=step['id'], to_workflowstep_id=by_number[number].id)
+        for step in rewired
+        for number in step['depends_on'] or []
+    ])
+
+    transaction.on_commit(lambda: invalidate_workflows(workflow.id))
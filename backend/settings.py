@@ -55,6 +55,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'utils.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -122,7 +123,11 @@ DATABASES = {
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'utils.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 SIMPLE_JWT = {
@@ -154,6 +159,28 @@ CELERY_RESULT_BACKEND = 'django-db'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 
+# Inference steps go to a queue per input type; evaluation and bookkeeping
+# tasks use their own queues so they never wait behind hour-long video steps.
+CELERY_TASK_DEFAULT_QUEUE = 'celery'
+VIDEO_QUEUE = os.getenv('VIDEO_QUEUE', 'video')
+IMAGE_QUEUE = os.getenv('IMAGE_QUEUE', 'image')
+STEP_QUEUES = {'video': VIDEO_QUEUE, 'image': IMAGE_QUEUE}
+EVALUATION_QUEUE = os.getenv('EVALUATION_QUEUE', 'evaluation')
+CELERY_TASK_ROUTES = {
+    'tasks.evaluate_performance': {'queue': EVALUATION_QUEUE},
+    'tasks.checksum_artifacts': {'queue': EVALUATION_QUEUE},
+    'tasks.merge_shards_task': {'queue': CELERY_TASK_DEFAULT_QUEUE},
+    'tasks.admit_queued_runs': {'queue': CELERY_TASK_DEFAULT_QUEUE},
+}
+# Modules with tasks besides app.tasks
+CELERY_IMPORTS = ('app.pipeline',)
+
+# Workers take one task at a time and acknowledge it only when done, so a
+# worker lost mid-step doesn't drop its reserved tasks. RabbitMQ's
+# consumer_timeout must be longer than the longest step.
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ACKS_LATE = True
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -176,3 +203,98 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.flv', '.wmv')
 IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp')
+
+# Unpacked wheel environments, keyed by the wheel's sha256
+WHEEL_CACHE_ROOT = os.getenv('WHEEL_CACHE_ROOT', os.path.join(BASE_DIR, 'cache', 'wheels'))
+WHEEL_CACHE_MAX_BYTES = int(os.getenv('WHEEL_CACHE_MAX_BYTES', 10 * 1024 ** 3))
+WHEEL_CACHE_MIN_AGE = int(os.getenv('WHEEL_CACHE_MIN_AGE', 3600))
+
+# Warm inference worker processes, keyed by (wheel sha256, model file)
+INFERENCE_WORKER_MAX_JOBS = int(os.getenv('INFERENCE_WORKER_MAX_JOBS', 50))
+INFERENCE_WORKER_MAX_RSS_MB = int(os.getenv('INFERENCE_WORKER_MAX_RSS_MB', 4096))
+INFERENCE_POOL_MAX_IDLE = int(os.getenv('INFERENCE_POOL_MAX_IDLE', 2))
+# Idle workers unused for this long are stopped rather than keep a model resident (0 = never)
+INFERENCE_WORKER_MAX_IDLE_SECONDS = int(os.getenv('INFERENCE_WORKER_MAX_IDLE_SECONDS', 600))
+INFERENCE_THREADS = int(os.getenv('INFERENCE_THREADS', 0))
+INFERENCE_WORKER_MAX_VMEM_MB = int(os.getenv('INFERENCE_WORKER_MAX_VMEM_MB', 0))
+INFERENCE_KILL_OVER_RSS = os.getenv('INFERENCE_KILL_OVER_RSS', 'true').lower() == 'true'
+INFERENCE_CPU_LIMIT_SECONDS = int(os.getenv('INFERENCE_CPU_LIMIT_SECONDS', 0))
+
+# Steps run in their own interpreters, so a worker can take one task per core
+CELERY_WORKER_CONCURRENCY = int(os.getenv('CELERY_WORKER_CONCURRENCY', os.cpu_count() or 1))
+
+# Videos with at least 2x this many frames are split into frame-range shards
+VIDEO_SHARD_MIN_FRAMES = int(os.getenv('VIDEO_SHARD_MIN_FRAMES', 9000))
+VIDEO_SHARD_MAX_SHARDS = int(os.getenv('VIDEO_SHARD_MAX_SHARDS', 8))
+VIDEO_SHARD_CONCAT_OUTPUT = os.getenv('VIDEO_SHARD_CONCAT_OUTPUT', 'true').lower() == 'true'
+
+# Image folders with at least 2x this many files are split into contiguous chunks
+IMAGE_SHARD_MIN_FILES = int(os.getenv('IMAGE_SHARD_MIN_FILES', 2000))
+IMAGE_SHARD_MAX_SHARDS = int(os.getenv('IMAGE_SHARD_MAX_SHARDS', 8))
+
+# Step results keyed by the content hashes of input, wheel, model and class file
+STEP_CACHE_ENABLED = os.getenv('STEP_CACHE_ENABLED', 'true').lower() == 'true'
+STEP_CACHE_ROOT = os.getenv('STEP_CACHE_ROOT', os.path.join(BASE_DIR, 'cache', 'steps'))
+STEP_CACHE_MAX_BYTES = int(os.getenv('STEP_CACHE_MAX_BYTES', 50 * 1024 ** 3))
+
+# Rows per chunk when streaming result and ground truth CSVs during evaluation
+EVALUATION_CHUNK_ROWS = int(os.getenv('EVALUATION_CHUNK_ROWS', 500_000))
+
+# Minimum seconds between progress updates a running step reports
+PROGRESS_UPDATE_INTERVAL = float(os.getenv('PROGRESS_UPDATE_INTERVAL', 2))
+
+# Server-sent event streams for run status. Each open stream holds a web worker
+# thread, so streams end after a few minutes and clients reconnect for a fresh snapshot
+EVENT_STREAM_HEARTBEAT_SECONDS = int(os.getenv('EVENT_STREAM_HEARTBEAT_SECONDS', 15))
+EVENT_STREAM_MAX_SECONDS = int(os.getenv('EVENT_STREAM_MAX_SECONDS', 300))
+
+# Admission control for workflow runs; runs over the caps wait in a FIFO queue
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+ADMISSION_MAX_RUNNING = int(os.getenv('ADMISSION_MAX_RUNNING', 8))
+ADMISSION_MAX_RUNNING_PER_USER = int(os.getenv('ADMISSION_MAX_RUNNING_PER_USER', 2))
+ADMISSION_MEMORY_BUDGET_MB = int(os.getenv('ADMISSION_MEMORY_BUDGET_MB', 16384))
+ADMISSION_DEFAULT_STEP_MEMORY_MB = int(os.getenv('ADMISSION_DEFAULT_STEP_MEMORY_MB', 2048))
+ADMISSION_HISTORY_SIZE = int(os.getenv('ADMISSION_HISTORY_SIZE', 20))
+ADMISSION_STALE_SECONDS = int(os.getenv('ADMISSION_STALE_SECONDS', 24 * 3600))
+# Admitted runs with no canvas task after this long are failed (the dispatch died)
+ADMISSION_DISPATCH_GRACE_SECONDS = int(os.getenv('ADMISSION_DISPATCH_GRACE_SECONDS', 300))
+# How often the queue is re-admitted, which also fails runs whose tasks were lost
+ADMISSION_CHECK_SECONDS = int(os.getenv('ADMISSION_CHECK_SECONDS', 60))
+CELERY_BEAT_SCHEDULE = {
+    'admit-queued-runs': {'task': 'tasks.admit_queued_runs', 'schedule': ADMISSION_CHECK_SECONDS},
+}
+
+# Workers hold off starting a step until this much memory is free on top of its estimate
+WORKER_MIN_FREE_MEMORY_MB = int(os.getenv('WORKER_MIN_FREE_MEMORY_MB', 512))
+WORKER_MEMORY_RETRY_SECONDS = int(os.getenv('WORKER_MEMORY_RETRY_SECONDS', 30))
+WORKER_MEMORY_MAX_RETRIES = int(os.getenv('WORKER_MEMORY_MAX_RETRIES', 20))
+
+# Benchmarks flag a step metric as regressed when its p50 or p95 is this much worse than the baseline
+BENCHMARK_REGRESSION_THRESHOLD = float(os.getenv('BENCHMARK_REGRESSION_THRESHOLD', 0.10))
+
+# Page size for the cursor-paginated list endpoints; clients may ask for up to the max with ?page_size=
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 500))
+
+# Cached read responses (workflow and file listings); invalidated by model signals, TTL is a backstop
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_SECONDS = int(os.getenv('RESPONSE_CACHE_SECONDS', 300))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    RESPONSE_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('RESPONSE_CACHE_ROOT', os.path.join(BASE_DIR, 'cache', 'responses')),
+        'TIMEOUT': RESPONSE_CACHE_SECONDS,
+    },
+}
+
+# Most workflows a single import request may create
+WORKFLOW_IMPORT_MAX_WORKFLOWS = int(os.getenv('WORKFLOW_IMPORT_MAX_WORKFLOWS', 1000))
+
+# Responses at least this large are gzip/brotli compressed when the client accepts it
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', 1024))
+RESPONSE_BROTLI_QUALITY = int(os.getenv('RESPONSE_BROTLI_QUALITY', 5))
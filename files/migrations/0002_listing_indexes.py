@@ -0,0 +1,53 @@
+# Generated by Django 4.2.21 on 2026-10-18 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='uploadedclassfile',
+            index=models.Index(fields=['uploaded_by', '-id'], name='files_uploa_uploade_0cc1f6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedclassfile',
+            index=models.Index(fields=['uploaded_at'], name='files_uploa_uploade_c61c66_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedgroundtruthfile',
+            index=models.Index(fields=['uploaded_by', '-id'], name='files_uploa_uploade_00a0cb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedgroundtruthfile',
+            index=models.Index(fields=['uploaded_at'], name='files_uploa_uploade_6004c6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedinputfile',
+            index=models.Index(fields=['uploaded_by', '-id'], name='files_uploa_uploade_0c64b6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedinputfile',
+            index=models.Index(fields=['uploaded_at'], name='files_uploa_uploade_73d857_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedmodelfile',
+            index=models.Index(fields=['uploaded_by', '-id'], name='files_uploa_uploade_f4be4f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedmodelfile',
+            index=models.Index(fields=['uploaded_at'], name='files_uploa_uploade_f3b2fd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedwheelfile',
+            index=models.Index(fields=['uploaded_by', '-id'], name='files_uploa_uploade_e71d7e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedwheelfile',
+            index=models.Index(fields=['uploaded_at'], name='files_uploa_uploade_7aed8b_idx'),
+        ),
+    ]
@@ -15,6 +15,12 @@ class UploadedInputFile(models.Model):
     size = models.BigIntegerField(null=True, blank=True)
     input_type = models.CharField(max_length=10, choices=INPUT_TYPES)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['uploaded_by', '-id']),
+            models.Index(fields=['uploaded_at']),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -26,6 +32,12 @@ class UploadedModelFile(models.Model):
     description = models.CharField(max_length=255)
     size = models.BigIntegerField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['uploaded_by', '-id']),
+            models.Index(fields=['uploaded_at']),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -37,6 +49,12 @@ class UploadedWheelFile(models.Model):
     description = models.CharField(max_length=255)
     size = models.BigIntegerField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['uploaded_by', '-id']),
+            models.Index(fields=['uploaded_at']),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -48,6 +66,12 @@ class UploadedClassFile(models.Model):
     description = models.CharField(max_length=255)
     size = models.BigIntegerField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['uploaded_by', '-id']),
+            models.Index(fields=['uploaded_at']),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -59,6 +83,12 @@ class UploadedGroundTruthFile(models.Model):
     description = models.CharField(max_length=255)
     size = models.BigIntegerField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['uploaded_by', '-id']),
+            models.Index(fields=['uploaded_at']),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from utils.cache import bump_generation
+from files.models import (
+    UploadedWheelFile,
+    UploadedModelFile,
+    UploadedInputFile,
+    UploadedClassFile,
+    UploadedGroundTruthFile
+)
+
+# Same names as the file_type segment of files/list/<file_type>/
+FILE_TYPES = {
+    UploadedInputFile: 'input',
+    UploadedWheelFile: 'wheel',
+    UploadedModelFile: 'model',
+    UploadedClassFile: 'class',
+    UploadedGroundTruthFile: 'groundtruth',
+}
+
+def invalidate_file_listing(sender, **kwargs):
+    bump_generation(f'files:{FILE_TYPES[sender]}')
+
+for file_model in FILE_TYPES:
+    post_save.connect(invalidate_file_listing, sender=file_model)
+    post_delete.connect(invalidate_file_listing, sender=file_model)
@@ -23,6 +23,9 @@ from .serializers import (
     UploadedClassFileSerializer,
     UploadedGroundTruthFileSerializer
 )
+from utils.filters import apply_filters, date_range
+from utils.pagination import paginated_response
+from utils.cache import cached_response, listing_key
 import os
 import shutil, mimetypes
 
@@ -43,14 +46,18 @@ file_view_serializer_mapper = {
 }
 
 class ListView(APIView):
+    @cached_response(lambda request, file_type: listing_key(f'files:{file_type}', request))
     def get(self, request, file_type):
         if not file_type:
             return Response({"error": "Missing file_type"}, status=400)
 
-        qs = file_view_mapper[file_type].objects.all()
+        model = file_view_mapper[file_type]
+        filters = dict({'uploaded_by': ('uploaded_by', str)}, **date_range('uploaded_at'))
+        if file_type == 'input':
+            filters['input_type'] = ('input_type', str)
 
-        serializer = file_view_serializer_mapper[file_type](qs, many=True)
-        return Response(serializer.data)
+        qs = apply_filters(model.objects.all(), request.query_params, filters)
+        return paginated_response(request, self, qs, file_view_serializer_mapper[file_type])
 
 class UploadInputFolderView(APIView):
     parser_classes = [MultiPartParser]
@@ -0,0 +1,64 @@
+"""Read-through cache for API responses that change far less often than they're read.
+
+Responses live in the RESPONSE_CACHE_ALIAS cache (file based by default, so every
+web process on a host shares it). Detail responses are deleted by key when their
+object changes. Listings are cached per query string under a namespace
+generation, and bumping the generation drops every page and filter of that
+listing at once.
+"""
+import functools
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def generation(namespace):
+    return response_cache().get_or_set(f'generation:{namespace}', 1, timeout=None)
+
+
+def bump_generation(namespace):
+    cache = response_cache()
+    try:
+        cache.incr(f'generation:{namespace}')
+    except ValueError:
+        # Evicted or never read; any value other than the old one will do
+        cache.set(f'generation:{namespace}', 2, timeout=None)
+
+
+def listing_key(namespace, request):
+    query = '&'.join(sorted(request.GET.urlencode().split('&')))
+    return f'{namespace}:{generation(namespace)}:{query}'
+
+
+def invalidate(*keys):
+    response_cache().delete_many(keys)
+
+
+def cached_response(key_func):
+    """Cache an APIView handler's 200 responses under key_func(request, *args, **kwargs).
+
+    Wraps the handler rather than dispatch, so authentication and permission
+    checks still run on every request.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            if not settings.RESPONSE_CACHE_ENABLED:
+                return handler(self, request, *args, **kwargs)
+
+            key = key_func(request, *args, **kwargs)
+            data = response_cache().get(key)
+            if data is not None:
+                return Response(data, status=status.HTTP_200_OK)
+
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response_cache().set(key, response.data, settings.RESPONSE_CACHE_SECONDS)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,51 @@
+"""Query parameter filters for the list endpoints.
+
+Each endpoint declares the parameters it accepts as {param: (lookup, parse)};
+anything else in the query string is ignored. A value that doesn't parse is a
+400 rather than a silently unfiltered listing.
+"""
+from datetime import datetime, time
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def parse_bool(value):
+    lowered = value.lower()
+    if lowered in ('true', '1', 'yes'):
+        return True
+    if lowered in ('false', '0', 'no'):
+        return False
+    raise ValueError(value)
+
+
+def parse_moment(value):
+    """An ISO date or datetime; dates mean midnight and naive values the server's time zone."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def date_range(field):
+    return {
+        'since': (f'{field}__gte', parse_moment),
+        'until': (f'{field}__lt', parse_moment),
+    }
+
+
+def apply_filters(queryset, params, fields):
+    for param, (lookup, parse) in fields.items():
+        value = params.get(param)
+        if value in (None, ''):
+            continue
+        try:
+            queryset = queryset.filter(**{lookup: parse(value)})
+        except (TypeError, ValueError):
+            raise ValidationError({"error": f"Invalid value for {param}: {value}"})
+    return queryset
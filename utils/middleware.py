@@ -0,0 +1,78 @@
+"""Response compression negotiated from Accept-Encoding: whichever of brotli (when
+the brotli package is installed) and gzip the client gives the higher q-value,
+brotli on a tie.
+
+Responses under RESPONSE_COMPRESSION_MIN_BYTES and streaming responses (event
+streams, file downloads) are passed through untouched.
+"""
+import re
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODING_RE = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def encoding_qualities(header):
+    """Accept-Encoding as {encoding: q}; '*' stands for every encoding not listed."""
+    qualities = {}
+    for part in header.split(','):
+        match = ENCODING_RE.match(part)
+        if not match:
+            continue
+        try:
+            qualities[match.group(1).lower()] = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+    return qualities
+
+
+def choose_encoding(header):
+    """The encoding we can produce with the highest q, brotli winning ties; None to send as is."""
+    qualities = encoding_qualities(header)
+    chosen, chosen_quality = None, 0
+    for encoding in (['br'] if brotli is not None else []) + ['gzip']:
+        quality = qualities.get(encoding, qualities.get('*', 0))
+        if quality > chosen_quality:
+            chosen, chosen_quality = encoding, quality
+    return chosen
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.RESPONSE_BROTLI_QUALITY)
+    # Random padding in the gzip header, as GZipMiddleware does against BREACH
+    return compress_string(content, max_random_bytes=100)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < settings.RESPONSE_COMPRESSION_MIN_BYTES:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        content = compress(response.content, encoding)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response.headers['Content-Length'] = str(len(content))
+
+        # Compressed bytes differ from the original, so a strong ETag has to become weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,114 @@
+import json
+from django.conf import settings
+from django.db.models import F, Field, Func, Value
+from django.db.models.lookups import GreaterThan, LessThan
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor
+
+
+class Row(Func):
+    """A row value, `(a, b, c)`, so composite keys compare as one tuple."""
+    template = '(%(expressions)s)'
+    output_field = Field()
+
+
+class CursorPagination(pagination.CursorPagination):
+    """Keyset pagination, so a page costs the same however deep into the listing it is.
+
+    The cursor holds the whole ordering key of the row a page stopped at, and the
+    next page is the rows whose key compares past it as a row value. Ties on the
+    leading fields are therefore as cheap as anything else. `pk` is added to the
+    ordering when it isn't there already, so every key is unique.
+    """
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        names = [field.lstrip('-') for field in ordering]
+        if 'id' not in names and 'pk' not in names:
+            ordering += ('-pk' if ordering[-1].startswith('-') else 'pk',)
+        assert len({field.startswith('-') for field in ordering}) == 1, (
+            'Keyset pagination compares the ordering as one row value, so every field must sort the same way.'
+        )
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor.reverse if self.cursor else False
+        position = self.decode_position(self.cursor.position) if self.cursor and self.cursor.position else None
+
+        descending = self.ordering[0].startswith('-')
+        if reverse:
+            queryset = queryset.order_by(*pagination._reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if position is not None:
+            key = Row(*[F(field.lstrip('-')) for field in self.ordering])
+            after = LessThan if descending != reverse else GreaterThan
+            queryset = queryset.filter(after(key, Row(*[Value(value) for value in position])))
+
+        results = list(queryset[:self.page_size + 1])
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        # Going backwards, the page we came from is the next one; going forwards, the previous one
+        self.has_next = has_following if not reverse else position is not None
+        self.has_previous = has_following if reverse else position is not None
+        if self.page:
+            self.next_position = self.encode_position(self.page[-1])
+            self.previous_position = self.encode_position(self.page[0])
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def encode_position(self, instance):
+        return json.dumps([self.key_value(instance, field.lstrip('-')) for field in self.ordering], default=str)
+
+    def decode_position(self, position):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    @staticmethod
+    def key_value(instance, field):
+        if isinstance(instance, dict):
+            return instance[field]
+        return instance.pk if field == 'pk' else getattr(instance, field)
+
+
+def paginated_response(request, view, queryset, serializer_class, ordering=None):
+    """Serialize one page of `queryset` for an APIView, with next/previous cursor links."""
+    paginator = CursorPagination()
+    if ordering:
+        paginator.ordering = ordering
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    return paginator.get_paginated_response(serializer_class(page, many=True, context={'request': request}).data)
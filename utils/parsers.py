@@ -0,0 +1,21 @@
+import yaml
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+def load_yaml(content):
+    try:
+        return yaml.safe_load(content)
+    except yaml.YAMLError as e:
+        raise ParseError(f"YAML parse error - {e}")
+
+
+class YAMLParser(BaseParser):
+    media_type = 'application/yaml'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return load_yaml(stream)
+
+
+class LegacyYAMLParser(YAMLParser):
+    media_type = 'application/x-yaml'
@@ -0,0 +1,42 @@
+"""JSON rendering with orjson, several times faster than the json module on large listings.
+
+Falls back to DRF's encoder when orjson isn't installed or an indented response
+(the browsable API, `; indent=` media types) is asked for. Types orjson doesn't
+know natively (Decimal, lazy strings, querysets, numpy scalars...) go through DRF's
+encoder, so the output matches the stock renderer with one exception: NaN and
+±Infinity are rendered as null on both paths, where the stock renderer raises
+(strict JSON has no way to write them).
+"""
+import math
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def finite(data):
+    """`data` with NaN and ±Infinity replaced by None, as orjson writes them."""
+    if isinstance(data, float):
+        return data if math.isfinite(data) else None
+    if isinstance(data, dict):
+        return {key: finite(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [finite(value) for value in data]
+    return data
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(finite(data), accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        # Keep the output a strict javascript subset, as JSONRenderer does
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,58 @@
+"""Sparse fieldsets and opt-in nesting for list serializers.
+
+`?fields=id,status` keeps only the named fields. `?expand=workflow,workflow.steps`
+replaces a relation's id with the nested representation declared in the
+serializer's `expandable_fields`; dotted names reach into expanded relations, for
+`fields` as well as `expand`.
+"""
+from rest_framework.exceptions import ValidationError
+
+
+def split_names(names):
+    """'a,b.c,b.d' (or a list of such names) -> {'a': [], 'b': ['c', 'd']}"""
+    if isinstance(names, str):
+        names = names.split(',')
+    split = {}
+    for name in names or []:
+        head, _, rest = name.strip().partition('.')
+        if head:
+            split.setdefault(head, [])
+            if rest:
+                split[head].append(rest)
+    return split
+
+
+class FlexFieldsMixin:
+    # Field name -> (serializer class, keyword arguments) used when it is expanded
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            # Top level: take the selection from the query string
+            request = self.context.get('request')
+            if request is not None:
+                fields, expand = request.query_params.get('fields'), request.query_params.get('expand')
+
+        fields = split_names(fields)
+        expand = split_names(expand)
+        unknown = set(expand) - set(self.expandable_fields)
+        if unknown:
+            raise ValidationError({"error": f"Cannot expand: {', '.join(sorted(unknown))}"})
+        for name, nested in expand.items():
+            serializer_class, options = self.expandable_fields[name]
+            if issubclass(serializer_class, FlexFieldsMixin):
+                options = dict(options, fields=fields.get(name, []), expand=nested)
+            self.fields[name] = serializer_class(**options)
+
+        if fields:
+            unknown = set(fields) - set(self.fields)
+            if unknown:
+                raise ValidationError({"error": f"Unknown fields: {', '.join(sorted(unknown))}"})
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def expanded(cls, expand):
+        """The requested expansions this serializer knows about, for setting up eager loading."""
+        return {name: nested for name, nested in split_names(expand).items() if name in cls.expandable_fields}
@@ -1,3 +1,119 @@
-from django.test import TestCase
+import decimal
+import gzip
+import json
+import uuid
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.client import RequestFactory
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from . import middleware
+from .middleware import CompressionMiddleware, choose_encoding
+from .renderers import FastJSONRenderer
 
-# Create your tests here.
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def test_matches_the_stock_renderer(self):
+        data = {
+            'ints': [1, 2, None, True],
+            'text': 'café\u2028\u2029',
+            'decimal': decimal.Decimal('1.50'),
+            'uuid': uuid.UUID(int=5),
+            'lazy': gettext_lazy('Hello'),
+            'nested': {1: {'x': 2.5}},
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_non_finite_floats_render_as_null(self):
+        data = {'accuracy': float('nan'), 'rmse': [float('inf'), -float('inf'), 1.5]}
+        expected = {'accuracy': None, 'rmse': [None, None, 1.5]}
+        # The stock renderer refuses them outright
+        with self.assertRaises(ValueError):
+            JSONRenderer().render(data)
+
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), expected)
+        self.assertEqual(json.loads(FastJSONRenderer().render(data, 'application/json; indent=2')), expected)
+        with mock.patch('utils.renderers.orjson', None):
+            self.assertEqual(json.loads(FastJSONRenderer().render(data)), expected)
+
+    def test_indented_responses_use_the_stock_encoder(self):
+        self.assertEqual(FastJSONRenderer().render({'a': 1}, 'application/json; indent=2'), b'{\n  "a": 1\n}')
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class RendererNegotiationTests(TestCase):
+
+    def test_api_responses(self):
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create(username='tester'))
+        url = reverse('model_performance_list')
+
+        response = client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, b'{"next":null,"previous":null,"results":[]}')
+
+        response = client.get(url, HTTP_ACCEPT='application/json; indent=2')
+        self.assertEqual(json.loads(response.content)['results'], [])
+        self.assertIn(b'\n  "results": []', response.content)
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_BYTES=100)
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = b'{"results": [' + b'{"id": 1, "status": "finished"}, ' * 50 + b']}'
+
+    def respond(self, accept_encoding=None, response=None):
+        request = RequestFactory().get('/', **({'HTTP_ACCEPT_ENCODING': accept_encoding} if accept_encoding is not None else {}))
+        response = response if response is not None else HttpResponse(self.body, content_type='application/json')
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_gzip(self):
+        response = self.respond('gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_brotli_when_preferred_or_tied(self):
+        if middleware.brotli is None:
+            self.skipTest('brotli is not installed')
+        response = self.respond('gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(middleware.brotli.decompress(response.content), self.body)
+
+    def test_q_values(self):
+        self.assertEqual(choose_encoding('br;q=0.5, gzip;q=0.8'), 'gzip')
+        self.assertEqual(choose_encoding('gzip;q=0, identity'), None)
+        self.assertEqual(choose_encoding('*;q=0.1'), 'br' if middleware.brotli else 'gzip')
+        self.assertEqual(choose_encoding('*, gzip;q=0, br;q=0'), None)
+        self.assertEqual(choose_encoding('gzip ; q=1.0, br;q=nonsense'), 'gzip')
+        self.assertEqual(choose_encoding(''), None)
+        with mock.patch.object(middleware, 'brotli', None):
+            self.assertEqual(choose_encoding('br, gzip;q=0.1'), 'gzip')
+
+    def test_uncompressed_responses_still_vary(self):
+        response = self.respond('identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, self.body)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_small_responses_are_left_alone(self):
+        response = self.respond('gzip', HttpResponse(b'{"id": 1}'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+
+    def test_streaming_responses_pass_through(self):
+        stream = StreamingHttpResponse(iter([self.body]), content_type='text/event-stream')
+        response = self.respond('gzip, br', stream)
+        self.assertIs(response, stream)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+
+    def test_strong_etags_become_weak(self):
+        response = HttpResponse(self.body)
+        response['ETag'] = '"abc"'
+        self.assertEqual(self.respond('gzip', response)['ETag'], 'W/"abc"')